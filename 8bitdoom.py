@@ -3,111 +3,81 @@ from OpenGL.GLU import *
 from OpenGL.GLUT import *
 from OpenGL.GLUT import GLUT_BITMAP_HELVETICA_18
 import math
-import random
+import os
+import time
+
+import numpy as np
+
+from doomgl import text as text_atlas
+from doomgl.culling import BlockSet, CullStats, Frustum
+from doomgl.lod import LOD_FULL, LOD_IMPOSTOR, LOD_LEVELS, pixels_per_unit, select_lods
+from doomgl.mesh import Mesh, MeshBuilder, MeshCache, disable_arrays, enable_arrays
+from doomgl.modern import MIN_GL_VERSION, ModernRenderer
+from doomgl.pacing import FramePacer, set_swap_interval
+from doomsim import replay
+from doomsim.chunks import CHUNK_SIZE
+from doomsim.constants import *
+from doomsim.game import GameWorld
+from doomsim.profiler import FRAME_PHASE
+from doomsim.projectiles import BULLET_COLORS
+
+
+# --- Renderer Globals ---
+# The simulated world this window shows and drives
+sim = GameWorld()
+# The world's profiler also times the draw phases, so one overlay shows both
+profiler = sim.profiler
 
-
-# --- Constants and Global Game Variables ---
 # Window
 SCREEN_WIDTH, SCREEN_HEIGHT = 1024, 768
-# Game States
-STATE_PLAYING = 0
-STATE_LEVEL_TRANSITION = 1
-STATE_GAME_OVER_TRANSITION = 2
-STATE_YOU_WIN = 3
-# UI/Menu States
-STATE_MAIN_MENU = 100
-STATE_LEVEL_SELECT = 101
-STATE_HALL_OF_FAME = 102
-STATE_PAUSED = 103
-
-game_state = STATE_MAIN_MENU
-current_level = 1
-max_levels = 10
-
-# Player settings
-PLAYER_SPEED = 5.0
-PLAYER_ROTATE_ANGLE = 0.5
-PLAYER_TOTAL_HEIGHT = 1.8
-PLAYER_BODY_Y_OFFSET = PLAYER_TOTAL_HEIGHT / 2 
-PLAYER_EYE_HEIGHT_FROM_MODEL_BASE = 1.6 
-PLAYER_RADIUS = 0.5 
-PLAYER_MAX_HEALTH = 100
-PLAYER_BASE_SHOOT_COOLDOWN_TIME = 0.3
-
-# Player model proportions
-PLAYER_LEG_LENGTH = PLAYER_TOTAL_HEIGHT * 0.45
-PLAYER_TORSO_HEIGHT = PLAYER_TOTAL_HEIGHT * 0.4
-PLAYER_ARM_LENGTH = PLAYER_TOTAL_HEIGHT * 0.35
-PLAYER_GUN_LENGTH = PLAYER_TOTAL_HEIGHT * 0.3
-
-# Bullet settings
-BULLET_SPEED = 30.0
-BULLET_RADIUS = 0.1
-BULLET_LIFESPAN = 2.5
-
-# Enemy settings
-ENEMY_MIN_DISTANCE_FROM_PLAYER = 3.5
-ENEMY_BASE_COLLISION_RADIUS = 0.6
-
-# Perk System Variables
-PERK_SCORE_MULTIPLIER_DURATION = 5.0
-PERK_RAPID_FIRE_DURATION = 5.0
-
-# Dungeon settings
-DUNGEON_SIZE_X = 100.0
-DUNGEON_SIZE_Z = 100.0
-WALL_HEIGHT = 8.0
-TILE_SIZE = 5.0
+
+# Render backend: 'shader' draws everything from vertex buffers with GLSL 3.30
+# programs (see doomgl/modern.py) on an OpenGL 3.3 core profile context, and
+# falls back to a compatibility context and then to 'fixed' (the fixed-function
+# pipeline) when the driver lacks OpenGL 3.3. Override with DOOM_RENDER_BACKEND.
+RENDER_BACKEND = os.environ.get('DOOM_RENDER_BACKEND', 'shader')
+# The ModernRenderer while the shader backend is active, else None
+gpu = None
 
 # Camera
-CAMERA_MODE_FIRST_PERSON = 0
-CAMERA_MODE_THIRD_PERSON = 1
-camera_mode = CAMERA_MODE_THIRD_PERSON
 tp_camera_distance = 8.0
-tp_camera_pitch = -30.0
-tp_camera_yaw_offset = 0.0
-
-# Global lists for game objects
-player = {}
-enemies = []
-bullets = []
-
-# Level Management
-level_configs = {}
-enemies_killed_this_level = 0
-enemies_spawned_this_level = 0
-boss_entity = None
-
-# Cheat mode (auto-fire + godmode)
-cheat_mode = False
-cheat_fire_timer = 0.0
-CHEAT_SHOOT_INTERVAL = 0.18  # seconds between auto shots
-
-# Smooth facing
-PLAYER_TURN_SPEED_DEG_PER_SEC = 240.0
-
-# Score record guard
-win_score_recorded = False
-current_session_score_recorded = False
 
-# Level obstacles (pillars/blocks) for simple level design improvements
-obstacles = []  # each: {'pos':[x,z], 'radius': r, 'height': h, 'color':[r,g,b], 'shape': 'cyl'|'box'}
-
-# Enemy animation timer
-enemy_anim_time = 0.0
-
-# Timing
-last_time = 0.0
-transition_timer = 0.0
-TRANSITION_DURATION = 1.5
-transition_color = [0.0, 0.0, 0.0]
-next_game_state_after_transition = STATE_PLAYING
+# Timing: frames are paced to TARGET_FPS (0 = uncapped) by sleeping with a short
+# spin-wait tail; SWAP_INTERVAL is the vsync setting requested from the driver
+# (None leaves the driver default alone). When the driver grants vsync, the swap
+# paces frames and the sleep pacer is switched off, so the two never fight on
+# displays that are not running at TARGET_FPS.
+TARGET_FPS = 60
+SWAP_INTERVAL = 1
+frame_pacer = FramePacer(TARGET_FPS)
+# Fixed-timestep mode runs the sim at SIM_TICK_RATE whatever the display rate and
+# draws positions interpolated between the last two ticks; otherwise each frame
+# steps the sim once with the (clamped) wall-clock delta.
+USE_FIXED_TIMESTEP = True
+interp_alpha = 1.0
+# Path to write a replay of the whole session to on exit (None = no recording);
+# play it back with: python -m doomsim.replay <path>
+RECORD_REPLAY_PATH = None
+# Baked player and wolf meshes are cached here as memory-mapped .npy files keyed
+# by model parameters (None = bake every launch). Bump MODEL_VERSION whenever
+# build_player or build_wolf change, so stale meshes are rebaked.
+MESH_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.mesh_cache')
+MODEL_VERSION = 1
+mesh_cache = MeshCache(MESH_CACHE_DIR)
 
 # Input states
 keys_pressed = {}
 special_keys_pressed = {}
 mouse_buttons = {}
 mouse_pos = {'x': 0, 'y': 0}
+# One-shot gameplay actions queued by the input callbacks for the next sim step
+pending_events = []
+
+# Menu-like states redraw only on input, hover change or resize; the idle loop
+# is unregistered there so the process sleeps in GLUT's event wait
+EVENT_DRIVEN_STATES = (STATE_MAIN_MENU, STATE_LEVEL_SELECT, STATE_HALL_OF_FAME, STATE_PAUSED, STATE_YOU_WIN)
+idle_registered = False
+hovered_action = None
 
 # UI Palette - Dark dungeon/action game theme
 UI_COLORS = {
@@ -128,591 +98,194 @@ UI_COLORS = {
 # UI buttons storage for hit-testing in current frame: list of dicts {label, x, y, w, h, action}
 ui_buttons = []
 
-# High scores (in-memory per run) - keep only recent top 3
-hof_records = []  # list of {'score': int, 'seq': int}
-hof_seq = 0
-
-# GLU Quadric object for cylinders
-glu_quadric = None
-
-# --- Helper Functions (Math, etc.) ---
-def vector_length(v):
-    return math.sqrt(v[0]**2 + v[1]**2 + v[2]**2)
-
-def normalize_vector(v):
-    l = vector_length(v)
-    if l == 0:
-        return [0,0,0]
-    return [v[0]/l, v[1]/l, v[2]/l]
-
-def distance_3d(p1, p2):
-    return math.sqrt((p1[0]-p2[0])**2 + (p1[1]-p2[1])**2 + (p1[2]-p2[2])**2)
-
-def check_sphere_collision(pos1, radius1, pos2, radius2):
-    dist = distance_3d(pos1, pos2)
-    return dist < (radius1 + radius2)
-
-# --- Game Object Initialization and Management ---
-def init_player():
-    """Initialize the player dictionary with position, rotation, health, score,
-    perk counters/timers and the current shooting cooldown baseline."""
-    global player
-    player = {
-        'pos': [DUNGEON_SIZE_X / 2, PLAYER_BODY_Y_OFFSET, DUNGEON_SIZE_Z / 2], 
-        'rotation_y': 0.0, 'rotation_x': 0.0,
-        'health': PLAYER_MAX_HEALTH, 'score': 0, 'speed': PLAYER_SPEED,
-        'shoot_cooldown': 0.0, 'current_shoot_cooldown_time': PLAYER_BASE_SHOOT_COOLDOWN_TIME,
-        'kills_for_health_perk': 0, 'kills_for_score_perk': 0, 'kills_for_gun_perk': 0,
-        'health_perk_available': False, 'score_perk_available': False, 'gun_perk_available': False,
-        'score_perk_time_left': 0.0, 'gun_perk_time_left': 0.0,
-    }
-
-def get_enemy_definition(enemy_type_id):
-    """Return an enemy configuration dict for a given type id.
-    Includes health, damage, speed multiplier, model height, color (by theme), and points."""
-    # Define colors based on current level theme
-    if current_level <= 3:
-        # Earth theme (lush greens)
-        type1_color = [0.20, 0.85, 0.30]
-        type2_color = [0.10, 0.70, 0.25]
-        type3_color = [0.06, 0.55, 0.18]
-    elif current_level <= 6:
-        # Mud theme (rich browns)
-        type1_color = [0.75, 0.55, 0.30]
-        type2_color = [0.60, 0.40, 0.20]
-        type3_color = [0.45, 0.30, 0.15]
-    elif current_level <= 9:
-        # Heaven theme (light blue/white tints)
-        type1_color = [0.85, 0.95, 1.00]
-        type2_color = [0.70, 0.85, 1.00]
-        type3_color = [0.60, 0.80, 0.98]
-    else:
-        # Hell theme (crimson/ember reds)
-        type1_color = [0.90, 0.20, 0.15]
-        type2_color = [0.80, 0.12, 0.10]
-        type3_color = [0.70, 0.08, 0.06]
-
-    if enemy_type_id == 1:
-        return {
-            'name': 'Type1Wolf',
-            'health': 3,  # Takes 3 hits to kill
-            'damage': 5,  # Deals 5hp damage
-            'speed_mult': 0.2,
-            'model_height': 2.0,
-            'color': type1_color,
-            'points': 10
-        }
-    elif enemy_type_id == 2:
-        return {
-            'name': 'Type2Wolf',
-            'health': 4,  # Takes 4 hits to kill
-            'damage': 6,  # Reduced from 8 to 6
-            'speed_mult': 0.3,  # Reduced from 0.4 to 0.3
-            'model_height': 3.0,
-            'color': type2_color,
-            'points': 15
-        }
-    elif enemy_type_id == 3:
-        return {
-            'name': 'Type3Wolf',
-            'health': 5,  # Takes 5 hits to kill
-            'damage': 8,  # Reduced from 11 to 8
-            'speed_mult': 0.4,  # Reduced from 0.6 to 0.4
-            'model_height': 4.0,
-            'color': type3_color,
-            'points': 20
-        }
-    elif enemy_type_id == 'miniboss':
-        return {
-            'name': 'MiniBossWolf',
-            'health': 10, # Takes 10 hits to kill
-            'damage': 10, # Reduced from 13 to 10
-            'speed_mult': 0.5,  # Reduced from 0.8 to 0.5
-            'model_height': 6.0,
-            'color': [0.95, 0.15, 0.15],  # Bright red color for miniboss
-            'points': 50,
-            'is_boss': True
-        }
-    elif enemy_type_id == 'boss':
-        return {
-            'name': 'BossWolf',
-            'health': 15, # Takes 15 hits to kill
-            'damage': 12, # Reduced from 15 to 12
-            'speed_mult': 0.6,  # Reduced from 1.0 to 0.6
-            'model_height': 8.0,
-            'color': [1.00, 0.08, 0.05],  # Deep red color for final boss
-            'points': 100,
-            'is_boss': True
-        }
-    return {}
-
-def init_level_configs():
-    """Create per-level enemy quotas and pools, and precompute spawn pools."""
-    global level_configs
-    level_configs = {
-        1: {'total_enemies':5,'max_concurrent':1,'enemy_types':[1]}, 
-        2: {'total_enemies':6,'max_concurrent':2,'enemy_types':[1]},
-        3: {'total_enemies':9,'max_concurrent':3,'enemy_types':[1]}, 
-        4: {'total_enemies':5,'max_concurrent':1,'enemy_types':[2]},
-        5: {'total_enemies':7,'max_concurrent':1,'enemy_types':[1]*3+[2]*3+['miniboss'],'is_boss_level':True},
-        6: {'total_enemies':9,'max_concurrent':3,'enemy_types':[2]},
-        7: {'total_enemies':5,'max_concurrent':1,'enemy_types':[3]}, 
-        8: {'total_enemies':6,'max_concurrent':2,'enemy_types':[3]},
-        9: {'total_enemies':9,'max_concurrent':3,'enemy_types':[3]},
-        10: {'total_enemies':16,'max_concurrent':1,'enemy_types':[1]*5+[2]*5+[3]*5+['boss'],'is_boss_level':True}
-    }
-    for i in range(1, max_levels + 1):
-        level_configs[i]['enemies_to_spawn_pool'] = list(level_configs[i]['enemy_types'])
-
-def spawn_enemy():
-    """Spawn one enemy if allowed by the current level quotas and spacing rules."""
-    global enemies_spawned_this_level, boss_entity, enemies
-    level_conf = level_configs[current_level]
-    if enemies_spawned_this_level >= level_conf['total_enemies']: 
-        return
-    enemy_type_to_spawn = None
-    is_spawning_boss = False
-    if 'is_boss_level' in level_conf:
-        if not boss_entity and 'boss' in level_conf['enemies_to_spawn_pool']:
-            enemy_type_to_spawn = 'boss'
-            level_conf['enemies_to_spawn_pool'].remove('boss')
-            is_spawning_boss = True
-        elif level_conf['enemies_to_spawn_pool']:
-            pool = [t for t in level_conf['enemies_to_spawn_pool'] if t != 'boss']
-            if pool: 
-                enemy_type_to_spawn = random.choice(pool)
-                level_conf['enemies_to_spawn_pool'].remove(enemy_type_to_spawn)
-    else:
-        if level_conf['enemies_to_spawn_pool']: 
-            enemy_type_to_spawn = level_conf['enemy_types'][0] 
-    if enemy_type_to_spawn is None: 
-        return
-    config = get_enemy_definition(enemy_type_to_spawn)
-    if not config: 
+# Static dungeon as a culling BlockSet and the sim.level_generation it was built for
+dungeon_blocks = None
+dungeon_blocks_generation = None
+# Explore mode: one BlockSet per resident chunk, keyed by Chunk.serial and
+# freed once the chunk is evicted
+chunk_blocks = {}
+# Static geometry is baked in FLOOR_BLOCK_SIZE squares (floor tiles plus the
+# obstacles standing on them) and wall segments of WALL_BLOCK_SECTIONS
+# sections, each a vertex range of one buffer with its own bounding box for culling
+FLOOR_BLOCK_SIZE = 20.0
+WALL_SECTIONS = 20
+WALL_BLOCK_SECTIONS = 4
+# Drawn/culled counts of the last world frame (shown in the profiler overlay)
+cull_stats = CullStats()
+# Enemies drawn per detail level this frame (full, reduced, impostor)
+lod_counts = [0] * LOD_LEVELS
+
+# Bullet palette as a float32 table so colors can be gathered per bullet in one go
+BULLET_COLOR_ARRAY = np.array(BULLET_COLORS, np.float32)
+# Vertical field of view used by reshape(); bullet point sizes are derived from it
+CAMERA_FOV_Y = 45.0
+# Far clip plane, which is also the culling distance: the dungeon diagonal
+# (~141) plus the third-person camera distance, with a little slack
+CAMERA_FAR_PLANE = 160.0
+
+# Frozen last world frame, drawn behind the pause and win overlays instead of
+# re-rendering the dungeon; frozen_frame_size is None when it must be recaptured
+FROZEN_BACKDROP_STATES = (STATE_PAUSED, STATE_YOU_WIN)
+frozen_frame_texture = None
+frozen_frame_size = None
+
+# Baked models in vertex buffers: wolves keyed by (variant, model_height, color,
+# lod) -- see wolf_mesh -- and the player, uploaded on first draw
+wolf_meshes = {}
+player_mesh = None
+# Last frame's detail level per enemy, for LOD hysteresis: campaign enemies by
+# object, horde enemies by pool row (rows are reused on removal, so a recycled
+# row may switch a frame early or late -- harmless)
+enemy_lods = {}
+horde_lods = (np.zeros(0, np.int64), np.zeros(0, np.int8))  # last frame's (sorted uids, levels)
+
+# Profiler overlay (F3 toggles, F4 exports CSV/JSON to PROFILE_EXPORT_PREFIX-<time>.*).
+# Its numbers are refreshed every PROFILER_OVERLAY_REFRESH seconds so they stay
+# readable and do not churn the text-run cache.
+PROFILER_OVERLAY_REFRESH = 0.25
+PROFILE_EXPORT_PREFIX = 'profile'
+profiler_overlay_stats = {}
+profiler_overlay_updated = 0.0
+
+# --- Render Backend ---
+def init_backend(allow_fixed=True):
+    """Start the shader backend unless RENDER_BACKEND is 'fixed' or the driver
+    cannot run it, in which case everything stays on the fixed-function path
+    (not on a core profile context, which has none: allow_fixed False).
+    Returns True if the shader backend is running."""
+    global gpu
+    if RENDER_BACKEND != 'fixed':
+        try:
+            gpu = ModernRenderer()
+            print(f"Render backend: shader ({gpu.renderer_name})")
+            return True
+        except RuntimeError as e:
+            fallback = "using fixed-function" if allow_fixed else "retrying with a compatibility context"
+            print(f"Shader backend unavailable ({e}); {fallback}")
+    if allow_fixed:
+        # Smooth shading is within OpenGL fixed-function; retain for model visuals
+        glShadeModel(GL_SMOOTH)
+    return False
+
+def request_core_profile(enable=True):
+    """Ask GLUT for an OpenGL MIN_GL_VERSION core profile (forward compatible,
+    as macOS requires) for the next window, or for a default compatibility
+    context again. False if this GLUT cannot choose the context version."""
+    try:
+        if enable:
+            glutInitContextVersion(*MIN_GL_VERSION)
+            glutInitContextFlags(GLUT_FORWARD_COMPATIBLE)
+            glutInitContextProfile(GLUT_CORE_PROFILE)
+        else:
+            glutInitContextVersion(1, 0)
+            glutInitContextFlags(0)
+            glutInitContextProfile(GLUT_COMPATIBILITY_PROFILE)
+        return True
+    except Exception:
+        return False
+
+def open_window(title):
+    """Create the window and start the render backend. The shader backend gets
+    a core profile context when GLUT can ask for one; if it cannot start there,
+    the window is reopened with a compatibility context, where the shader
+    backend is tried again before falling back to fixed-function. (A driver
+    that refuses the core context outright makes freeglut exit; run with
+    DOOM_RENDER_BACKEND=fixed there.)"""
+    if RENDER_BACKEND != 'fixed' and request_core_profile():
+        window = glutCreateWindow(title)
+        glEnable(GL_DEPTH_TEST)
+        if init_backend(allow_fixed=False):
+            return
+        glutDestroyWindow(window)
+        request_core_profile(False)
+    glutCreateWindow(title)
+    glEnable(GL_DEPTH_TEST)
+    init_backend()
+
+def upload_mesh(vertices):
+    """Baked vertices in a vertex buffer for the active backend."""
+    return Mesh(vertices) if gpu is None else gpu.mesh(vertices)
+
+def draw_instances(mesh, transforms):
+    """Draw a model once per (x, y, z, yaw degrees) row of transforms: one
+    instanced call on the shader backend, one glDrawArrays each otherwise."""
+    if gpu is not None:
+        gpu.draw_instances(mesh, transforms)
         return
-    margin=7.0
-    x=random.uniform(margin,DUNGEON_SIZE_X-margin)
-    enemy_base_y=config['model_height']/2
-    z=random.uniform(margin,DUNGEON_SIZE_Z-margin)
-    min_spawn_dist_player=15.0
-    min_spawn_dist_enemy=5.0
-    spawn_attempts=0
-    valid_spawn=False
-    while spawn_attempts < 20 and not valid_spawn:
-        valid_spawn=True
-        if distance_3d([x,enemy_base_y,z],[player['pos'][0],player['pos'][1],player['pos'][2]]) < min_spawn_dist_player:
-            valid_spawn=False
-        for ex_en in enemies:
-            if distance_3d([x,enemy_base_y,z],[ex_en['pos'][0],ex_en['pos'][1],ex_en['pos'][2]]) < min_spawn_dist_enemy:
-                valid_spawn=False
-                break
-        if not valid_spawn: 
-            x=random.uniform(margin,DUNGEON_SIZE_X-margin)
-            z=random.uniform(margin,DUNGEON_SIZE_Z-margin)
-        spawn_attempts+=1
-    if not valid_spawn:
-        if is_spawning_boss: 
-            level_conf['enemies_to_spawn_pool'].insert(0,'boss')
-        elif enemy_type_to_spawn and enemy_type_to_spawn != 'boss' and 'is_boss_level' in level_conf:
-            level_conf['enemies_to_spawn_pool'].append(enemy_type_to_spawn)
+    transforms = np.asarray(transforms, float)
+    # All modelview matrices at once, in GL's column-major layout: row i of
+    # each 4x4 is column i of view * translate(x, y, z) * rotate(yaw, y axis)
+    view = np.asarray(glGetFloatv(GL_MODELVIEW_MATRIX), float).reshape(4, 4)
+    yaw = np.radians(transforms[:, 3])
+    c, s = np.cos(yaw), np.sin(yaw)
+    model = np.zeros((len(transforms), 4, 4))
+    model[:, 0, 0] = c
+    model[:, 0, 2] = -s
+    model[:, 1, 1] = 1.0
+    model[:, 2, 0] = s
+    model[:, 2, 2] = c
+    model[:, 3, :3] = transforms[:, :3]
+    model[:, 3, 3] = 1.0
+    enable_arrays()
+    mesh.bind()
+    mesh.draw_matrices(model @ view)
+    glLoadMatrixf(view)
+    disable_arrays()
+
+def begin_2d(width, height, blend=False):
+    """Start drawing in 2D window coordinates (0..width, 0..height) with depth
+    test and lighting off; blend turns on alpha blending for rects and lines."""
+    if gpu is not None:
+        gpu.begin_2d(width, height, blend)
         return
-    new_enemy = {
-        'pos':[x,enemy_base_y,z],'enemy_type_id':enemy_type_to_spawn,
-        'max_health':config['health'],'health':config['health'],'damage':config['damage'],'speed':PLAYER_SPEED*config['speed_mult'],
-        'reload_time':1.5/(config['speed_mult']+0.5),'shoot_cooldown':random.uniform(1.0,3.0),'points':config['points'],
-        'color':config['color'],'model_height':config['model_height'],
-        'collision_radius':ENEMY_BASE_COLLISION_RADIUS*(config['model_height']/1.8),
-        'is_boss':config.get('is_boss',False),'rotation_y':0.0
-    }
-    enemies.append(new_enemy)
-    enemies_spawned_this_level+=1
-    if is_spawning_boss:
-        boss_entity = new_enemy
-
-def init_level(level_num):
-    """Reset and prepare a level: clear entities, reset flags, place obstacles, and
-    move the player to spawn."""
-    global current_level,enemies,bullets,game_state,enemies_killed_this_level,enemies_spawned_this_level,boss_entity,player,win_score_recorded,obstacles,enemy_anim_time,current_session_score_recorded
-    current_level=level_num
-    enemies.clear()
-    bullets.clear()
-    boss_entity=None
-    game_state=STATE_PLAYING
-    enemies_killed_this_level=0
-    enemies_spawned_this_level=0
-    player['pos']=[DUNGEON_SIZE_X/2,PLAYER_BODY_Y_OFFSET,DUNGEON_SIZE_Z/2]
-    player['rotation_y']=0.0
-    player['rotation_x']=0.0
-    player['health_perk_available']=False
-    player['score_perk_available']=False
-    player['gun_perk_available']=False
-    player['score_perk_time_left']=0.0
-    player['gun_perk_time_left']=0.0
-    player['kills_for_health_perk']=0
-    player['kills_for_score_perk']=0
-    player['kills_for_gun_perk']=0
-    level_configs[current_level]['enemies_to_spawn_pool'] = list(level_configs[current_level]['enemy_types'])
-    win_score_recorded = False
-    current_session_score_recorded = False
-    enemy_anim_time = 0.0
-    # Generate obstacles: vary by level theme
-    obstacles = []
-    random.seed(1000 + current_level)
-    base_count = 8 + current_level // 2
-    for i in range(base_count):
-        rx = random.uniform(8.0, DUNGEON_SIZE_X-8.0)
-        rz = random.uniform(8.0, DUNGEON_SIZE_Z-8.0)
-        # Keep clear around player spawn center
-        if distance_3d([rx,0,rz],[DUNGEON_SIZE_X/2,0,DUNGEON_SIZE_Z/2]) < 10.0:
-            continue
-        r = random.uniform(1.2, 2.2)
-        h = random.uniform(3.0, 6.0)
-        shape = 'cyl' if i % 2 == 0 else 'box'
-        # Color by biome
-        if current_level <= 3:
-            col = [0.12, 0.35, 0.18]
-        elif current_level <= 6:
-            col = [0.45, 0.32, 0.18]
-        elif current_level <= 9:
-            col = [0.12, 0.22, 0.42]
-        else:
-            col = [0.45, 0.08, 0.45]
-        obstacles.append({'pos':[rx,rz],'radius':r,'height':h,'color':col,'shape':shape})
-
-def create_bullet(start_pos,direction_vec,owner_type,damage_val,color_override=None):
-    """Append a bullet to the world with start position, direction, owner and damage."""
-    bullets.append({'pos':list(start_pos),'dir':direction_vec,'owner':owner_type,'damage':damage_val,'lifespan':BULLET_LIFESPAN,
-                    'color':color_override if color_override else ([1.0,1.0,0.0] if owner_type=='PLAYER' else [1.0,0.5,0.0])})
-
-# --- Update Functions ---
-def update_player(delta_time):
-    """Advance player timers, process movement/rotation input, collisions and
-    manage short-lived facing alignment assistance after firing."""
-    global player,camera_mode,tp_camera_pitch,tp_camera_yaw_offset,align_to_camera_timer
-    # Perk timers
-    if player['score_perk_time_left']>0:
-        player['score_perk_time_left']=max(0.0, player['score_perk_time_left']-delta_time)
-        if player['score_perk_time_left']==0:
-            pass  # Score Perk expired
-    if player['gun_perk_time_left']>0:
-        player['gun_perk_time_left']=max(0.0, player['gun_perk_time_left']-delta_time)
-        if player['gun_perk_time_left']>0:
-            player['current_shoot_cooldown_time']=0.001
-        else:
-            player['current_shoot_cooldown_time']=PLAYER_BASE_SHOOT_COOLDOWN_TIME
-            pass  # Gun Perk expired
-    else: 
-        player['current_shoot_cooldown_time']=PLAYER_BASE_SHOOT_COOLDOWN_TIME
-    
-    speed = player['speed'] * delta_time
-    dx, dz = 0, 0
-    # WASD relative to view: third-person uses camera yaw; first-person uses player yaw
-    if camera_mode == CAMERA_MODE_THIRD_PERSON:
-        basis_yaw = tp_camera_yaw_offset
-        # Camera forward on XZ is from camera to player: (-sin(yaw), cos(yaw))
-        forward_x = -math.sin(math.radians(basis_yaw))
-        forward_z =  math.cos(math.radians(basis_yaw))
-        # Right is perpendicular clockwise: (cos(yaw), sin(yaw))
-        right_x =  math.cos(math.radians(basis_yaw))
-        right_z =  math.sin(math.radians(basis_yaw))
-    else:
-        basis_yaw = player['rotation_y']
-        # Player forward on XZ should match look horizontal: (sin(yaw), cos(yaw))
-        forward_x =  math.sin(math.radians(basis_yaw))
-        forward_z =  math.cos(math.radians(basis_yaw))
-        # Right is perpendicular clockwise: (cos(yaw), -sin(yaw))
-        right_x =  math.cos(math.radians(basis_yaw))
-        right_z = -math.sin(math.radians(basis_yaw))
-
-    moved = False
-    if keys_pressed.get(b'w'):
-        dx += forward_x * speed; dz += forward_z * speed; moved = True
-    if keys_pressed.get(b's'):
-        dx -= forward_x * speed; dz -= forward_z * speed; moved = True
-    if keys_pressed.get(b'a'):
-        dx += right_x * speed; dz += right_z * speed; moved = True
-    if keys_pressed.get(b'd'):
-        dx -= right_x * speed; dz -= right_z * speed; moved = True
-        
-    WALL_MARGIN = PLAYER_RADIUS + 0.5
-    new_x = player['pos'][0] + dx
-    new_z = player['pos'][2] + dz
-    
-    if (WALL_MARGIN <= new_x <= DUNGEON_SIZE_X - WALL_MARGIN and 
-        WALL_MARGIN <= new_z <= DUNGEON_SIZE_Z - WALL_MARGIN):
-        blocked = False
-        for ob in obstacles:
-            dxo = new_x - ob['pos'][0]
-            dzo = new_z - ob['pos'][1]
-            if dxo*dxo + dzo*dzo < (PLAYER_RADIUS + ob['radius'])**2:
-                blocked = True
-                break
-        if not blocked:
-            player['pos'][0] = new_x
-            player['pos'][2] = new_z
-
-    # Manual rotation with Q/E (always honored)
-    if keys_pressed.get(b'q'):
-        player['rotation_y'] = (player['rotation_y'] + PLAYER_ROTATE_ANGLE) % 360.0
-    if keys_pressed.get(b'e'):
-        player['rotation_y'] = (player['rotation_y'] - PLAYER_ROTATE_ANGLE) % 360.0
-
-    # Removed post-fire camera alignment (no aim assist)
-    if camera_mode==CAMERA_MODE_FIRST_PERSON:
-        if special_keys_pressed.get(GLUT_KEY_UP): 
-            player['rotation_x']=max(-89.0,player['rotation_x']-PLAYER_ROTATE_ANGLE*0.7)
-        if special_keys_pressed.get(GLUT_KEY_DOWN): 
-            player['rotation_x']=min(89.0,player['rotation_x']+PLAYER_ROTATE_ANGLE*0.7)
-    elif camera_mode==CAMERA_MODE_THIRD_PERSON:
-        if special_keys_pressed.get(GLUT_KEY_UP): 
-            tp_camera_pitch=max(-89.0,tp_camera_pitch-PLAYER_ROTATE_ANGLE*0.7)
-        if special_keys_pressed.get(GLUT_KEY_DOWN): 
-            tp_camera_pitch=min(0.0,tp_camera_pitch+PLAYER_ROTATE_ANGLE*0.7)
-        if special_keys_pressed.get(GLUT_KEY_LEFT): 
-            tp_camera_yaw_offset-=PLAYER_ROTATE_ANGLE
-        if special_keys_pressed.get(GLUT_KEY_RIGHT): 
-            tp_camera_yaw_offset+=PLAYER_ROTATE_ANGLE
-    if player['shoot_cooldown']>0: 
-        player['shoot_cooldown']-=delta_time
-    
-def update_enemies(delta_time):
-    """Spawn/move enemies, avoid obstacles, and shoot at the player with cooldowns."""
-    global player,game_state,enemy_anim_time
-    enemy_anim_time += delta_time
-    level_conf=level_configs[current_level]
-    max_c=level_conf.get('max_concurrent',1)
-    if len(enemies)<max_c and enemies_spawned_this_level<level_conf['total_enemies']: 
-        spawn_enemy()
-    for enemy in list(enemies):
-        dist_player=distance_3d([player['pos'][0],player['pos'][1],player['pos'][2]],[enemy['pos'][0],enemy['pos'][1],enemy['pos'][2]])
-        dir_to_p_vec=[player['pos'][0]-enemy['pos'][0],0,player['pos'][2]-enemy['pos'][2]]
-        enemy['rotation_y']=math.degrees(math.atan2(dir_to_p_vec[0],dir_to_p_vec[2]))
-        if dist_player > ENEMY_MIN_DISTANCE_FROM_PLAYER:
-            dir_norm=normalize_vector(dir_to_p_vec)
-            move_dist=enemy['speed']*delta_time
-            nx = enemy['pos'][0]+dir_norm[0]*move_dist
-            nz = enemy['pos'][2]+dir_norm[2]*move_dist
-            # obstacle avoidance: stop if colliding simple radius
-            can_move = True
-            for ob in obstacles:
-                dxo = nx - ob['pos'][0]
-                dzo = nz - ob['pos'][1]
-                if dxo*dxo + dzo*dzo < (enemy['collision_radius'] + ob['radius'])**2:
-                    can_move = False
-                    break
-            if can_move:
-                enemy['pos'][0]=nx
-                enemy['pos'][2]=nz
-        er=enemy['collision_radius']
-        enemy['pos'][0]=max(er,min(enemy['pos'][0],DUNGEON_SIZE_X-er))
-        enemy['pos'][2]=max(er,min(enemy['pos'][2],DUNGEON_SIZE_Z-er))
-        if enemy['shoot_cooldown']>0: enemy['shoot_cooldown']-=delta_time
-        elif dist_player < 30.0:
-            enemy['shoot_cooldown']=enemy['reload_time']
-            player_center_y = player['pos'][1] - PLAYER_BODY_Y_OFFSET + PLAYER_TOTAL_HEIGHT/2
-            target_pos=[player['pos'][0],player_center_y,player['pos'][2]]
-            
-            enemy_face_center_y = enemy['pos'][1]
-            gun_len_for_offset = 0.2 * enemy['model_height']
-            s_yaw_e=math.sin(math.radians(enemy['rotation_y']))
-            c_yaw_e=math.cos(math.radians(enemy['rotation_y']))
-
-            start_x_e = enemy['pos'][0] + s_yaw_e * gun_len_for_offset
-            start_z_e = enemy['pos'][2] + c_yaw_e * gun_len_for_offset 
-            enemy_bullet_start_pos=[start_x_e,enemy_face_center_y,start_z_e]
-            enemy_bullet_dir=normalize_vector([target_pos[0]-start_x_e,target_pos[1]-enemy_face_center_y,target_pos[2]-start_z_e])
-            create_bullet(enemy_bullet_start_pos,enemy_bullet_dir,'ENEMY',enemy['damage'])
-
-def update_bullets(delta_time):
-    """Integrate bullets, cull by bounds/lifespan, and resolve hits against
-    enemies or the player."""
-    global player, game_state, enemies_killed_this_level, boss_entity, win_score_recorded
-    
-    for bullet in list(bullets):
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    gluOrtho2D(0, width, 0, height)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT)
+    glDisable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
+    if blend:
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
-        bullet['pos'][0] += bullet['dir'][0] * BULLET_SPEED * delta_time
-        bullet['pos'][1] += bullet['dir'][1] * BULLET_SPEED * delta_time
-        bullet['pos'][2] += bullet['dir'][2] * BULLET_SPEED * delta_time
-        bullet['lifespan'] -= delta_time
-        
-        if bullet['lifespan'] <= 0 or not (
-            -BULLET_RADIUS < bullet['pos'][0] < DUNGEON_SIZE_X + BULLET_RADIUS and
-            -BULLET_RADIUS < bullet['pos'][1] < WALL_HEIGHT + BULLET_RADIUS and
-            -BULLET_RADIUS < bullet['pos'][2] < DUNGEON_SIZE_Z + BULLET_RADIUS):
-            if bullet in bullets:
-                bullets.remove(bullet)
-            continue
-            
-        if bullet['owner'] == 'PLAYER':
-            for enemy in list(enemies):
-                bullet_to_enemy = [
-                    enemy['pos'][0] - bullet['pos'][0],
-                    enemy['pos'][1] - bullet['pos'][1],
-                    enemy['pos'][2] - bullet['pos'][2]
-                ]
-                
-                dist = math.sqrt(sum(x*x for x in bullet_to_enemy))
-                
-                if dist < enemy['collision_radius'] * 1.5:
-                    if bullet in bullets:
-                        bullets.remove(bullet)
-                    enemy['health'] -= 1
-                    if enemy['health'] <= 0:
-                        handle_enemy_death(enemy)
-                    break
-                    
-        elif bullet['owner'] == 'ENEMY':
-            bullet_to_player = [
-                player['pos'][0] - bullet['pos'][0],
-                (player['pos'][1] - PLAYER_BODY_Y_OFFSET + PLAYER_TOTAL_HEIGHT/2) - bullet['pos'][1],
-                player['pos'][2] - bullet['pos'][2]
-            ]
-            
-            dist = math.sqrt(sum(x*x for x in bullet_to_player))
-            
-            if dist < PLAYER_RADIUS * 1.5:
-                if bullet in bullets:
-                    bullets.remove(bullet)
-                handle_player_hit(bullet['damage'])
-
-def handle_enemy_death(enemy):
-    """Remove a dead enemy, award points (with score perk), update perk counters."""
-    global enemies, boss_entity, enemies_killed_this_level, player
-    score_mult = 2 if player['score_perk_time_left'] > 0 else 1
-    player['score'] += enemy['points'] * score_mult
-    if enemy in enemies:
-        enemies.remove(enemy)
-    if enemy is boss_entity:
-        boss_entity = None
-    enemies_killed_this_level += 1
-    update_perks()
-
-def handle_player_hit(damage):
-    """Apply damage to the player unless in cheat mode. On death, record score and
-    start a game-over transition."""
-    global player, game_state
-    if cheat_mode:
-        return  # godmode in cheat
-    player['health'] -= damage
-    if player['health'] <= 0 and game_state == STATE_PLAYING:
-        player['health'] = 0
-        # Record score on death before resetting
-        record_high_score(player['score'])
-        start_transition(STATE_GAME_OVER_TRANSITION, [1.0, 0.0, 0.0])
-
-def check_level_completion():
-    global game_state, win_score_recorded
-    level_conf=level_configs[current_level]
-    if enemies_spawned_this_level>=level_conf['total_enemies'] and not enemies and game_state==STATE_PLAYING:
-        if current_level==max_levels: 
-            game_state=STATE_YOU_WIN
-            record_high_score(player['score'])
-        else: 
-            start_transition(STATE_LEVEL_TRANSITION,[0.0,1.0,0.0])
-
-def start_transition(target_state,color):
-    global game_state,transition_timer,transition_color,next_game_state_after_transition
-    game_state=target_state
-    transition_timer=TRANSITION_DURATION
-    transition_color=color
-    if target_state==STATE_LEVEL_TRANSITION: 
-        next_game_state_after_transition=STATE_PLAYING 
-    elif target_state==STATE_GAME_OVER_TRANSITION: 
-        next_game_state_after_transition=STATE_PLAYING
-
-def update_game_state(delta_time):
-    """Main per-frame state machine: updates during play, and counts down
-    transitions between levels or after death."""
-    global player, transition_timer, current_level, cheat_fire_timer
-    if game_state==STATE_PLAYING: 
-        update_player(delta_time)
-        update_enemies(delta_time)
-        # Cheat auto-fire: periodically shoot at nearest enemy
-        global cheat_fire_timer
-        if cheat_mode and enemies:
-            cheat_fire_timer += delta_time
-            if cheat_fire_timer >= CHEAT_SHOOT_INTERVAL:
-                cheat_fire_timer = 0.0
-                # find nearest enemy on XZ
-                px, pz = player['pos'][0], player['pos'][2]
-                nearest = None
-                nearest_d2 = 1e18
-                for e in enemies:
-                    dx = e['pos'][0] - px
-                    dz = e['pos'][2] - pz
-                    d2 = dx*dx + dz*dz
-                    if d2 < nearest_d2:
-                        nearest = e
-                        nearest_d2 = d2
-                if nearest is not None:
-                    # Smoothly rotate player to face the target for realism
-                    target_yaw = math.degrees(math.atan2(nearest['pos'][0] - player['pos'][0], nearest['pos'][2] - player['pos'][2]))
-                    # Normalize angles to [-180,180] difference
-                    cur_yaw = player['rotation_y']
-                    diff = ((target_yaw - cur_yaw + 180.0) % 360.0) - 180.0
-                    rot_speed_deg_per_sec = 180.0  # turn speed while cheating
-                    step = max(-rot_speed_deg_per_sec * delta_time, min(rot_speed_deg_per_sec * delta_time, diff))
-                    player['rotation_y'] = (cur_yaw + step) % 360.0
-                    # Ensure bullet direction aligns to current rotation (gun and rotation synced)
-                    # compute direction from player's gun tip toward enemy center
-                    yaw_rad = math.radians(player['rotation_y'])
-                    gun_base_offset = 0.35 * PLAYER_TOTAL_HEIGHT
-                    gun_length = PLAYER_GUN_LENGTH
-                    shoulder_height = PLAYER_LEG_LENGTH + PLAYER_TORSO_HEIGHT * 0.8
-                    gun_y = player['pos'][1] - PLAYER_BODY_Y_OFFSET + shoulder_height
-                    dir_x = math.sin(yaw_rad)
-                    dir_z = math.cos(yaw_rad)
-                    gun_base_x = player['pos'][0] + dir_x * gun_base_offset
-                    gun_base_z = player['pos'][2] + dir_z * gun_base_offset
-                    tip_world_x = gun_base_x + dir_x * gun_length
-                    tip_world_y = gun_y
-                    tip_world_z = gun_base_z + dir_z * gun_length
-                    to_enemy = [nearest['pos'][0]-tip_world_x, (nearest['pos'][1]-nearest['model_height']/2 + nearest['model_height']*0.5)-tip_world_y, nearest['pos'][2]-tip_world_z]
-                    fire_dir = normalize_vector(to_enemy)
-                    create_bullet([tip_world_x, tip_world_y, tip_world_z], fire_dir, 'PLAYER', 1)
-        update_bullets(delta_time)
-        check_level_completion()
-    elif game_state==STATE_LEVEL_TRANSITION:
-        global transition_timer, current_level
-        transition_timer-=delta_time
-        if transition_timer<=0: 
-            current_level+=1
-            init_level(current_level)
-    elif game_state==STATE_GAME_OVER_TRANSITION:
-        transition_timer-=delta_time
-        if transition_timer<=0: 
-            player['health']=PLAYER_MAX_HEALTH
-            player['score']=0
-            init_level(current_level)
-
-def update_perks():
-    """Update perk availability based on enemy kills"""
-    global player
-    
-    # Track kills for each perk type
-    player['kills_for_health_perk'] += 1
-    player['kills_for_score_perk'] += 1
-    player['kills_for_gun_perk'] += 1
-    
-    # Health perk becomes available every 5 kills
-    if player['kills_for_health_perk'] >= 3:
-        player['health_perk_available'] = True
-    
-    # Score multiplier perk becomes available every 3 kills
-    if player['kills_for_score_perk'] >= 4:
-        player['score_perk_available'] = True
-    
-    # Rapid fire perk becomes available every 4 kills
-    if player['kills_for_gun_perk'] >= 5:
-        player['gun_perk_available'] = True
+def end_2d():
+    if gpu is not None:
+        gpu.end_2d()
+        return
+    glPopAttrib()
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
 
 # --- Drawing Functions ---
+def draw_text_layers(x, y, text, layers, font=GLUT_BITMAP_HELVETICA_18):
+    """Draw text once per (dx, dy, color) layer, back to front, as a single cached
+    atlas run; falls back to per-glyph GLUT bitmaps if the font has no atlas."""
+    if gpu is not None:
+        # Core profiles have no raster bitmaps: text without an atlas is skipped
+        run = text_atlas.text_run(text, layers, font)
+        if run is not None:
+            gpu.ui.text(x, y, run)
+        return
+    if text_atlas.draw_text_run(x, y, text, layers, font):
+        return
+    for dx, dy, color in layers:
+        glColor3f(*color)
+        glRasterPos2f(x+dx, y+dy)
+        [glutBitmapCharacter(font,ord(c)) for c in text]
+
 def draw_text(x,y,text,r=1,g=1,b=1,font=GLUT_BITMAP_HELVETICA_18): 
-    glColor3f(r,g,b)
-    glRasterPos2f(x,y)
-    [glutBitmapCharacter(font,ord(c)) for c in text]
+    draw_text_layers(x, y, text, ((0, 0, (r, g, b)),), font)
 
 def draw_filled_rect(x, y, w, h, r, g, b, a=1.0):
+    if gpu is not None:
+        gpu.ui.rect(x, y, w, h, (r, g, b, a))
+        return
     glColor4f(r, g, b, a)
     glBegin(GL_QUADS)
     glVertex2f(x, y)
@@ -721,69 +294,45 @@ def draw_filled_rect(x, y, w, h, r, g, b, a=1.0):
     glVertex2f(x, y + h)
     glEnd()
 
+def draw_lines(points, r, g, b):
+    """Separate line segments between consecutive pairs of (x, y) points."""
+    if gpu is not None:
+        gpu.ui.lines(points, (r, g, b))
+        return
+    glColor3f(r, g, b)
+    glBegin(GL_LINES)
+    for x, y in points:
+        glVertex2f(x, y)
+    glEnd()
+
+def draw_rect_outline(x, y, w, h, r, g, b):
+    draw_lines(((x, y), (x + w, y), (x + w, y), (x + w, y + h),
+                (x + w, y + h), (x, y + h), (x, y + h), (x, y)), r, g, b)
+
 def draw_text_shadowed(x, y, text, r=1, g=1, b=1, font=GLUT_BITMAP_HELVETICA_18):
     # Enhanced drop shadow with glow effect
-    glColor3f(0,0,0)
-    glRasterPos2f(x+3, y-3)
-    [glutBitmapCharacter(font,ord(c)) for c in text]
-    glColor3f(0.1,0.1,0.1)
-    glRasterPos2f(x+2, y-2)
-    [glutBitmapCharacter(font,ord(c)) for c in text]
-    glColor3f(r,g,b)
-    glRasterPos2f(x, y)
-    [glutBitmapCharacter(font,ord(c)) for c in text]
+    draw_text_layers(x, y, text, ((3, -3, (0, 0, 0)),
+                                  (2, -2, (0.1, 0.1, 0.1)),
+                                  (0, 0, (r, g, b))), font)
 
 def draw_large_text(x, y, text, r=1, g=1, b=1):
     # Draw large title text with multiple shadow layers
-    glColor3f(0,0,0)
-    glRasterPos2f(x+4, y-4)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
-    glColor3f(0.1,0.1,0.1)
-    glRasterPos2f(x+3, y-3)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
-    glColor3f(0.2,0.2,0.2)
-    glRasterPos2f(x+2, y-2)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
-    glColor3f(r,g,b)
-    glRasterPos2f(x, y)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
+    draw_text_layers(x, y, text, ((4, -4, (0, 0, 0)),
+                                  (3, -3, (0.1, 0.1, 0.1)),
+                                  (2, -2, (0.2, 0.2, 0.2)),
+                                  (0, 0, (r, g, b))))
 
 def draw_giant_title(x, y, text, r=1, g=1, b=1):
     # Draw ultra-large title text with massive dramatic shadows
-    # Multiple shadow layers for depth
-    glColor3f(0,0,0)
-    glRasterPos2f(x+8, y-8)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
-    glColor3f(0.05,0.05,0.05)
-    glRasterPos2f(x+7, y-7)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
-    glColor3f(0.1,0.1,0.1)
-    glRasterPos2f(x+6, y-6)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
-    glColor3f(0.15,0.15,0.15)
-    glRasterPos2f(x+5, y-5)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
-    glColor3f(0.2,0.2,0.2)
-    glRasterPos2f(x+4, y-4)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
-    glColor3f(0.25,0.25,0.25)
-    glRasterPos2f(x+3, y-3)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
-    glColor3f(0.3,0.3,0.3)
-    glRasterPos2f(x+2, y-2)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
-    # Main text with slight glow effect
-    glColor3f(r*1.1, g*1.1, b*1.1)
-    glRasterPos2f(x+1, y+1)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
-    glColor3f(r,g,b)
-    glRasterPos2f(x, y)
-    [glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18,ord(c)) for c in text]
+    # Multiple shadow layers for depth, then main text with slight glow effect
+    shadows = tuple((d, -d, (shade, shade, shade)) for d, shade in
+                    ((8, 0.0), (7, 0.05), (6, 0.1), (5, 0.15), (4, 0.2), (3, 0.25), (2, 0.3)))
+    draw_text_layers(x, y, text, shadows + ((1, 1, (r*1.1, g*1.1, b*1.1)),
+                                            (0, 0, (r, g, b))))
 
 def get_text_width(text, font=GLUT_BITMAP_HELVETICA_18):
-    # Calculate text width for centering (estimated)
-    # Approximate character width for HELVETICA_18 is about 10 pixels
-    return len(text) * 10
+    # Text width for centering, from the font's real glyph advances
+    return text_atlas.text_width(text, font)
 
 def ui_reset_buttons():
     del ui_buttons[:]
@@ -797,15 +346,9 @@ def ui_add_button(label, x, y, w, h, action, color=(0.2,0.2,0.2), text_color=(1,
     # Button background
     draw_filled_rect(x, y, w, h, bg[0], bg[1], bg[2], 0.92 if is_hover else 0.85)
     # Simple border
-    glColor3f(1,1,1)
-    glBegin(GL_LINE_LOOP)
-    glVertex2f(x, y)
-    glVertex2f(x + w, y)
-    glVertex2f(x + w, y + h)
-    glVertex2f(x, y + h)
-    glEnd()
+    draw_rect_outline(x, y, w, h, 1, 1, 1)
     # Text centered-ish
-    text_w = len(label) * 9
+    text_w = get_text_width(label)
     text_h = 18
     draw_text(x + (w - text_w) / 2, y + (h - text_h) / 2 + 6, label, text_color[0], text_color[1], text_color[2])
     ui_buttons.append({'label': label, 'x': x, 'y': y, 'w': w, 'h': h, 'action': action})
@@ -813,51 +356,33 @@ def ui_add_button(label, x, y, w, h, action, color=(0.2,0.2,0.2), text_color=(1,
 def point_in_rect(px, py, rect):
     return rect['x'] <= px <= rect['x'] + rect['w'] and rect['y'] <= py <= rect['y'] + rect['h']
 
-def record_high_score(score):
-    """Append a score to HoF (guarding duplicates), keep top 3 by score then recency."""
-    global hof_seq, hof_records, current_session_score_recorded
-    if score <= 0 or current_session_score_recorded:
-        return
-    current_session_score_recorded = True
-    hof_seq += 1
-    hof_records.append({'score': int(score), 'seq': hof_seq})
-    # Keep only the top 3 by score, break ties by recency (higher seq wins)
-    hof_records.sort(key=lambda r: (r['score'], r['seq']), reverse=True)
-    del hof_records[3:]
-
-def top_three_scores():
-    """Return the already-sorted, already-trimmed top 3 score records."""
-    return hof_records
-
-def draw_cylinder(base_r,top_r,height,slices,stacks,color):
-    global glu_quadric
-    glColor3fv(color)
-    glPushMatrix()
-
-    glRotatef(-90,1,0,0) 
-    gluCylinder(glu_quadric,base_r,top_r,height,slices,stacks)
-    gluDisk(glu_quadric,0,base_r,slices,1)
-    glTranslatef(0,0,height)
-    gluDisk(glu_quadric,0,top_r,slices,1)
-    glPopMatrix()
-
-def draw_tapered_cylinder(base_radius, top_radius, height, color):
-    global glu_quadric
-    glColor3fv(color)
-    glPushMatrix()
-    glRotatef(-90, 1, 0, 0)
-    gluCylinder(glu_quadric, base_radius, top_radius, height, 20, 8)
+def build_cylinder(m, base_r,top_r,height,slices,stacks,color):
+    m.color(color)
+    m.push()
+
+    m.rotate(-90,1,0,0) 
+    m.cylinder(base_r,top_r,height,slices,stacks)
+    m.disk(base_r, slices)
+    m.translate(0,0,height)
+    m.disk(top_r, slices)
+    m.pop()
+
+def build_tapered_cylinder(m, base_radius, top_radius, height, color, slices=20, stacks=8):
+    m.color(color)
+    m.push()
+    m.rotate(-90, 1, 0, 0)
+    m.cylinder(base_radius, top_radius, height, slices, stacks)
     # Base cap
-    gluDisk(glu_quadric, 0, base_radius, 20, 8)
+    m.disk(base_radius, slices)
     # Top cap
-    glTranslatef(0, 0, height)
-    gluDisk(glu_quadric, 0, top_radius, 20, 8)
-    glPopMatrix()
-
-def draw_player():
-    """Render the player model using simple GL primitives, positioned at origin.
-    The caller is responsible for transforming to the player's world position."""
-    glPushMatrix()
+    m.translate(0, 0, height)
+    m.disk(top_radius, slices)
+    m.pop()
+
+def build_player(m):
+    """Build the player model into MeshBuilder m from simple primitives,
+    positioned at origin. The caller transforms it to the player's world position."""
+    m.push()
     
     # Scale everything relative to PLAYER_TOTAL_HEIGHT
     model_scale = PLAYER_TOTAL_HEIGHT
@@ -867,86 +392,88 @@ def draw_player():
     head_radius = 0.15 * model_scale
     
     # Body (centered at origin)
-    glPushMatrix()
-    glTranslatef(0, PLAYER_LEG_LENGTH + torso_height/2, 0)
-    glColor3f(0.5, 0.5, 0.0)
-    glScalef(0.3 * model_scale, torso_height, 0.25 * model_scale)
-    glutSolidCube(1.0)
-    glPopMatrix()
+    m.push()
+    m.translate(0, PLAYER_LEG_LENGTH + torso_height/2, 0)
+    m.color((0.5, 0.5, 0.0))
+    m.scale(0.3 * model_scale, torso_height, 0.25 * model_scale)
+    m.cube(1.0)
+    m.pop()
 
     # Head (directly above body)
-    glPushMatrix()
-    glTranslatef(0, PLAYER_LEG_LENGTH + torso_height + head_radius, 0)
-    glColor3f(0.8, 0.6, 0.4)
-    glutSolidSphere(head_radius, 20, 20)
+    m.push()
+    m.translate(0, PLAYER_LEG_LENGTH + torso_height + head_radius, 0)
+    m.color((0.8, 0.6, 0.4))
+    m.sphere(head_radius, 20, 20)
     # Visor
-    glPushMatrix()
-    glTranslatef(0, 0.02 * PLAYER_TOTAL_HEIGHT, 0.11 * PLAYER_TOTAL_HEIGHT)
-    glColor3f(0.1, 0.8, 0.9)
-    glScalef(0.18 * PLAYER_TOTAL_HEIGHT, 0.09 * PLAYER_TOTAL_HEIGHT, 0.02 * PLAYER_TOTAL_HEIGHT)
-    glutSolidCube(1.0)
-    glPopMatrix()
-    glPopMatrix()
+    m.push()
+    m.translate(0, 0.02 * PLAYER_TOTAL_HEIGHT, 0.11 * PLAYER_TOTAL_HEIGHT)
+    m.color((0.1, 0.8, 0.9))
+    m.scale(0.18 * PLAYER_TOTAL_HEIGHT, 0.09 * PLAYER_TOTAL_HEIGHT, 0.02 * PLAYER_TOTAL_HEIGHT)
+    m.cube(1.0)
+    m.pop()
+    m.pop()
 
     # Arms (at shoulder height - moved forward)
     shoulder_height = PLAYER_LEG_LENGTH + torso_height * 0.8
     
     # Left arm - moved forward
-    glPushMatrix()
-    glTranslatef(-0.15 * model_scale, shoulder_height, 0.15 * model_scale)
-    glRotatef(15, 0, 1, 0)
-    glRotatef(90, 1, 0, 0)
-    draw_cylinder(0.05 * model_scale, 0.04 * model_scale, PLAYER_ARM_LENGTH * 0.7, 8, 1, (0.8, 0.6, 0.4))
-    glPopMatrix()
+    m.push()
+    m.translate(-0.15 * model_scale, shoulder_height, 0.15 * model_scale)
+    m.rotate(15, 0, 1, 0)
+    m.rotate(90, 1, 0, 0)
+    build_cylinder(m, 0.05 * model_scale, 0.04 * model_scale, PLAYER_ARM_LENGTH * 0.7, 8, 1, (0.8, 0.6, 0.4))
+    m.pop()
 
     # Right arm - moved forward
-    glPushMatrix()
-    glTranslatef(0.15 * model_scale, shoulder_height, 0.15 * model_scale)
-    glRotatef(-15, 0, 1, 0)
-    glRotatef(90, 1, 0, 0)
-    draw_cylinder(0.05 * model_scale, 0.04 * model_scale, PLAYER_ARM_LENGTH * 0.7, 8, 1, (0.8, 0.6, 0.4))
-    glPopMatrix()
+    m.push()
+    m.translate(0.15 * model_scale, shoulder_height, 0.15 * model_scale)
+    m.rotate(-15, 0, 1, 0)
+    m.rotate(90, 1, 0, 0)
+    build_cylinder(m, 0.05 * model_scale, 0.04 * model_scale, PLAYER_ARM_LENGTH * 0.7, 8, 1, (0.8, 0.6, 0.4))
+    m.pop()
 
     # Gun (centered between arms and moved forward) with muzzle
-    glPushMatrix()
-    glTranslatef(0, shoulder_height, 0.35 * model_scale)
-    glRotatef(90, 1, 0, 0)
-    draw_cylinder(0.05 * model_scale, 0.03 * model_scale, PLAYER_GUN_LENGTH, 8, 1, (0.3, 0.3, 0.3))
+    m.push()
+    m.translate(0, shoulder_height, 0.35 * model_scale)
+    m.rotate(90, 1, 0, 0)
+    build_cylinder(m, 0.05 * model_scale, 0.03 * model_scale, PLAYER_GUN_LENGTH, 8, 1, (0.3, 0.3, 0.3))
     # Muzzle highlight
-    glTranslatef(0, 0, PLAYER_GUN_LENGTH)
-    glColor3f(1.0, 0.8, 0.2)
-    glutSolidSphere(0.02 * model_scale, 10, 10)
-    glPopMatrix()
+    m.translate(0, 0, PLAYER_GUN_LENGTH)
+    m.color((1.0, 0.8, 0.2))
+    m.sphere(0.02 * model_scale, 10, 10)
+    m.pop()
 
     # Backpack
-    glPushMatrix()
-    glTranslatef(0, PLAYER_LEG_LENGTH + torso_height*0.4, -0.18 * model_scale)
-    glColor3f(0.2, 0.2, 0.25)
-    glScalef(0.20 * model_scale, 0.35 * model_scale, 0.12 * model_scale)
-    glutSolidCube(1.0)
-    glPopMatrix()
+    m.push()
+    m.translate(0, PLAYER_LEG_LENGTH + torso_height*0.4, -0.18 * model_scale)
+    m.color((0.2, 0.2, 0.25))
+    m.scale(0.20 * model_scale, 0.35 * model_scale, 0.12 * model_scale)
+    m.cube(1.0)
+    m.pop()
 
     # Legs (starting from bottom of body)
     leg_start_height = PLAYER_LEG_LENGTH
     
     # Left leg
-    glPushMatrix()
-    glTranslatef(-0.1 * model_scale, leg_start_height, 0)
-    glRotatef(180, 1, 0, 0)
-    draw_cylinder(0.06 * model_scale, 0.05 * model_scale, PLAYER_LEG_LENGTH, 8, 1, (0.3, 0.3, 0.8))
-    glPopMatrix()
+    m.push()
+    m.translate(-0.1 * model_scale, leg_start_height, 0)
+    m.rotate(180, 1, 0, 0)
+    build_cylinder(m, 0.06 * model_scale, 0.05 * model_scale, PLAYER_LEG_LENGTH, 8, 1, (0.3, 0.3, 0.8))
+    m.pop()
 
     # Right leg
-    glPushMatrix()
-    glTranslatef(0.1 * model_scale, leg_start_height, 0)
-    glRotatef(180, 1, 0, 0)
-    draw_cylinder(0.06 * model_scale, 0.05 * model_scale, PLAYER_LEG_LENGTH, 8, 1, (0.3, 0.3, 0.8))
-    glPopMatrix()
+    m.push()
+    m.translate(0.1 * model_scale, leg_start_height, 0)
+    m.rotate(180, 1, 0, 0)
+    build_cylinder(m, 0.06 * model_scale, 0.05 * model_scale, PLAYER_LEG_LENGTH, 8, 1, (0.3, 0.3, 0.8))
+    m.pop()
 
-    glPopMatrix()
+    m.pop()
 
-def draw_wolf(total_h, body_c, leg_c, face_c, gun_c, variant=1):
-    """Render a stylized enemy at origin using basic shapes. Variant subtly changes look."""
+def build_wolf(m, total_h, body_c, leg_c, face_c, gun_c, variant=1, detail=LOD_FULL):
+    """Build a stylized enemy at origin into MeshBuilder m. Variant subtly changes look.
+    detail is the LOD: LOD_REDUCED uses coarse tessellation and drops the pupils,
+    back ridge and side stripes; LOD_IMPOSTOR is a single box in the body color."""
 
     body_width = total_h * 0.35
     body_height = total_h * 0.35
@@ -964,37 +491,54 @@ def draw_wolf(total_h, body_c, leg_c, face_c, gun_c, variant=1):
     # Body positioning
     body_center_y = leg_len + body_height/2
 
-    # Body
-    glPushMatrix()
-    glTranslatef(0, body_center_y, 0)
     # Variant-based body tint
     tint = [1.0,1.0,1.0]
     if variant==2:
         tint=[1.1,0.95,0.95]
     elif variant==3:
         tint=[0.95,0.95,1.1]
-    glColor3f(darkened_body_c[0]*tint[0], darkened_body_c[1]*tint[1], darkened_body_c[2]*tint[2])
-    glScalef(body_width, body_height, body_depth)
-    glutSolidCube(1.0)
-    glPopMatrix()
+
+    if detail == LOD_IMPOSTOR:
+        # One box from the feet to the top of the body, tail end to snout
+        front_z = body_depth/2 + face_size*0.55
+        m.push()
+        m.translate(0, (leg_len + body_height)/2, (front_z - body_depth/2)/2)
+        m.color((darkened_body_c[0]*tint[0], darkened_body_c[1]*tint[1], darkened_body_c[2]*tint[2]))
+        m.scale(body_width, leg_len + body_height, front_z + body_depth/2)
+        m.cube(1.0)
+        m.pop()
+        return
+    full = detail == LOD_FULL
+    # Tessellation of the tapered parts (ears, tail, legs), spheres and the gun
+    slices, stacks = (20, 8) if full else (6, 1)
+    sphere_slices = 12 if full else 6
+    gun_slices = 8 if full else 4
+
+    # Body
+    m.push()
+    m.translate(0, body_center_y, 0)
+    m.color((darkened_body_c[0]*tint[0], darkened_body_c[1]*tint[1], darkened_body_c[2]*tint[2]))
+    m.scale(body_width, body_height, body_depth)
+    m.cube(1.0)
+    m.pop()
 
     # Face
     face_center_y = body_center_y
     face_center_z = body_depth/2 + face_size/4
-    glPushMatrix()
-    glTranslatef(0, face_center_y, face_center_z)
-    glColor3fv(darkened_face_c)
-    glScalef(face_size, face_size, face_size * 0.5)
-    glutSolidCube(1.0)
-    glPopMatrix()
+    m.push()
+    m.translate(0, face_center_y, face_center_z)
+    m.color(darkened_face_c)
+    m.scale(face_size, face_size, face_size * 0.5)
+    m.cube(1.0)
+    m.pop()
 
     # Muzzle (protruding cube)
-    glPushMatrix()
-    glTranslatef(0, face_center_y - face_size*0.12, face_center_z + face_size*0.35)
-    glColor3f(darkened_face_c[0]*1.1, darkened_face_c[1]*1.1, darkened_face_c[2]*1.1)
-    glScalef(face_size*0.55, face_size*0.35, face_size*0.4)
-    glutSolidCube(1.0)
-    glPopMatrix()
+    m.push()
+    m.translate(0, face_center_y - face_size*0.12, face_center_z + face_size*0.35)
+    m.color((darkened_face_c[0]*1.1, darkened_face_c[1]*1.1, darkened_face_c[2]*1.1))
+    m.scale(face_size*0.55, face_size*0.35, face_size*0.4)
+    m.cube(1.0)
+    m.pop()
 
     # Eyes (white spheres with black pupils)
     eye_offset_x = face_size*0.18
@@ -1003,14 +547,15 @@ def draw_wolf(total_h, body_c, leg_c, face_c, gun_c, variant=1):
     eye_r = face_size*0.07
     pupil_r = eye_r*0.45
     for sx in (-1, 1):
-        glPushMatrix()
-        glTranslatef(sx*eye_offset_x, eye_y, eye_z)
-        glColor3f(1.0, 1.0, 1.0)
-        glutSolidSphere(eye_r, 12, 12)
-        glColor3f(0.0, 0.0, 0.0)
-        glTranslatef(0, 0, pupil_r*0.3)
-        glutSolidSphere(pupil_r, 10, 10)
-        glPopMatrix()
+        m.push()
+        m.translate(sx*eye_offset_x, eye_y, eye_z)
+        m.color((1.0, 1.0, 1.0))
+        m.sphere(eye_r, sphere_slices, sphere_slices)
+        if full:
+            m.color((0.0, 0.0, 0.0))
+            m.translate(0, 0, pupil_r*0.3)
+            m.sphere(pupil_r, 10, 10)
+        m.pop()
 
     # Ears (tapered cones on head top)
     ear_r_base = face_size*0.12
@@ -1019,54 +564,56 @@ def draw_wolf(total_h, body_c, leg_c, face_c, gun_c, variant=1):
     ear_y = face_center_y + face_size*0.6
     ear_z = face_center_z - face_size*0.20
     for sx in (-1, 1):
-        glPushMatrix()
-        glTranslatef(sx*face_size*0.30, ear_y, ear_z)
-        glRotatef(-90, 1, 0, 0)
-        draw_tapered_cylinder(ear_r_base, ear_r_top, ear_h, darkened_face_c)
-        glPopMatrix()
+        m.push()
+        m.translate(sx*face_size*0.30, ear_y, ear_z)
+        m.rotate(-90, 1, 0, 0)
+        build_tapered_cylinder(m, ear_r_base, ear_r_top, ear_h, darkened_face_c, slices, stacks)
+        m.pop()
 
     # Gun
     gun_start_y = face_center_y
     gun_start_z = face_center_z + face_size/4
-    glPushMatrix()
-    glTranslatef(0, gun_start_y, gun_start_z)
-    glRotatef(90, 1, 0, 0)
-    draw_cylinder(gun_r, gun_r * 0.8, gun_len, 8, 1, gun_c)
-    glPopMatrix()
+    m.push()
+    m.translate(0, gun_start_y, gun_start_z)
+    m.rotate(90, 1, 0, 0)
+    build_cylinder(m, gun_r, gun_r * 0.8, gun_len, gun_slices, 1, gun_c)
+    m.pop()
 
     # Tail (tapered cylinder at rear)
     tail_r_base = total_h * 0.05
     tail_r_top = tail_r_base * 0.4
     tail_len = total_h * (0.5 if variant!=2 else 0.7)
-    glPushMatrix()
-    glTranslatef(0, body_center_y + body_height*0.05, -body_depth*0.55)
-    glRotatef(60, 1, 0, 0)
-    draw_tapered_cylinder(tail_r_base, tail_r_top, tail_len, [c*0.6 for c in body_c])
-    glPopMatrix()
+    m.push()
+    m.translate(0, body_center_y + body_height*0.05, -body_depth*0.55)
+    m.rotate(60, 1, 0, 0)
+    build_tapered_cylinder(m, tail_r_base, tail_r_top, tail_len, [c*0.6 for c in body_c], slices, stacks)
+    m.pop()
 
     # Back ridge (small plates along spine)
     ridge_count = 4 if variant==1 else (6 if variant==3 else 3)
+    if not full:
+        ridge_count = 0
     for i in range(ridge_count):
         t = (i + 0.5) / ridge_count
         rz = body_depth*(t - 0.5) * 0.8
-        glPushMatrix()
-        glTranslatef(0, body_center_y + body_height*0.45, rz)
-        glColor3f(0.1, 0.1, 0.1)
-        glScalef(body_width*0.15, body_height*0.1, body_depth*0.10)
-        glutSolidCube(1.0)
-        glPopMatrix()
+        m.push()
+        m.translate(0, body_center_y + body_height*0.45, rz)
+        m.color((0.1, 0.1, 0.1))
+        m.scale(body_width*0.15, body_height*0.1, body_depth*0.10)
+        m.cube(1.0)
+        m.pop()
 
     # Accent stripes on sides
     stripe_y = body_center_y
-    for sx in (-1, 1):
+    for sx in ((-1, 1) if full else ()):
         for i in range(2):
             zf = [-0.15, 0.25][i]
-            glPushMatrix()
-            glTranslatef(sx*body_width*0.55, stripe_y, body_depth*zf)
-            glColor3f(darkened_body_c[0]*0.8, darkened_body_c[1]*0.8, darkened_body_c[2]*0.8)
-            glScalef(body_width*0.05, body_height*0.6, body_depth*0.15)
-            glutSolidCube(1.0)
-            glPopMatrix()
+            m.push()
+            m.translate(sx*body_width*0.55, stripe_y, body_depth*zf)
+            m.color((darkened_body_c[0]*0.8, darkened_body_c[1]*0.8, darkened_body_c[2]*0.8))
+            m.scale(body_width*0.05, body_height*0.6, body_depth*0.15)
+            m.cube(1.0)
+            m.pop()
 
     # Legs
     leg_attach_y = body_center_y - body_height/2
@@ -1075,191 +622,389 @@ def draw_wolf(total_h, body_c, leg_c, face_c, gun_c, variant=1):
     leg_x = body_width * 0.4
 
     # Front Right Leg
-    glPushMatrix()
-    glTranslatef(leg_x, leg_attach_y, front_leg_z)
-    glRotatef(180, 1, 0, 0)
-    draw_tapered_cylinder(leg_r, leg_r * 0.7, leg_len, black_legs_c)
-    glPopMatrix()
+    m.push()
+    m.translate(leg_x, leg_attach_y, front_leg_z)
+    m.rotate(180, 1, 0, 0)
+    build_tapered_cylinder(m, leg_r, leg_r * 0.7, leg_len, black_legs_c, slices, stacks)
+    m.pop()
 
     # Front Left Leg
-    glPushMatrix()
-    glTranslatef(-leg_x, leg_attach_y, front_leg_z)
-    glRotatef(180, 1, 0, 0)
-    draw_tapered_cylinder(leg_r, leg_r * 0.7, leg_len, black_legs_c)
-    glPopMatrix()
+    m.push()
+    m.translate(-leg_x, leg_attach_y, front_leg_z)
+    m.rotate(180, 1, 0, 0)
+    build_tapered_cylinder(m, leg_r, leg_r * 0.7, leg_len, black_legs_c, slices, stacks)
+    m.pop()
 
     # Rear Right Leg
-    glPushMatrix()
-    glTranslatef(leg_x, leg_attach_y, rear_leg_z)
-    glRotatef(180, 1, 0, 0)
-    draw_tapered_cylinder(leg_r, leg_r * 0.7, leg_len, black_legs_c)
-    glPopMatrix()
+    m.push()
+    m.translate(leg_x, leg_attach_y, rear_leg_z)
+    m.rotate(180, 1, 0, 0)
+    build_tapered_cylinder(m, leg_r, leg_r * 0.7, leg_len, black_legs_c, slices, stacks)
+    m.pop()
 
     # Rear Left Leg
-    glPushMatrix()
-    glTranslatef(-leg_x, leg_attach_y, rear_leg_z)
-    glRotatef(180, 1, 0, 0)
-    draw_tapered_cylinder(leg_r, leg_r * 0.7, leg_len, black_legs_c)
-    glPopMatrix()
-
-
-def draw_dungeon():
-    """Render floor, walls and obstacles with colors based on the current theme group."""
-    # Define color schemes based on level (Earth, Mud, Heaven, Hell)
-    if current_level <= 3:
-        # Earth (lush greens)
-        tile_color1 = (0.40, 0.80, 0.40)
-        tile_color2 = (0.20, 0.55, 0.25)
-        wall_color1 = (0.12, 0.28, 0.12)
-        wall_color2 = (0.16, 0.36, 0.18)
-    elif current_level <= 6:
-        # Mud (rich browns, clay, ochre)
-        tile_color1 = (0.62, 0.45, 0.28)
-        tile_color2 = (0.45, 0.30, 0.18)
-        wall_color1 = (0.35, 0.18, 0.12)
-        wall_color2 = (0.42, 0.22, 0.15)
-    elif current_level <= 9:
-        # Heaven (soft blues/whites)
-        tile_color1 = (0.80, 0.88, 1.00)
-        tile_color2 = (0.65, 0.80, 0.95)
-        wall_color1 = (0.60, 0.80, 0.95)
-        wall_color2 = (0.72, 0.88, 1.00)
-    else:
-        # Hell (crimson/embers)
-        tile_color1 = (0.70, 0.20, 0.20)
-        tile_color2 = (0.45, 0.10, 0.10)
-        wall_color1 = (0.55, 0.05, 0.06)
-        wall_color2 = (0.68, 0.12, 0.10)
-
-    # Floor with checkered pattern
-    glBegin(GL_QUADS)
-    glNormal3f(0, 1, 0)
-    for x in range(int(DUNGEON_SIZE_X/TILE_SIZE)):
-        for z in range(int(DUNGEON_SIZE_Z/TILE_SIZE)):
-            # Alternate between colors
-            if (x + z) % 2 == 0:
-                glColor3f(*tile_color1)
-            else:
-                glColor3f(*tile_color2)
-            
-            x1 = x * TILE_SIZE
-            x2 = (x + 1) * TILE_SIZE
-            z1 = z * TILE_SIZE
-            z2 = (z + 1) * TILE_SIZE
-            
-            glVertex3f(x1, 0, z1)
-            glVertex3f(x2, 0, z1)
-            glVertex3f(x2, 0, z2)
-            glVertex3f(x1, 0, z2)
-    glEnd()
-
-    # Walls with alternating pattern and subtle top trim
-    wall_sections = 20  # Number of wall sections
-    section_length = DUNGEON_SIZE_X / wall_sections
-    
-    for i in range(wall_sections):
+    m.push()
+    m.translate(-leg_x, leg_attach_y, rear_leg_z)
+    m.rotate(180, 1, 0, 0)
+    build_tapered_cylinder(m, leg_r, leg_r * 0.7, leg_len, black_legs_c, slices, stacks)
+    m.pop()
+
+
+def build_floor(m, x0, z0, size_x, size_z, tile_color1, tile_color2):
+    """Checkered floor tiles covering [x0, x0+size_x] x [z0, z0+size_z]. The
+    checker follows map tile coordinates, so adjacent chunks line up."""
+    tx0 = int(x0 // TILE_SIZE)
+    tz0 = int(z0 // TILE_SIZE)
+    x, z = np.meshgrid(np.arange(tx0, tx0 + int(size_x/TILE_SIZE)), np.arange(tz0, tz0 + int(size_z/TILE_SIZE)), indexing='ij')
+    x = x.ravel()
+    z = z.ravel()
+    # Two triangles per tile, corners (x1, z1) (x2, z1) (x2, z2) / (x1, z1) (x2, z2) (x1, z2)
+    corner_x = np.array([0, 1, 1, 0, 1, 0])
+    corner_z = np.array([0, 0, 1, 0, 1, 1])
+    positions = np.zeros((len(x) * 6, 3))
+    positions[:, 0] = ((x[:, None] + corner_x) * TILE_SIZE).ravel()
+    positions[:, 2] = ((z[:, None] + corner_z) * TILE_SIZE).ravel()
+    normals = np.zeros_like(positions)
+    normals[:, 1] = 1.0
+    # Alternate between colors
+    colors = np.where(((x + z) % 2 == 0)[:, None], tile_color1, tile_color2)
+    m.add(positions, normals, np.repeat(colors, 6, axis=0))
+
+def build_obstacles(m, obstacles):
+    for ob in obstacles:
+        m.push()
+        m.translate(ob.pos[0], 0, ob.pos[1])
+        m.color(ob.color)
+        if ob.shape=='cyl':
+            build_cylinder(m, ob.radius, ob.radius, ob.height, 16, 1, ob.color)
+        else:
+            m.push()
+            m.translate(0, ob.height/2, 0)
+            m.scale(ob.radius*2, ob.height, ob.radius*2)
+            m.cube(1.0)
+            m.pop()
+        m.pop()
+
+def build_wall_sections(m, side, i0, i1, wall_color1, wall_color2):
+    """Wall sections i0..i1-1 of one dungeon side, alternating colors; the north
+    wall also gets a subtle top trim."""
+    section_length = DUNGEON_SIZE_X / WALL_SECTIONS
+    for i in range(i0, i1):
         current_wall_color = wall_color1 if (i % 2 == 0) else wall_color2
-        # North wall
-        glColor3f(*current_wall_color)
-            
-        glBegin(GL_QUADS)
-        glNormal3f(0, 0, 1)
-        glVertex3f(i * section_length, 0, 0)
-        glVertex3f((i + 1) * section_length, 0, 0)
-        glVertex3f((i + 1) * section_length, WALL_HEIGHT, 0)
-        glVertex3f(i * section_length, WALL_HEIGHT, 0)
-        glEnd()
-        # Top trim line
-        glBegin(GL_QUADS)
-        glColor3f(0.9,0.9,0.9)
-        glVertex3f(i * section_length, WALL_HEIGHT*0.98, 0)
-        glVertex3f((i + 1) * section_length, WALL_HEIGHT*0.98, 0)
-        glVertex3f((i + 1) * section_length, WALL_HEIGHT, 0)
-        glVertex3f(i * section_length, WALL_HEIGHT, 0)
-        glEnd()
-        
-        # South wall
-        glColor3f(*current_wall_color)
-        glBegin(GL_QUADS)
-        glNormal3f(0, 0, -1)
-        glVertex3f(i * section_length, 0, DUNGEON_SIZE_Z)
-        glVertex3f(i * section_length, WALL_HEIGHT, DUNGEON_SIZE_Z)
-        glVertex3f((i + 1) * section_length, WALL_HEIGHT, DUNGEON_SIZE_Z)
-        glVertex3f((i + 1) * section_length, 0, DUNGEON_SIZE_Z)
-        glEnd()
-        
-        # East and West walls
-        glColor3f(*current_wall_color)
-        glBegin(GL_QUADS)
-        glNormal3f(1, 0, 0)
-        glVertex3f(0, 0, i * section_length)
-        glVertex3f(0, WALL_HEIGHT, i * section_length)
-        glVertex3f(0, WALL_HEIGHT, (i + 1) * section_length)
-        glVertex3f(0, 0, (i + 1) * section_length)
-        glEnd()
-        
-        glColor3f(*current_wall_color)
-        glBegin(GL_QUADS)
-        glNormal3f(-1, 0, 0)
-        glVertex3f(DUNGEON_SIZE_X, 0, i * section_length)
-        glVertex3f(DUNGEON_SIZE_X, 0, (i + 1) * section_length)
-        glVertex3f(DUNGEON_SIZE_X, WALL_HEIGHT, (i + 1) * section_length)
-        glVertex3f(DUNGEON_SIZE_X, WALL_HEIGHT, i * section_length)
-        glEnd()
-
-    # Obstacles
+        m.color(current_wall_color)
+        a = i * section_length
+        b = (i + 1) * section_length
+        if side == 'north':
+            m.quad((a, 0, 0), (b, 0, 0), (b, WALL_HEIGHT, 0), (a, WALL_HEIGHT, 0), (0, 0, 1))
+        elif side == 'south':
+            m.quad((a, 0, DUNGEON_SIZE_Z), (a, WALL_HEIGHT, DUNGEON_SIZE_Z), (b, WALL_HEIGHT, DUNGEON_SIZE_Z), (b, 0, DUNGEON_SIZE_Z), (0, 0, -1))
+        elif side == 'west':
+            m.quad((0, 0, a), (0, WALL_HEIGHT, a), (0, WALL_HEIGHT, b), (0, 0, b), (1, 0, 0))
+        else:
+            m.quad((DUNGEON_SIZE_X, 0, a), (DUNGEON_SIZE_X, 0, b), (DUNGEON_SIZE_X, WALL_HEIGHT, b), (DUNGEON_SIZE_X, WALL_HEIGHT, a), (-1, 0, 0))
+        if side == 'north':
+            # Top trim line
+            m.color((0.9,0.9,0.9))
+            m.quad((a, WALL_HEIGHT*0.98, 0), (b, WALL_HEIGHT*0.98, 0), (b, WALL_HEIGHT, 0), (a, WALL_HEIGHT, 0), (0, 0, 1))
+
+def bake(build, *args):
+    """Vertices of whatever build(m, *args) adds to a fresh MeshBuilder."""
+    m = MeshBuilder()
+    build(m, *args)
+    return m.vertices()
+
+def build_floor_block(m, x0, z0, size_x, size_z, tile_color1, tile_color2, obstacles):
+    build_floor(m, x0, z0, size_x, size_z, tile_color1, tile_color2)
+    build_obstacles(m, obstacles)
+
+def floor_blocks(x0, z0, size_x, size_z, tile_color1, tile_color2, obstacles):
+    """Bake a floor area and its obstacles in FLOOR_BLOCK_SIZE squares, each
+    obstacle with the block under its center. Returns BlockSet entries."""
+    bs = FLOOR_BLOCK_SIZE
+    nx = int(math.ceil(size_x / bs))
+    nz = int(math.ceil(size_z / bs))
+    members = {}
     for ob in obstacles:
-        glPushMatrix()
-        glTranslatef(ob['pos'][0], 0, ob['pos'][1])
-        glColor3fv(ob['color'])
-        if ob['shape']=='cyl':
-            draw_cylinder(ob['radius'], ob['radius'], ob['height'], 16, 1, ob['color'])
+        bx = min(max(int((ob.pos[0] - x0) // bs), 0), nx - 1)
+        bz = min(max(int((ob.pos[1] - z0) // bs), 0), nz - 1)
+        members.setdefault((bx, bz), []).append(ob)
+    blocks = []
+    for bz in range(nz):
+        for bx in range(nx):
+            bx0 = x0 + bx * bs
+            bz0 = z0 + bz * bs
+            w = min(bs, x0 + size_x - bx0)
+            d = min(bs, z0 + size_z - bz0)
+            obs = members.get((bx, bz), ())
+            lo = [bx0, 0.0, bz0]
+            hi = [bx0 + w, 0.0, bz0 + d]
+            for ob in obs:
+                lo[0] = min(lo[0], ob.pos[0] - ob.radius)
+                lo[2] = min(lo[2], ob.pos[1] - ob.radius)
+                hi[0] = max(hi[0], ob.pos[0] + ob.radius)
+                hi[1] = max(hi[1], ob.height)
+                hi[2] = max(hi[2], ob.pos[1] + ob.radius)
+            blocks.append((bake(build_floor_block, bx0, bz0, w, d, tile_color1, tile_color2, obs), lo, hi))
+    return blocks
+
+def wall_blocks(wall_color1, wall_color2):
+    """Bake the four dungeon walls in segments of WALL_BLOCK_SECTIONS sections."""
+    section_length = DUNGEON_SIZE_X / WALL_SECTIONS
+    blocks = []
+    for side in ('north', 'south', 'west', 'east'):
+        for i0 in range(0, WALL_SECTIONS, WALL_BLOCK_SECTIONS):
+            i1 = min(i0 + WALL_BLOCK_SECTIONS, WALL_SECTIONS)
+            a = i0 * section_length
+            b = i1 * section_length
+            x, z = {'north': (None, 0.0), 'south': (None, DUNGEON_SIZE_Z),
+                    'west': (0.0, None), 'east': (DUNGEON_SIZE_X, None)}[side]
+            if x is None:
+                lo, hi = (a, 0.0, z), (b, WALL_HEIGHT, z)
+            else:
+                lo, hi = (x, 0.0, a), (x, WALL_HEIGHT, b)
+            blocks.append((bake(build_wall_sections, side, i0, i1, wall_color1, wall_color2), lo, hi))
+    return blocks
+
+def compile_dungeon():
+    """BlockSet of the current level: floor, obstacles and walls in the colors of
+    its biome (Earth, Mud, Heaven, Hell)."""
+    theme = sim.level_theme()
+    tile_color1, tile_color2 = theme['tile']
+    wall_color1, wall_color2 = theme['wall']
+    blocks = floor_blocks(0, 0, DUNGEON_SIZE_X, DUNGEON_SIZE_Z, tile_color1, tile_color2, sim.obstacles)
+    blocks += wall_blocks(wall_color1, wall_color2)
+    return BlockSet(blocks, upload_mesh)
+
+def wolf_variant(model_height):
+    """Choose the wolf model variant by enemy type/model height range."""
+    if model_height >= 7.0:
+        return 3
+    elif model_height >= 3.0:
+        return 2
+    return 1
+
+def bake_wolf(key):
+    variant, total_h, color, lod = key
+    return bake(build_wolf, total_h,color,[c*0.8 for c in color],[c*1.1 for c in color],[0.1,0.1,0.1], variant, lod)
+
+def wolf_mesh(key):
+    """Mesh for one wolf model (variant, model_height, color, lod), loaded from
+    mesh_cache or baked on first use. Models never change, so meshes live for
+    the whole session."""
+    mesh = wolf_meshes.get(key)
+    if mesh is None:
+        mesh = wolf_meshes[key] = upload_mesh(mesh_cache.get('wolf', (MODEL_VERSION,) + key, lambda: bake_wolf(key)))
+    return mesh
+
+def archetype_mesh(archetype, lod=LOD_FULL):
+    model_height = archetype.model_height
+    return wolf_mesh((wolf_variant(model_height), model_height, tuple(archetype.color), lod))
+
+def draw_player(x, y, z, yaw):
+    """Draw the baked player model with its base at (x, y, z), turned yaw degrees."""
+    global player_mesh
+    if player_mesh is None:
+        key = (MODEL_VERSION, PLAYER_TOTAL_HEIGHT, PLAYER_LEG_LENGTH, PLAYER_ARM_LENGTH, PLAYER_GUN_LENGTH)
+        player_mesh = upload_mesh(mesh_cache.get('player', key, lambda: bake(build_player)))
+    draw_instances(player_mesh, [(x, y, z, yaw)])
+
+def draw_enemies(frustum, eye):
+    """Draw enemies grouped by archetype and detail level. Each group shares one
+    baked mesh drawn once per transform (position, bob, facing) -- a single
+    instanced call on the shader backend. Enemies whose bounding sphere (radius model_height, which
+    covers the wolf from snout to tail) is outside frustum are skipped; the
+    rest get a detail level from their projected height as seen from eye.
+    Per archetype, culling, levels and transforms are computed as arrays."""
+    global enemy_lods
+    drawn = culled = 0
+    groups = {}
+    for enemy in sim.enemies:
+        groups.setdefault(enemy.archetype, []).append(enemy)
+    bob_phase = sim.enemy_anim_time * 2.0
+    px_per_unit = pixels_per_unit(SCREEN_HEIGHT, CAMERA_FOV_Y)
+    previous_lods = enemy_lods
+    enemy_lods = {}
+    for archetype, members in groups.items():
+        model_height = archetype.model_height
+        pos = np.array([lerp_pos(enemy) for enemy in members], float)
+        if frustum is not None:
+            shown = np.flatnonzero(frustum.spheres_visible(pos, model_height))
         else:
-            glPushMatrix()
-            glTranslatef(0, ob['height']/2, 0)
-            glScalef(ob['radius']*2, ob['height'], ob['radius']*2)
-            glutSolidCube(1.0)
-            glPopMatrix()
-        glPopMatrix()
+            shown = np.arange(len(members))
+        drawn += len(shown)
+        culled += len(members) - len(shown)
+        if not len(shown):
+            continue
+        members = [members[i] for i in shown.tolist()]
+        pos = pos[shown]
+        distance = np.maximum(np.sqrt(((pos - np.asarray(eye))**2).sum(axis=1)), 0.1)
+        previous = np.array([previous_lods.get(enemy, -1) for enemy in members])
+        lods = select_lods(model_height * px_per_unit / distance, previous)
+        enemy_lods.update(zip(members, lods.tolist()))
+        bob = np.sin((pos[:,0] + pos[:,2]) * 0.2 + bob_phase) * (model_height * 0.02)
+        transforms = np.column_stack([pos[:,0], pos[:,1] - model_height/2 + bob, pos[:,2],
+                                      [enemy.rotation_y for enemy in members]])
+        for lod, count in enumerate(np.bincount(lods, minlength=LOD_LEVELS).tolist()):
+            if not count:
+                continue
+            lod_counts[lod] += count
+            draw_instances(archetype_mesh(archetype, lod), transforms[lods == lod])
+    cull_stats.add('enemies', drawn, culled)
+    if len(sim.horde):
+        draw_horde(bob_phase, frustum, eye)
+
+def draw_horde(bob_phase, frustum, eye):
+    """Draw horde-mode enemies straight from the EnemyPool arrays, one mesh per
+    enemy type and detail level; culling, detail levels and bob offsets are
+    computed for all of them at once."""
+    global horde_lods
+    horde = sim.horde
+    n = horde.count
+    pos = horde.interpolated(interp_alpha)
+    heights = horde.model_height[:n]
+    if frustum is not None:
+        visible = frustum.spheres_visible(pos, heights)
+    else:
+        visible = np.ones(n, bool)
+    drawn = int(visible.sum())
+    cull_stats.add('enemies', drawn, n - drawn)
+    distance = np.maximum(np.sqrt(((pos - np.asarray(eye))**2).sum(axis=1)), 0.1)
+    sizes = heights * pixels_per_unit(SCREEN_HEIGHT, CAMERA_FOV_Y) / distance
+    # Last frame's levels by enemy uid (rows move when the pool swap-fills)
+    uids = horde.uid[:n]
+    seen_uids, seen_lods = horde_lods
+    previous = np.full(n, -1, np.int8)
+    if len(seen_uids):
+        at = np.minimum(np.searchsorted(seen_uids, uids), len(seen_uids) - 1)
+        known = seen_uids[at] == uids
+        previous[known] = seen_lods[at[known]]
+    lods = select_lods(sizes, previous)
+    order = np.argsort(uids)
+    horde_lods = (uids[order], lods[order])
+    for lod, count in enumerate(np.bincount(lods[visible], minlength=LOD_LEVELS).tolist()):
+        lod_counts[lod] += count
+    base_y = pos[:,1] - heights/2 + np.sin((pos[:,0] + pos[:,2]) * 0.2 + bob_phase) * (heights * 0.02)
+    # One group per (type, level) among the visible rows, keyed as a single int
+    shown = np.flatnonzero(visible)
+    groups = horde.type_id[shown].astype(np.intp) * LOD_LEVELS + lods[shown]
+    for group in np.unique(groups).tolist():
+        type_id, lod = divmod(group, LOD_LEVELS)
+        rows = shown[groups == group]
+        transforms = np.column_stack([pos[rows,0], base_y[rows], pos[rows,2], horde.rotation_y[rows]])
+        draw_instances(archetype_mesh(sim.enemy_archetype(type_id), lod), transforms)
+
+def draw_bullets(frustum):
+    """Draw the bullets inside frustum in one glDrawArrays call as round points.
+
+    Positions and colors go up as two vertex arrays. Distance attenuation
+    (size / eye distance) makes each point cover the same screen area as the
+    BULLET_RADIUS sphere it replaces."""
+    count = sim.bullets.count
+    if not count:
+        return
+    positions = sim.bullets.interpolated(interp_alpha)
+    colors = BULLET_COLOR_ARRAY[sim.bullets.color_index[:count]]
+    if frustum is not None:
+        visible = frustum.spheres_visible(positions, BULLET_RADIUS)
+        positions = positions[visible]
+        colors = colors[visible]
+    n = len(positions)
+    cull_stats.add('bullets', n, count - n)
+    if not n:
+        return
+    positions = np.ascontiguousarray(positions, np.float32)
+    # Projected diameter of a sphere of radius R at eye distance d is
+    # R * viewport_height / (d * tan(fov/2)); GL divides by d for us.
+    point_size = BULLET_RADIUS * SCREEN_HEIGHT / math.tan(math.radians(CAMERA_FOV_Y / 2))
+    if gpu is not None:
+        gpu.draw_points(positions, colors, point_size)
+        return
+    glPushAttrib(GL_ENABLE_BIT | GL_POINT_BIT | GL_COLOR_BUFFER_BIT)
+    glDisable(GL_LIGHTING)
+    glEnable(GL_POINT_SMOOTH)
+    glEnable(GL_BLEND)
+    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    glPointSize(point_size)
+    glPointParameterfv(GL_POINT_DISTANCE_ATTENUATION, (0.0, 0.0, 1.0))
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    glVertexPointer(3, GL_FLOAT, 0, positions)
+    glColorPointer(3, GL_FLOAT, 0, colors)
+    glDrawArrays(GL_POINTS, 0, n)
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glPopAttrib()
+
+def draw_chunks(frustum):
+    """Explore mode: draw the resident chunks (floor in their biome's colors plus
+    obstacles), each a BlockSet baked the first frame it is resident. Whole
+    chunks outside the frustum are skipped before their blocks are tested.
+    Buffers of evicted chunks are deleted, so GL memory stays bounded like the
+    ChunkMap itself."""
+    resident = {chunk.serial: chunk for chunk in sim.chunk_map.resident.values()}
+    for serial in [serial for serial in chunk_blocks if serial not in resident]:
+        chunk_blocks.pop(serial).delete()
+    for serial, chunk in resident.items():
+        blocks = chunk_blocks.get(serial)
+        if blocks is None:
+            tile_color1, tile_color2 = sim.pack.biomes[chunk.biome]['tile']
+            blocks = chunk_blocks[serial] = BlockSet(floor_blocks(chunk.x0, chunk.z0, CHUNK_SIZE, CHUNK_SIZE,
+                                                                  tile_color1, tile_color2, chunk.obstacles), upload_mesh)
+        if frustum is None or frustum.boxes_visible(blocks.bounds_min[None], blocks.bounds_max[None])[0]:
+            blocks.draw(frustum, cull_stats)
+        else:
+            cull_stats.add('world', 0, len(blocks))
+
+def draw_dungeon(frustum):
+    """Draw the static dungeon, culled against frustum (None draws everything).
+    Its geometry never changes within a level, so it is baked into one vertex
+    buffer of culling blocks on the first frame after each init_level."""
+    global dungeon_blocks, dungeon_blocks_generation
+    if sim.chunk_map is not None:
+        draw_chunks(frustum)
+        return
+    if dungeon_blocks is None or dungeon_blocks_generation != sim.level_generation:
+        if dungeon_blocks is not None:
+            dungeon_blocks.delete()
+        dungeon_blocks = compile_dungeon()
+        dungeon_blocks_generation = sim.level_generation
+    dungeon_blocks.draw(frustum, cull_stats)
 
 def draw_ui():
     """Render HUD or menu overlays in orthographic projection and manage UI buttons."""
-    glMatrixMode(GL_PROJECTION)
-    glPushMatrix()
-    glLoadIdentity()
-    gluOrtho2D(0,SCREEN_WIDTH,0,SCREEN_HEIGHT)
-    glMatrixMode(GL_MODELVIEW)
-    glPushMatrix()
-    glLoadIdentity()
-    glDisable(GL_LIGHTING)
-    glDisable(GL_DEPTH_TEST)
+    begin_2d(SCREEN_WIDTH, SCREEN_HEIGHT)
     # HUD or Menus
-    if game_state==STATE_PLAYING:
-        draw_text(10,SCREEN_HEIGHT-30,f"Health: {player['health']}/{PLAYER_MAX_HEALTH}",1,0.2,0.2)
-        draw_text(10,SCREEN_HEIGHT-60,f"Score: {player['score']}",1,1,0.2)
-        draw_text(SCREEN_WIDTH-200,SCREEN_HEIGHT-30,f"Level: {current_level}",0.8,0.8,0.8)
-        if cheat_mode:
+    if sim.game_state==STATE_PLAYING:
+        draw_text(10,SCREEN_HEIGHT-30,f"Health: {sim.player.health}/{PLAYER_MAX_HEALTH}",1,0.2,0.2)
+        draw_text(10,SCREEN_HEIGHT-60,f"Score: {sim.player.score}",1,1,0.2)
+        if sim.horde_mode:
+            draw_text(SCREEN_WIDTH-200,SCREEN_HEIGHT-30,f"Horde: {len(sim.horde)}",0.8,0.8,0.8)
+        elif sim.explore_mode:
+            draw_text(SCREEN_WIDTH-200,SCREEN_HEIGHT-30,f"Chunk: {sim.chunk_map.chunk_key(sim.player.pos[0], sim.player.pos[2])}",0.8,0.8,0.8)
+        else:
+            draw_text(SCREEN_WIDTH-200,SCREEN_HEIGHT-30,f"Level: {sim.current_level}",0.8,0.8,0.8)
+        if sim.cheat_mode:
             draw_text(SCREEN_WIDTH-220,SCREEN_HEIGHT-60,"Cheat Mode: ON",1.0,0.6,0.2)
         perk_y=SCREEN_HEIGHT-90
-        if player['health_perk_available']: 
+        if sim.player.health_perk_available: 
             draw_text(10,perk_y,"Health Perk Ready!(H)",0,1,0)
             perk_y-=25
-        if player['score_perk_available']:
+        if sim.player.score_perk_available:
             draw_text(10,perk_y,"Score Perk Ready!(F)",1,1,0)
             perk_y-=25
-        if player['gun_perk_available']: 
+        if sim.player.gun_perk_available: 
             draw_text(10,perk_y,"Gun Perk Ready!(G)",1,0.5,0)
             perk_y-=25
         active_perk_y=SCREEN_HEIGHT-90
-        if player['score_perk_time_left']>0:
-            rem=int(player['score_perk_time_left'])
+        if sim.player.score_perk_time_left>0:
+            rem=int(sim.player.score_perk_time_left)
             draw_text(SCREEN_WIDTH-250,active_perk_y,f"Score x2: {rem}s",1,1,0)
             active_perk_y-=25
-        if player['gun_perk_time_left']>0:
-            rem=int(player['gun_perk_time_left'])
+        if sim.player.gun_perk_time_left>0:
+            rem=int(sim.player.gun_perk_time_left)
             draw_text(SCREEN_WIDTH-250,active_perk_y,f"Rapid Fire: {rem}s",1,0.5,0)
             active_perk_y-=25
-    elif game_state==STATE_PAUSED:
+    elif sim.game_state==STATE_PAUSED:
         # Dim background
         draw_filled_rect(0,0,SCREEN_WIDTH,SCREEN_HEIGHT,0,0,0,0.6)
         ui_reset_buttons()
@@ -1279,27 +1024,16 @@ def draw_ui():
         by -= (btn_h + gap)
         ui_add_button('Return to Main Menu', bx, by, btn_w, btn_h, action='pause_to_main', color=UI_COLORS['btn_warn'])
         # Ensure we exit after drawing pause menu so nothing overrides it
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
-        glPopMatrix()
-        glMatrixMode(GL_PROJECTION)
-        glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
+        end_2d()
         return
-    elif game_state==STATE_MAIN_MENU:
+    elif sim.game_state==STATE_MAIN_MENU:
         ui_reset_buttons()
         # Dark atmospheric background
         draw_filled_rect(0,0,SCREEN_WIDTH,SCREEN_HEIGHT,*UI_COLORS['bg_main_top'],1)
         # Subtle gradient overlay
         draw_filled_rect(0,0,SCREEN_WIDTH,SCREEN_HEIGHT,*UI_COLORS['bg_main_bottom'],0.4)
         # Atmospheric border effect
-        glColor3f(0.1,0.1,0.15)
-        glBegin(GL_LINE_LOOP)
-        glVertex2f(20, 20)
-        glVertex2f(SCREEN_WIDTH-20, 20)
-        glVertex2f(SCREEN_WIDTH-20, SCREEN_HEIGHT-20)
-        glVertex2f(20, SCREEN_HEIGHT-20)
-        glEnd()
+        draw_rect_outline(20, 20, SCREEN_WIDTH-40, SCREEN_HEIGHT-40, 0.1,0.1,0.15)
         
         # Massive centered title
         title = '8bit Doom'
@@ -1315,21 +1049,24 @@ def draw_ui():
         by -= btn_h + 25
         ui_add_button('Select Level', bx, by, btn_w, btn_h, action='menu_select_level', color=UI_COLORS['btn_secondary'])
         by -= btn_h + 25
+        ui_add_button('Horde Mode', bx, by, btn_w, btn_h, action='menu_horde', color=UI_COLORS['btn_primary'])
+        by -= btn_h + 25
+        ui_add_button('Explore Mode', bx, by, btn_w, btn_h, action='menu_explore', color=UI_COLORS['btn_primary'])
+        by -= btn_h + 25
         ui_add_button('Hall Of Fame', bx, by, btn_w, btn_h, action='menu_hof', color=UI_COLORS['btn_neutral'])
         by -= btn_h + 25
         ui_add_button('Exit', bx, by, btn_w, btn_h, action='menu_exit', color=UI_COLORS['btn_warn'])
-    elif game_state==STATE_LEVEL_SELECT:
+    elif sim.game_state==STATE_LEVEL_SELECT:
         ui_reset_buttons()
         draw_filled_rect(0,0,SCREEN_WIDTH,SCREEN_HEIGHT,*UI_COLORS['bg_main_top'],1)
         draw_filled_rect(0,0,SCREEN_WIDTH,SCREEN_HEIGHT,*UI_COLORS['bg_main_bottom'],0.3)
         draw_text_shadowed(40, SCREEN_HEIGHT-80, 'Select Level', *UI_COLORS['title'], GLUT_BITMAP_HELVETICA_18)
-        # Grid of 10 buttons
+        # Grid of one button per level in the pack, five to a row
         cols = 5
-        rows = 2
         btn_w, btn_h = 160, 60
         margin_x, margin_y = 40, 140
         gap_x, gap_y = 30, 30
-        for i in range(10):
+        for i in range(sim.pack.level_count):
             col = i % cols
             row = i // cols
             x = margin_x + col * (btn_w + gap_x)
@@ -1338,12 +1075,12 @@ def draw_ui():
             ui_add_button(f'Level {i+1}', x, y, btn_w, btn_h, action=f'level_{i+1}', color=color)
         # Back
         ui_add_button('Back', 40, 40, 140, 48, action='back_to_main', color=UI_COLORS['btn_neutral'])
-    elif game_state==STATE_HALL_OF_FAME:
+    elif sim.game_state==STATE_HALL_OF_FAME:
         ui_reset_buttons()
         draw_filled_rect(0,0,SCREEN_WIDTH,SCREEN_HEIGHT,*UI_COLORS['bg_main_top'],1)
         draw_filled_rect(0,0,SCREEN_WIDTH,SCREEN_HEIGHT,*UI_COLORS['bg_main_bottom'],0.3)
         draw_text_shadowed(40, SCREEN_HEIGHT-80, 'Hall Of Fame (Top 3)', *UI_COLORS['title'], GLUT_BITMAP_HELVETICA_18)
-        top3 = top_three_scores()
+        top3 = sim.top_three_scores()
         y = SCREEN_HEIGHT-140
         rank = 1
         if not top3:
@@ -1355,23 +1092,23 @@ def draw_ui():
                 rank += 1
         ui_add_button('Back', 40, 40, 140, 48, action='back_to_main', color=UI_COLORS['btn_neutral'])
     # Transition overlays and end-state messages
-    if game_state==STATE_LEVEL_TRANSITION:
+    if sim.game_state==STATE_LEVEL_TRANSITION:
         # Dim and show level completed message
         draw_filled_rect(0,0,SCREEN_WIDTH,SCREEN_HEIGHT,0,0,0,0.55)
         msg = "Level Completed"
         msg_w = get_text_width(msg)
         draw_text_shadowed((SCREEN_WIDTH - msg_w)//2, SCREEN_HEIGHT//2, msg, 0.9, 0.9, 0.9, GLUT_BITMAP_HELVETICA_18)
-    elif game_state==STATE_GAME_OVER_TRANSITION:
+    elif sim.game_state==STATE_GAME_OVER_TRANSITION:
         draw_filled_rect(0,0,SCREEN_WIDTH,SCREEN_HEIGHT,0,0,0,0.55)
         msg = "You died!"
         msg_w = get_text_width(msg)
         draw_text_shadowed((SCREEN_WIDTH - msg_w)//2, SCREEN_HEIGHT//2, msg, 1.0, 0.4, 0.4, GLUT_BITMAP_HELVETICA_18)
-    elif game_state==STATE_YOU_WIN:
+    elif sim.game_state==STATE_YOU_WIN:
         draw_filled_rect(0,0,SCREEN_WIDTH,SCREEN_HEIGHT,0,0,0,0.55)
         win_msg = "Congratulations! Game Finished"
         win_w = get_text_width(win_msg)
         draw_text_shadowed((SCREEN_WIDTH - win_w)//2, SCREEN_HEIGHT//2 + 40, win_msg, 0.9, 1.0, 0.6, GLUT_BITMAP_HELVETICA_18)
-        score_msg = f"Final Score: {player['score']}"
+        score_msg = f"Final Score: {sim.player.score}"
         score_w = get_text_width(score_msg)
         draw_text_shadowed((SCREEN_WIDTH - score_w)//2, SCREEN_HEIGHT//2 + 10, score_msg, 1,1,0.2, GLUT_BITMAP_HELVETICA_18)
         # Buttons
@@ -1382,338 +1119,447 @@ def draw_ui():
         ui_add_button('Return to Main Menu', bx, by, btn_w, btn_h, action='win_to_main', color=UI_COLORS['btn_secondary'])
         by -= (btn_h + 18)
         ui_add_button('Exit', bx, by, btn_w, btn_h, action='win_exit', color=UI_COLORS['btn_warn'])
-    glEnable(GL_DEPTH_TEST)
-    glEnable(GL_LIGHTING)
+    end_2d()
+
+def lerp_pos(entity):
+    """Entity position blended between its last two ticks by interp_alpha."""
+    prev = entity.prev_pos
+    pos = entity.pos
+    if prev is None:
+        return pos
+    a = interp_alpha
+    return [prev[0]+(pos[0]-prev[0])*a, prev[1]+(pos[1]-prev[1])*a, prev[2]+(pos[2]-prev[2])*a]
+
+def draw_profiler_overlay():
+    """Profiler panel (bottom left): avg/p95/p99 per phase in ms and a graph of
+    the recent frame times against 60 and 30 FPS reference lines."""
+    global profiler_overlay_stats, profiler_overlay_updated
+    now = time.perf_counter()
+    if now - profiler_overlay_updated >= PROFILER_OVERLAY_REFRESH:
+        profiler_overlay_stats = profiler.stats()
+        profiler_overlay_updated = now
+    names = [n for n in profiler.phase_names() if n in profiler_overlay_stats]
+    row_h, graph_h, graph_w = 22, 80, 400
+    cull_line = f"drawn/culled: {cull_stats.summary()}  lod {'/'.join(map(str, lod_counts))}"
+    panel_w = max(graph_w, get_text_width(cull_line)) + 20
+    panel_h = (len(names) + 2) * row_h + graph_h + 30
+    x0, y0 = 10, 10
+    begin_2d(SCREEN_WIDTH, SCREEN_HEIGHT, blend=True)
+    draw_filled_rect(x0, y0, panel_w, panel_h, 0, 0, 0, 0.7)
+    # Table: one row per phase, frame total last
+    columns = (x0+10, x0+190, x0+260, x0+330)
+    y = y0 + panel_h - row_h
+    draw_text(columns[0], y, cull_line, 0.6, 0.9, 1.0)
+    y -= row_h
+    for cx, label in zip(columns, ('phase', 'avg', 'p95', 'p99')):
+        draw_text(cx, y, label, 0.7, 0.7, 0.7)
+    for name in names:
+        y -= row_h
+        st = profiler_overlay_stats[name]
+        color = (1, 1, 0.4) if name == FRAME_PHASE else (1, 1, 1)
+        draw_text(columns[0], y, name, *color)
+        for cx, key in zip(columns[1:], ('mean_ms', 'p95_ms', 'p99_ms')):
+            draw_text(cx, y, f"{st[key]:.2f}", *color)
+    # Frame-time graph, scaled so 33.3 ms (30 FPS) is the top unless frames are slower
+    frame_ms = profiler.samples(FRAME_PHASE) * 1000.0
+    gx, gy = x0 + 10, y0 + 10
+    draw_filled_rect(gx, gy, graph_w, graph_h, 0.15, 0.15, 0.15, 0.8)
+    top_ms = max(1000.0 / 30, float(frame_ms.max()) if len(frame_ms) else 0.0)
+    reference = []
+    for ref_ms in (1000.0 / 60, 1000.0 / 30):
+        ry = gy + graph_h * ref_ms / top_ms
+        reference += [(gx, ry), (gx + graph_w, ry)]
+    draw_lines(reference, 0.3, 0.6, 0.3)
+    if len(frame_ms) > 1:
+        line = np.empty((len(frame_ms), 2), np.float32)
+        line[:, 0] = gx + np.arange(len(frame_ms)) * (graph_w / (profiler.history - 1))
+        line[:, 1] = gy + frame_ms * (graph_h / top_ms)
+        if gpu is not None:
+            # The batch draws separate segments: repeat the inner points
+            gpu.ui.lines(np.repeat(line, 2, axis=0)[1:-1], (1.0, 0.8, 0.2))
+        else:
+            glColor3f(1.0, 0.8, 0.2)
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glVertexPointer(2, GL_FLOAT, 0, line)
+            glDrawArrays(GL_LINE_STRIP, 0, len(line))
+            glDisableClientState(GL_VERTEX_ARRAY)
+    end_2d()
+
+def export_profile():
+    """Write the profiler history to PROFILE_EXPORT_PREFIX-<timestamp>.csv/.json."""
+    base = f"{PROFILE_EXPORT_PREFIX}-{time.strftime('%Y%m%d-%H%M%S')}"
+    profiler.export_csv(base + '.csv')
+    profiler.export_json(base + '.json')
+    print(f"Profile written to {base}.csv and {base}.json")
+
+# --- GLUT Callbacks ---
+def capture_frozen_frame():
+    """Copy the freshly drawn world (no UI yet) from the back buffer into a texture."""
+    global frozen_frame_texture, frozen_frame_size
+    if frozen_frame_texture is None:
+        frozen_frame_texture = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, frozen_frame_texture)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+    glCopyTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, 0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, 0)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    frozen_frame_size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+
+def draw_frozen_frame():
+    """Fill the window with the captured world frame (pause/win backdrop)."""
+    if gpu is not None:
+        gpu.blit(frozen_frame_texture)
+        return
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    gluOrtho2D(0,1,0,1)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    glPushAttrib(GL_ENABLE_BIT)
+    glDisable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
+    glEnable(GL_TEXTURE_2D)
+    glBindTexture(GL_TEXTURE_2D, frozen_frame_texture)
+    glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE)
+    glBegin(GL_QUADS)
+    glTexCoord2f(0,0); glVertex2f(0,0)
+    glTexCoord2f(1,0); glVertex2f(1,0)
+    glTexCoord2f(1,1); glVertex2f(1,1)
+    glTexCoord2f(0,1); glVertex2f(0,1)
+    glEnd()
+    glBindTexture(GL_TEXTURE_2D, 0)
+    glPopAttrib()
     glPopMatrix()
     glMatrixMode(GL_PROJECTION)
     glPopMatrix()
     glMatrixMode(GL_MODELVIEW)
 
-# --- GLUT Callbacks ---
 def display():
-    """Main frame render: set camera, lights, draw world/entities, then UI overlays."""
+    """Main frame render: set camera, lights, draw world/entities, then UI overlays.
+    Pause and win screens reuse a frozen capture of the last world frame."""
+    global frozen_frame_size
+    # First frame only: load the prebaked UI font atlas (or, on the
+    # fixed-function path without one, rasterize it via the back buffer)
+    atlas = text_atlas.ensure_atlas(GLUT_BITMAP_HELVETICA_18, SCREEN_WIDTH, SCREEN_HEIGHT, rasterize=gpu is None)
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-    glLoadIdentity()
-    if game_state in (STATE_PLAYING, STATE_LEVEL_TRANSITION, STATE_GAME_OVER_TRANSITION, STATE_YOU_WIN, STATE_PAUSED):
-        player_base_x,player_base_y,player_base_z = player['pos']
-        if camera_mode==CAMERA_MODE_FIRST_PERSON:
+    if gpu is not None:
+        if atlas:
+            gpu.set_font_atlas(atlas)
+    else:
+        glLoadIdentity()
+    if sim.game_state in FROZEN_BACKDROP_STATES and frozen_frame_size == (SCREEN_WIDTH, SCREEN_HEIGHT):
+        draw_frozen_frame()
+    else:
+        draw_world()
+        if sim.game_state in FROZEN_BACKDROP_STATES:
+            capture_frozen_frame()
+        else:
+            frozen_frame_size = None
+    with profiler.scope('draw_ui'):
+        draw_ui()
+    if profiler.enabled:
+        draw_profiler_overlay()
+    with profiler.scope('swap_buffers'):
+        glutSwapBuffers()
+    profiler.mark_frame()
+
+def draw_world():
+    """Set camera and lights, then draw the dungeon, player, enemies, bullets and
+    any transition tint. Everything but the player is culled against the view
+    frustum; counts go to cull_stats."""
+    cull_stats.reset()
+    lod_counts[:] = [0] * LOD_LEVELS
+    frustum = None
+    if sim.chunk_map is not None:
+        # Open map: keep the light over the player instead of the dungeon center
+        light_pos=[sim.player.pos[0],WALL_HEIGHT*1.8,sim.player.pos[2],1.0]
+    else:
+        light_pos=[DUNGEON_SIZE_X/2,WALL_HEIGHT*1.8,DUNGEON_SIZE_Z/2,1.0]
+    light_diffuse=[0.9,0.9,0.8,1]
+    light_ambient=[0.35,0.35,0.35,1]
+    if sim.game_state in (STATE_PLAYING, STATE_LEVEL_TRANSITION, STATE_GAME_OVER_TRANSITION, STATE_YOU_WIN, STATE_PAUSED):
+        player_base_x,player_base_y,player_base_z = lerp_pos(sim.player)
+        if sim.camera_mode==CAMERA_MODE_FIRST_PERSON:
             eye_x=player_base_x
             eye_y=player_base_y-PLAYER_BODY_Y_OFFSET+PLAYER_EYE_HEIGHT_FROM_MODEL_BASE
             eye_z=player_base_z
-            pitch_r=math.radians(player['rotation_x'])
-            yaw_r=math.radians(player['rotation_y'])
+            pitch_r=math.radians(sim.player.rotation_x)
+            yaw_r=math.radians(sim.player.rotation_y)
             look_x=eye_x+math.sin(yaw_r)*math.cos(pitch_r)
             look_y=eye_y-math.sin(pitch_r)
             look_z=eye_z+math.cos(yaw_r)*math.cos(pitch_r)
-            gluLookAt(eye_x,eye_y,eye_z,look_x,look_y,look_z,0,1,0)
-        elif camera_mode==CAMERA_MODE_THIRD_PERSON:
+            eye = (eye_x, eye_y, eye_z)
+            target = (look_x, look_y, look_z)
+        elif sim.camera_mode==CAMERA_MODE_THIRD_PERSON:
             target_foc_y = player_base_y - PLAYER_BODY_Y_OFFSET + PLAYER_TOTAL_HEIGHT/2
-            cam_x_off = tp_camera_distance * math.cos(math.radians(tp_camera_pitch)) * math.sin(math.radians(tp_camera_yaw_offset))
-            cam_y_off = tp_camera_distance * math.sin(math.radians(-tp_camera_pitch))
-            cam_z_off = -tp_camera_distance * math.cos(math.radians(tp_camera_pitch)) * math.cos(math.radians(tp_camera_yaw_offset))
+            cam_x_off = tp_camera_distance * math.cos(math.radians(sim.tp_camera_pitch)) * math.sin(math.radians(sim.tp_camera_yaw_offset))
+            cam_y_off = tp_camera_distance * math.sin(math.radians(-sim.tp_camera_pitch))
+            cam_z_off = -tp_camera_distance * math.cos(math.radians(sim.tp_camera_pitch)) * math.cos(math.radians(sim.tp_camera_yaw_offset))
             cam_x = player_base_x + cam_x_off
             cam_y = target_foc_y + cam_y_off
             cam_z = player_base_z + cam_z_off
-            gluLookAt(cam_x, cam_y, cam_z, player_base_x, target_foc_y, player_base_z, 0, 1, 0)
-    glEnable(GL_LIGHTING)
-    glEnable(GL_LIGHT0)
-    light_pos=[DUNGEON_SIZE_X/2,WALL_HEIGHT*1.8,DUNGEON_SIZE_Z/2,1.0]
-    glLightfv(GL_LIGHT0,GL_POSITION,light_pos)
-    glLightfv(GL_LIGHT0,GL_DIFFUSE,[0.9,0.9,0.8,1])
-    glLightfv(GL_LIGHT0,GL_AMBIENT,[0.35,0.35,0.35,1])
-    glEnable(GL_COLOR_MATERIAL)
-    glColorMaterial(GL_FRONT_AND_BACK,GL_AMBIENT_AND_DIFFUSE)
-    if game_state in (STATE_PLAYING, STATE_LEVEL_TRANSITION, STATE_GAME_OVER_TRANSITION, STATE_YOU_WIN, STATE_PAUSED):
-        draw_dungeon()
-        if camera_mode == CAMERA_MODE_THIRD_PERSON:
-            glPushMatrix()
-            glTranslatef(player['pos'][0], player['pos'][1] - PLAYER_BODY_Y_OFFSET, player['pos'][2])
-            glRotatef(player['rotation_y'], 0, 1, 0)
-            draw_player()
-            glPopMatrix()
-        for enemy in enemies:
-            glPushMatrix()
-            bob = math.sin((enemy['pos'][0] + enemy['pos'][2]) * 0.2 + enemy_anim_time * 2.0) * (enemy['model_height'] * 0.02)
-            glTranslatef(enemy['pos'][0],enemy['pos'][1]-enemy['model_height']/2 + bob,enemy['pos'][2])
-            glRotatef(enemy['rotation_y'],0,1,0)
-            # choose variant by enemy type/model height range
-            variant = 1
-            if enemy['model_height'] >= 7.0:
-                variant = 3
-            elif enemy['model_height'] >= 3.0:
-                variant = 2
-            draw_wolf(enemy['model_height'],enemy['color'],[c*0.8 for c in enemy['color']],[c*1.1 for c in enemy['color']],[0.1,0.1,0.1], variant)
-            glPopMatrix()
-    for bullet in bullets: 
-        glPushMatrix()
-        glTranslatef(bullet['pos'][0],bullet['pos'][1],bullet['pos'][2])
-        glColor3fv(bullet['color'])
-        glutSolidSphere(BULLET_RADIUS,6,6)
-        glPopMatrix()
-    if game_state==STATE_LEVEL_TRANSITION or game_state==STATE_GAME_OVER_TRANSITION:
-        glMatrixMode(GL_PROJECTION)
-        glPushMatrix()
-        glLoadIdentity()
-        gluOrtho2D(0,1,0,1)
-        glMatrixMode(GL_MODELVIEW)
-        glPushMatrix()
-        glLoadIdentity()
-        glDisable(GL_LIGHTING)
-        glDisable(GL_DEPTH_TEST)
-        glColor4f(transition_color[0],transition_color[1],transition_color[2],0.85)
-        glBegin(GL_QUADS)
-        glVertex2f(0,0)
-        glVertex2f(1,0)
-        glVertex2f(1,1)
-        glVertex2f(0,1)
-        glEnd()
-        glEnable(GL_DEPTH_TEST)
+            eye = (cam_x, cam_y, cam_z)
+            target = (player_base_x, target_foc_y, player_base_z)
+        if gpu is not None:
+            frustum = gpu.begin_world(eye, target, light_pos, light_diffuse, light_ambient)
+        else:
+            gluLookAt(*eye, *target, 0, 1, 0)
+            frustum = Frustum.from_gl()
+    if gpu is None:
         glEnable(GL_LIGHTING)
-        glPopMatrix()
-        glMatrixMode(GL_PROJECTION)
-        glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
-    draw_ui()
-    glutSwapBuffers()
+        glEnable(GL_LIGHT0)
+        glLightfv(GL_LIGHT0,GL_POSITION,light_pos)
+        glLightfv(GL_LIGHT0,GL_DIFFUSE,light_diffuse)
+        glLightfv(GL_LIGHT0,GL_AMBIENT,light_ambient)
+        glEnable(GL_COLOR_MATERIAL)
+        glColorMaterial(GL_FRONT_AND_BACK,GL_AMBIENT_AND_DIFFUSE)
+    if sim.game_state in (STATE_PLAYING, STATE_LEVEL_TRANSITION, STATE_GAME_OVER_TRANSITION, STATE_YOU_WIN, STATE_PAUSED):
+        with profiler.scope('draw_dungeon'):
+            draw_dungeon(frustum)
+        if sim.camera_mode == CAMERA_MODE_THIRD_PERSON:
+            draw_player(player_base_x, player_base_y - PLAYER_BODY_Y_OFFSET, player_base_z, sim.player.rotation_y)
+        with profiler.scope('draw_enemies'):
+            draw_enemies(frustum, eye)
+    with profiler.scope('draw_bullets'):
+        draw_bullets(frustum)
+    if sim.game_state==STATE_LEVEL_TRANSITION or sim.game_state==STATE_GAME_OVER_TRANSITION:
+        begin_2d(1, 1)
+        draw_filled_rect(0, 0, 1, 1, *sim.transition_color[:3], 0.85)
+        end_2d()
 
 def reshape(w,h):
     """Handle window resize and update orthographic UI extents."""
-    global SCREEN_WIDTH,SCREEN_HEIGHT
+    global SCREEN_WIDTH,SCREEN_HEIGHT,frozen_frame_size
     SCREEN_WIDTH,SCREEN_HEIGHT=w,h
+    frozen_frame_size = None
+    glutPostRedisplay()
     glViewport(0,0,w,h if h else 1)
+    if gpu is not None:
+        gpu.set_viewport(w, h if h else 1, CAMERA_FOV_Y, 0.1, CAMERA_FAR_PLANE)
+        return
     glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
-    gluPerspective(45.0,float(w)/(h if h else 1),0.1,500.0)
+    gluPerspective(CAMERA_FOV_Y,float(w)/(h if h else 1),0.1,CAMERA_FAR_PLANE)
     glMatrixMode(GL_MODELVIEW)
     glLoadIdentity()
 
+def update_redraw_mode():
+    """Run the idle loop only while the world animates (play and transitions);
+    other states redraw on demand. Call after anything that may change state."""
+    global idle_registered
+    continuous = sim.game_state not in EVENT_DRIVEN_STATES
+    if continuous and not idle_registered:
+        # Do not bill the time spent in menus/pause to the first sim step
+        frame_pacer.reset()
+        glutIdleFunc(idle)
+    elif not continuous and idle_registered:
+        glutIdleFunc(None)
+    idle_registered = continuous
+    glutPostRedisplay()
+
+def on_input(handler):
+    """Wrap an input callback so state changes it makes switch the redraw mode."""
+    def callback(*args):
+        handler(*args)
+        update_redraw_mode()
+    return callback
+
+def mouse_motion(x,y):
+    """Track the pointer for button hover; redraw only when the hovered button changes."""
+    global hovered_action
+    mouse_pos['x'], mouse_pos['y'] = x, SCREEN_HEIGHT - y
+    hovered = None
+    for rect in ui_buttons:
+        if point_in_rect(mouse_pos['x'], mouse_pos['y'], rect):
+            hovered = rect['action']
+            break
+    if hovered != hovered_action:
+        hovered_action = hovered
+        glutPostRedisplay()
+
 def keyboard(key,x,y):
     """Keyboard input: gameplay controls, camera toggle, perks, pause, cheat and exit."""
-    global camera_mode,player,game_state,win_score_recorded,cheat_mode,cheat_fire_timer
     k=key.lower()
     keys_pressed[k]=True
 
     # Global hotkeys
     if k == b'p':
-        if game_state==STATE_PLAYING:
-            game_state=STATE_PAUSED
-        elif game_state==STATE_PAUSED:
-            game_state=STATE_PLAYING
+        sim.toggle_pause()
         return
     if k == b'c':
         # Toggle cheat mode (auto-fire + godmode)
-        cheat_mode = not cheat_mode
-        cheat_fire_timer = 0.0
+        sim.toggle_cheat()
         return
 
     # Ignore gameplay keys when not playing
-    if game_state!=STATE_PLAYING:
-        if game_state in (STATE_MAIN_MENU, STATE_LEVEL_SELECT, STATE_HALL_OF_FAME):
+    if sim.game_state!=STATE_PLAYING:
+        if sim.game_state in (STATE_MAIN_MENU, STATE_LEVEL_SELECT, STATE_HALL_OF_FAME):
             if k == b'\x1b':
-                glutLeaveMainLoop()
+                quit_game()
         return
 
-    if k == b' ' and player['shoot_cooldown']<=0:
-        player['shoot_cooldown'] = player['current_shoot_cooldown_time']
-        # No manual aim assist before firing
-
-        # Get player's current orientation
-        yaw_rad = math.radians(player['rotation_y'])
-
-        # Get local model space forward offset to the gun base and tip
-        gun_base_offset = 0.35 * PLAYER_TOTAL_HEIGHT
-        gun_length = PLAYER_GUN_LENGTH
-        shoulder_height = PLAYER_LEG_LENGTH + PLAYER_TORSO_HEIGHT * 0.8
-        gun_y = player['pos'][1] - PLAYER_BODY_Y_OFFSET + shoulder_height
-
-        # Forward direction (player is facing)
-        dir_x = math.sin(yaw_rad)
-        dir_z = math.cos(yaw_rad)
-
-        # Gun base world position
-        gun_base_x = player['pos'][0] + dir_x * gun_base_offset
-        gun_base_z = player['pos'][2] + dir_z * gun_base_offset
-
-        # Gun tip world position
-        tip_world_x = gun_base_x + dir_x * gun_length
-        tip_world_y = gun_y
-        tip_world_z = gun_base_z + dir_z * gun_length
-
-        # Direction vector
-        direction = normalize_vector([dir_x, 0, dir_z])
-
-        create_bullet([tip_world_x, tip_world_y, tip_world_z], direction, 'PLAYER', 1)
-        # No brief post-fire alignment in TP (aim assist disabled)
+    if k == b' ':
+        pending_events.append('fire')
         mouse_buttons[GLUT_LEFT_BUTTON] = "PROCESSED"
 
     if key==b'\x1b': 
-        glutLeaveMainLoop()
+        quit_game()
     if k==b'v': 
-        # Sync camera rotation when switching modes
-        global tp_camera_yaw_offset
-        if camera_mode == CAMERA_MODE_FIRST_PERSON:
-            # Switching to third-person: sync tp_camera_yaw_offset with player rotation
-            tp_camera_yaw_offset = player['rotation_y']
-        else:
-            # Switching to first-person: sync player rotation with tp_camera_yaw_offset
-            player['rotation_y'] = tp_camera_yaw_offset
-        camera_mode = 1-camera_mode # Toggle 0 and 1
-    if k==b'h' and player['health_perk_available']: 
-        player['health']=PLAYER_MAX_HEALTH
-        player['health_perk_available']=False
-        player['kills_for_health_perk']=0
-        pass  # Health Perk activated
-    if k==b'f' and player['score_perk_available']:
-        player['score_perk_time_left']=PERK_SCORE_MULTIPLIER_DURATION
-        player['score_perk_available']=False
-        player['kills_for_score_perk']=0
-        pass  # Score Perk activated
-    if k==b'g' and player['gun_perk_available']: 
-        player['gun_perk_time_left']=PERK_RAPID_FIRE_DURATION
-        player['gun_perk_available']=False
-        player['kills_for_gun_perk']=0
-        pass  # Gun Perk activated
+        pending_events.append('toggle_camera')
+    if k==b'h':
+        pending_events.append('perk_health')
+    if k==b'f':
+        pending_events.append('perk_score')
+    if k==b'g':
+        pending_events.append('perk_gun')
 
 def keyboard_up(key,x,y): 
     keys_pressed[key.lower()]=False
 def special_keys_input(key,x,y): 
     special_keys_pressed[key]=True
+    if key == GLUT_KEY_F3:
+        profiler.toggle()
+        glutPostRedisplay()
+    elif key == GLUT_KEY_F4 and profiler.frames:
+        export_profile()
 def special_keys_up(key,x,y): 
     special_keys_pressed[key]=False
 def mouse_click(button,state,x,y): 
     """Mouse input: UI clicks in menus/pause/win; fire during gameplay on left-click."""
-    global mouse_buttons, game_state, win_score_recorded, mouse_pos
     mouse_buttons[button]=state # Store exact state
     # Convert y to UI space (GLUT gives y from top-left? Here we used ortho with origin bottom-left)
     ui_y = SCREEN_HEIGHT - y
     mouse_pos['x'], mouse_pos['y'] = x, ui_y
     # Handle UI clicks in menu/pause states
     if state==GLUT_DOWN and button==GLUT_LEFT_BUTTON:
-        if game_state in (STATE_MAIN_MENU, STATE_LEVEL_SELECT, STATE_HALL_OF_FAME, STATE_PAUSED, STATE_YOU_WIN):
+        if sim.game_state in (STATE_MAIN_MENU, STATE_LEVEL_SELECT, STATE_HALL_OF_FAME, STATE_PAUSED, STATE_YOU_WIN):
             for rect in ui_buttons:
                 if point_in_rect(x, ui_y, rect):
                     action = rect['action']
                     if action=='menu_start':
-                        player['score'] = 0
-                        player['health'] = PLAYER_MAX_HEALTH
-                        init_level(1)
-                        game_state = STATE_PLAYING
+                        sim.start_run(1)
+                        return
+                    if action=='menu_horde':
+                        sim.start_horde()
+                        return
+                    if action=='menu_explore':
+                        sim.start_explore()
                         return
                     if action=='menu_select_level':
-                        game_state = STATE_LEVEL_SELECT
+                        sim.set_game_state(STATE_LEVEL_SELECT)
                         return
                     if action=='menu_hof':
-                        game_state = STATE_HALL_OF_FAME
+                        sim.set_game_state(STATE_HALL_OF_FAME)
                         return
                     if action=='menu_exit':
                         # If player has a score not yet recorded, save it before exiting
-                        if player.get('score', 0) > 0 and not current_session_score_recorded:
-                            record_high_score(player['score'])
-                        glutLeaveMainLoop()
+                        sim.record_unsaved_score()
+                        quit_game()
                         return
                     if action=='back_to_main':
-                        game_state = STATE_MAIN_MENU
+                        sim.set_game_state(STATE_MAIN_MENU)
                         return
                     if action.startswith('level_'):
                         try:
-                            lvl = int(action.split('_')[1])
-                            player['score'] = 0
-                            player['health'] = PLAYER_MAX_HEALTH
-                            init_level(lvl)
-                            game_state = STATE_PLAYING
+                            sim.start_run(int(action.split('_')[1]))
                         except:
                             pass
                         return
                     if action=='pause_resume':
-                        game_state = STATE_PLAYING
+                        sim.set_game_state(STATE_PLAYING)
                         return
                     if action=='pause_retry':
-                        player['score'] = 0
-                        player['health'] = PLAYER_MAX_HEALTH
-                        init_level(current_level)
-                        game_state = STATE_PLAYING
+                        if sim.horde_mode:
+                            sim.start_horde(sim.horde_target)
+                        elif sim.explore_mode:
+                            sim.start_explore(sim.chunk_map.size_chunks)
+                        else:
+                            sim.start_run(sim.current_level)
                         return
                     if action=='pause_to_main':
                         # Record mid-run score when returning to main menu from pause
-                        if player.get('score', 0) > 0 and not current_session_score_recorded:
-                            record_high_score(player['score'])
-                        game_state = STATE_MAIN_MENU
+                        sim.record_unsaved_score()
+                        sim.set_game_state(STATE_MAIN_MENU)
                         return
                     if action=='win_to_main':
                         # Already recorded on win; just go to main menu
-                        game_state = STATE_MAIN_MENU
+                        sim.set_game_state(STATE_MAIN_MENU)
                         return
                     if action=='win_exit':
                         # Safe exit from win screen
-                        if player.get('score', 0) > 0 and not current_session_score_recorded:
-                            record_high_score(player['score'])
-                        glutLeaveMainLoop()
+                        sim.record_unsaved_score()
+                        quit_game()
                         return
     # Fire on left mouse button down if cooldown allows (only during gameplay)
-    if button==GLUT_LEFT_BUTTON and state==GLUT_DOWN and game_state==STATE_PLAYING and player['shoot_cooldown']<=0:
-        player['shoot_cooldown'] = player['current_shoot_cooldown_time']
-
-        yaw_rad = math.radians(player['rotation_y'])
-
-        gun_base_offset = 0.35 * PLAYER_TOTAL_HEIGHT
-        gun_length = PLAYER_GUN_LENGTH
-        shoulder_height = PLAYER_LEG_LENGTH + PLAYER_TORSO_HEIGHT * 0.8
-        gun_y = player['pos'][1] - PLAYER_BODY_Y_OFFSET + shoulder_height
-
-        dir_x = math.sin(yaw_rad)
-        dir_z = math.cos(yaw_rad)
-
-        gun_base_x = player['pos'][0] + dir_x * gun_base_offset
-        gun_base_z = player['pos'][2] + dir_z * gun_base_offset
-
-        tip_world_x = gun_base_x + dir_x * gun_length
-        tip_world_y = gun_y
-        tip_world_z = gun_base_z + dir_z * gun_length
-
-        direction = normalize_vector([dir_x, 0, dir_z])
-
-        create_bullet([tip_world_x, tip_world_y, tip_world_z], direction, 'PLAYER', 1)
+    if button==GLUT_LEFT_BUTTON and state==GLUT_DOWN and sim.game_state==STATE_PLAYING:
+        pending_events.append('fire')
     
 def idle():
-    """Idle callback: compute delta time and run updates for active states, then request redraw."""
-    global last_time
-    current_t=glutGet(GLUT_ELAPSED_TIME)/1000.0
-    delta_t=current_t-last_time
-    last_time=current_t
-    if delta_t > 0.1: 
-        delta_t=0.1
-    if delta_t <= 0: 
-        delta_t=1/60.0
-    # Only advance gameplay when playing or in transitions; paused/menu states skip update
-    if game_state in (STATE_PLAYING, STATE_LEVEL_TRANSITION, STATE_GAME_OVER_TRANSITION):
-        update_game_state(delta_t)
-    # update hover position to keep hover effect responsive (no-op; position set on mouse move/click)
-    glutPostRedisplay()
+    """Idle callback: wait for the next paced frame slot, step the simulation with
+    the smoothed frame time, then request redraw."""
+    global interp_alpha
+    with profiler.scope('pace_wait'):
+        delta_t = frame_pacer.tick()
+    inputs = {'keys': keys_pressed, 'special_keys': special_keys_pressed, 'events': list(pending_events)}
+    del pending_events[:]
+    # The simulation only advances when playing or in transitions; paused/menu states skip update
+    with profiler.scope('sim'):
+        if USE_FIXED_TIMESTEP:
+            interp_alpha = sim.advance(max(delta_t, 0.0), inputs)
+        else:
+            if delta_t > 0.1: 
+                delta_t=0.1
+            if delta_t <= 0: 
+                delta_t=1/60.0
+            sim.step(delta_t, inputs)
+    # Death/win/level changes happen inside the sim step
+    update_redraw_mode()
+
+def save_replay():
+    """Write the session replay to RECORD_REPLAY_PATH and stop recording; a
+    no-op when not recording, so every quit path can call it."""
+    recorder = replay.stop_recording(sim)
+    if recorder is not None and RECORD_REPLAY_PATH:
+        recorder.save(RECORD_REPLAY_PATH)
+
+def quit_game():
+    """Leave the main loop (ESC, Exit buttons). The replay is saved first:
+    unless GLUT_ACTION_CONTINUE_EXECUTION took, freeglut exit()s from C here,
+    which skips Python's atexit handlers."""
+    save_replay()
+    glutLeaveMainLoop()
 
 def main():
-    global last_time,glu_quadric
     glutInit()
+    try:
+        # Return from glutMainLoop on window close too, so the replay gets saved
+        glutSetOption(GLUT_ACTION_ON_WINDOW_CLOSE, GLUT_ACTION_CONTINUE_EXECUTION)
+    except Exception:
+        pass  # GLUT without freeglut extensions: only the in-game quit paths save
     glutInitDisplayMode(GLUT_DOUBLE|GLUT_RGB|GLUT_DEPTH)
     glutInitWindowSize(SCREEN_WIDTH,SCREEN_HEIGHT)
-    glutCreateWindow(b"8bit Doom")
-    glEnable(GL_DEPTH_TEST)
-    # Smooth shading is within OpenGL fixed-function; retain for model visuals
-    glShadeModel(GL_SMOOTH)
+    open_window(b"8bit Doom")
     glClearColor(0.05,0.05,0.15,1.0)
-    glu_quadric=gluNewQuadric()
-    init_level_configs()
-    init_player()
+    if RECORD_REPLAY_PATH:
+        replay.start_recording(sim)
+    if SWAP_INTERVAL is not None and set_swap_interval(SWAP_INTERVAL) and SWAP_INTERVAL > 0:
+        frame_pacer.set_target_fps(0)
+        frame_pacer.reset()
     # Start on main menu; do not init level here
-    last_time=glutGet(GLUT_ELAPSED_TIME)/1000.0
     glutDisplayFunc(display)
     glutReshapeFunc(reshape)
-    glutKeyboardFunc(keyboard)
+    glutKeyboardFunc(on_input(keyboard))
     glutKeyboardUpFunc(keyboard_up)
     glutSpecialFunc(special_keys_input)
     glutSpecialUpFunc(special_keys_up)
-    glutMouseFunc(mouse_click)
-    glutIdleFunc(idle)
+    glutMouseFunc(on_input(mouse_click))
+    glutPassiveMotionFunc(mouse_motion)
+    glutMotionFunc(mouse_motion)
+    update_redraw_mode()
     # Game Controls: W/A/S/D:Move | Q,E:Rotate | LeftClick/Space:Shoot | Arrows:Cam | F:View | H,C,G:Perks | ESC:Exit
     glutMainLoop()
+    save_replay()
 
-if __name__ == "__main__": main()
+if __name__ == "__main__": main()
\ No newline at end of file
@@ -0,0 +1,2 @@
+"""OpenGL rendering subsystems for 8bit Doom (needs a GL context; the
+simulation in doomsim does not)."""
@@ -0,0 +1,116 @@
+"""View-frustum culling.
+
+The six frustum planes are pulled from a view-projection matrix: the current
+GL projection and modelview matrices on the fixed-function path (whatever
+gluPerspective/gluLookAt set up), or the shader backend's own matrices. First-
+and third-person cameras need no special cases and the far plane doubles as
+the distance cull. Tests are conservative: something is culled only when its
+bounds lie entirely behind one plane.
+
+Static geometry is drawn through BlockSets: vertex ranges of one buffer with an
+axis-aligned box each, tested all at once with NumPy; the visible ranges go out
+in a single glMultiDrawArrays.
+"""
+import numpy as np
+from OpenGL.GL import *
+
+
+class Frustum:
+    """Planes (a, b, c, d) with a*x + b*y + c*z + d >= 0 inside, normals unit length."""
+
+    def __init__(self, clip):
+        """clip is the 4x4 projection @ modelview matrix acting on column vectors."""
+        clip = np.asarray(clip, float)
+        w = clip[3]
+        planes = np.array([w + clip[0], w - clip[0],   # left, right
+                           w + clip[1], w - clip[1],   # bottom, top
+                           w + clip[2], w - clip[2]])  # near, far
+        planes /= np.linalg.norm(planes[:, :3], axis=1)[:, None]
+        self.normals = planes[:, :3]
+        self.offsets = planes[:, 3]
+        # Tuples for scalar tests from Python, which beat NumPy for one sphere
+        self._planes = tuple(tuple(p) for p in planes.tolist())
+
+    @classmethod
+    def from_gl(cls):
+        """Frustum of the current GL_PROJECTION and GL_MODELVIEW matrices."""
+        # GL hands matrices back column-major, so each reads as its transpose
+        proj = np.asarray(glGetFloatv(GL_PROJECTION_MATRIX), float).reshape(4, 4).T
+        modelview = np.asarray(glGetFloatv(GL_MODELVIEW_MATRIX), float).reshape(4, 4).T
+        return cls(proj @ modelview)
+
+    def sphere_visible(self, x, y, z, r):
+        for a, b, c, d in self._planes:
+            if a*x + b*y + c*z + d < -r:
+                return False
+        return True
+
+    def spheres_visible(self, centers, radii):
+        """Boolean mask for an (n, 3) array of centers; radii is scalar or (n,)."""
+        dist = centers @ self.normals.T + self.offsets
+        return (dist >= -np.reshape(radii, (-1, 1))).all(axis=1)
+
+    def boxes_visible(self, mins, maxs):
+        """Boolean mask for (n, 3) arrays of box corners: a box is out when its
+        corner farthest along a plane normal is still behind that plane."""
+        corner = np.where(self.normals > 0, maxs[:, None, :], mins[:, None, :])
+        dist = (corner * self.normals).sum(axis=2) + self.offsets
+        return (dist >= 0).all(axis=1)
+
+
+class CullStats:
+    """Drawn and culled counts per category ('world', 'enemies', ...) for one frame."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def reset(self):
+        self.counts.clear()
+
+    def add(self, category, drawn, culled):
+        counts = self.counts.get(category)
+        if counts is None:
+            counts = self.counts[category] = [0, 0]
+        counts[0] += drawn
+        counts[1] += culled
+
+    def summary(self):
+        """'world 31/12  enemies 4/2 ...': drawn/culled per category."""
+        return '  '.join(f"{name} {drawn}/{culled}" for name, (drawn, culled) in self.counts.items())
+
+
+class BlockSet:
+    """Blocks of baked triangles with one bounding box each, drawn only where visible."""
+
+    def __init__(self, blocks, make_mesh):
+        """blocks: (vertices, (x0, y0, z0), (x1, y1, z1)) per block, vertices as
+        baked by MeshBuilder. make_mesh uploads the concatenated vertices and
+        returns a mesh with draw_ranges() and delete() for the active backend."""
+        counts = [len(vertices) for vertices, _, _ in blocks]
+        self.counts = np.array(counts, np.int32)
+        self.first = (np.cumsum(self.counts) - self.counts).astype(np.int32)
+        self.mesh = make_mesh(np.concatenate([vertices for vertices, _, _ in blocks])) if blocks else None
+        self.mins = np.array([lo for _, lo, _ in blocks], float).reshape(-1, 3)
+        self.maxs = np.array([hi for _, _, hi in blocks], float).reshape(-1, 3)
+        self.bounds_min = self.mins.min(axis=0) if blocks else np.zeros(3)
+        self.bounds_max = self.maxs.max(axis=0) if blocks else np.zeros(3)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def draw(self, frustum, stats, category='world'):
+        if frustum is None:
+            visible = np.ones(len(self.counts), bool)
+        else:
+            visible = frustum.boxes_visible(self.mins, self.maxs)
+        # Empty blocks (no floor, no obstacles) need no draw
+        visible &= self.counts > 0
+        drawn = int(visible.sum())
+        if drawn:
+            self.mesh.draw_ranges(self.first[visible], self.counts[visible])
+        stats.add(category, drawn, len(self.counts) - drawn)
+
+    def delete(self):
+        if self.mesh is not None:
+            self.mesh.delete()
+            self.mesh = None
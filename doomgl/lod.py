@@ -0,0 +1,52 @@
+"""Distance level of detail for the procedural models.
+
+Each model has LOD_LEVELS detail levels: LOD_FULL (as designed), LOD_REDUCED
+(coarse tessellation, small trim dropped) and LOD_IMPOSTOR (one box in the
+model's main color). The level is picked by the model's projected height on
+screen in pixels. Near a threshold a model has to cross it by LOD_HYSTERESIS
+(as a fraction) before it switches, so one hovering at the boundary does not
+flicker between levels.
+"""
+import math
+
+import numpy as np
+
+
+LOD_FULL = 0
+LOD_REDUCED = 1
+LOD_IMPOSTOR = 2
+LOD_LEVELS = 3
+# Projected heights in pixels: at least LOD_PIXELS[0] draws full detail, at
+# least LOD_PIXELS[1] reduced, anything smaller an impostor
+LOD_PIXELS = (90.0, 24.0)
+LOD_HYSTERESIS = 0.15
+
+
+def pixels_per_unit(viewport_h, fov_y):
+    """Screen pixels covered by one world unit at distance 1 (divide by the distance)."""
+    return viewport_h / (2.0 * math.tan(math.radians(fov_y) / 2))
+
+
+def select_lod(size_px, previous=None):
+    """Detail level for a model size_px pixels tall that was drawn at level
+    previous last frame (None: no history)."""
+    level = LOD_FULL
+    for k, threshold in enumerate(LOD_PIXELS):
+        # Threshold k separates level k from k + 1; crossing it needs the margin
+        if previous is not None:
+            threshold *= (1.0 - LOD_HYSTERESIS) if previous <= k else (1.0 + LOD_HYSTERESIS)
+        if size_px < threshold:
+            level = k + 1
+    return level
+
+
+def select_lods(sizes_px, previous=None):
+    """Vectorized select_lod: int8 levels for an array of sizes; previous is an
+    array of last frame's levels (negative: no history) or None."""
+    levels = np.zeros(len(sizes_px), np.int8)
+    for k, threshold in enumerate(LOD_PIXELS):
+        if previous is not None:
+            threshold = np.where(previous < 0, threshold,
+                                 np.where(previous <= k, threshold * (1.0 - LOD_HYSTERESIS), threshold * (1.0 + LOD_HYSTERESIS)))
+        levels[sizes_px < threshold] = k + 1
+    return levels
@@ -0,0 +1,250 @@
+"""Baked model meshes.
+
+MeshBuilder records a model the way the fixed-function code drew it (matrix
+pushes, translate/rotate/scale, colors, GLUT cubes and spheres, GLU cylinders
+and disks) but emits triangles into one flat float32 array instead: per vertex
+position, normal and color (VERTEX_FLOATS floats). A baked model is uploaded
+once into a vertex buffer (Mesh here, ModernMesh in doomgl.modern for the
+shader backend) and drawn with a single glDrawArrays.
+
+MeshCache keeps baked arrays on disk as .npy files named after a hash of the
+model parameters, memory-mapped on load, so later launches skip baking.
+"""
+import ctypes
+import hashlib
+import math
+import os
+
+import numpy as np
+from OpenGL.GL import *
+# Unwrapped entry points (no argument conversion or error check per call) for
+# the per-instance loop in Mesh.draw_matrices
+from OpenGL.raw.GL.VERSION.GL_1_0 import glLoadMatrixf as _raw_load_matrix
+from OpenGL.raw.GL.VERSION.GL_1_1 import glDrawArrays as _raw_draw_arrays
+
+
+VERTEX_FLOATS = 9      # x, y, z, nx, ny, nz, r, g, b
+VERTEX_STRIDE = VERTEX_FLOATS * 4
+# Bump when the vertex layout changes, so stale cache files are rebaked
+MESH_FORMAT = 1
+
+# Unit cube faces: (normal, four corners counter-clockwise seen from outside)
+_CUBE_FACES = (
+    ((1, 0, 0), ((1, -1, -1), (1, 1, -1), (1, 1, 1), (1, -1, 1))),
+    ((-1, 0, 0), ((-1, -1, 1), (-1, 1, 1), (-1, 1, -1), (-1, -1, -1))),
+    ((0, 1, 0), ((-1, 1, -1), (-1, 1, 1), (1, 1, 1), (1, 1, -1))),
+    ((0, -1, 0), ((-1, -1, 1), (-1, -1, -1), (1, -1, -1), (1, -1, 1))),
+    ((0, 0, 1), ((-1, -1, 1), (1, -1, 1), (1, 1, 1), (-1, 1, 1))),
+    ((0, 0, -1), ((1, -1, -1), (-1, -1, -1), (-1, 1, -1), (1, 1, -1))),
+)
+
+
+def _grid_triangles(rows, cols):
+    """Vertex indices of two triangles per cell of a (rows + 1) x (cols + 1) vertex grid."""
+    r, c = np.meshgrid(np.arange(rows), np.arange(cols), indexing='ij')
+    a = (r * (cols + 1) + c).ravel()
+    b = a + 1
+    d = a + cols + 1
+    e = d + 1
+    return np.stack([a, d, e, a, e, b], axis=1).ravel()
+
+
+class MeshBuilder:
+    """Collects triangles under a GL-style matrix stack and current color."""
+
+    def __init__(self):
+        self.matrix = np.eye(4)
+        self.stack = []
+        self.rgb = (1.0, 1.0, 1.0)
+        self.parts = []
+
+    def push(self):
+        self.stack.append(self.matrix)
+
+    def pop(self):
+        self.matrix = self.stack.pop()
+
+    def translate(self, x, y, z):
+        m = np.eye(4)
+        m[:3, 3] = (x, y, z)
+        self.matrix = self.matrix @ m
+
+    def rotate(self, angle, x, y, z):
+        """Rotate angle degrees about axis (x, y, z), like glRotatef."""
+        axis = np.array((x, y, z), float)
+        axis /= np.linalg.norm(axis)
+        c = math.cos(math.radians(angle))
+        s = math.sin(math.radians(angle))
+        ux, uy, uz = axis
+        cross = np.array([[0, -uz, uy], [uz, 0, -ux], [-uy, ux, 0]])
+        m = np.eye(4)
+        m[:3, :3] = c * np.eye(3) + s * cross + (1 - c) * np.outer(axis, axis)
+        self.matrix = self.matrix @ m
+
+    def scale(self, x, y, z):
+        self.matrix = self.matrix @ np.diag((x, y, z, 1.0))
+
+    def color(self, rgb):
+        self.rgb = tuple(float(c) for c in rgb[:3])
+
+    def add(self, positions, normals, colors=None):
+        """Add triangles given in model space under the current matrix, in the
+        current color unless per-vertex colors are given."""
+        m = self.matrix
+        positions = positions @ m[:3, :3].T + m[:3, 3]
+        # Normals transform by the inverse transpose, which keeps them
+        # perpendicular under non-uniform scales
+        normals = normals @ np.linalg.inv(m[:3, :3])
+        normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-12)[:, None]
+        if colors is None:
+            colors = self.rgb
+        colors = np.broadcast_to(colors, positions.shape)
+        self.parts.append(np.hstack([positions, normals, colors]))
+
+    def quad(self, a, b, c, d, normal):
+        """Flat quad with corners a, b, c, d in order (a GL_QUADS quad)."""
+        self.add(np.array([a, b, c, a, c, d], float), np.tile(np.asarray(normal, float), (6, 1)))
+
+    def cube(self, size):
+        """glutSolidCube: axis-aligned cube of edge size centered on the origin."""
+        positions, normals = [], []
+        for normal, corners in _CUBE_FACES:
+            a, b, c, d = corners
+            positions += [a, b, c, a, c, d]
+            normals += [normal] * 6
+        self.add(np.array(positions, float) * (size / 2.0), np.array(normals, float))
+
+    def sphere(self, radius, slices, stacks):
+        """glutSolidSphere: sphere about the origin, poles on the z axis."""
+        theta = np.linspace(0, math.pi, stacks + 1)[:, None]
+        phi = np.linspace(0, 2 * math.pi, slices + 1)[None, :]
+        normals = np.stack(np.broadcast_arrays(np.sin(theta) * np.cos(phi),
+                                               np.sin(theta) * np.sin(phi),
+                                               np.cos(theta)), axis=-1).reshape(-1, 3)
+        tri = _grid_triangles(stacks, slices)
+        self.add(normals[tri] * radius, normals[tri])
+
+    def cylinder(self, base, top, height, slices, stacks):
+        """gluCylinder: open tube along +z from radius base at z=0 to top at z=height."""
+        t = np.linspace(0, 1, stacks + 1)[:, None]
+        angle = np.linspace(0, 2 * math.pi, slices + 1)[None, :]
+        radius = base + (top - base) * t
+        sin, cos = np.sin(angle), np.cos(angle)
+        positions = np.stack(np.broadcast_arrays(radius * sin, radius * cos, height * t), axis=-1).reshape(-1, 3)
+        # GLU's normals: the side slope folded into z
+        slope = (base - top) / height if height else 0.0
+        normals = np.stack(np.broadcast_arrays(sin, cos, np.full_like(t, slope)), axis=-1).reshape(-1, 3)
+        tri = _grid_triangles(stacks, slices)
+        self.add(positions[tri], normals[tri])
+
+    def disk(self, radius, slices):
+        """gluDisk with no hole: a fan in the z=0 plane facing +z."""
+        angle = np.linspace(0, 2 * math.pi, slices + 1)
+        rim = np.stack([radius * np.sin(angle), radius * np.cos(angle), np.zeros_like(angle)], axis=1)
+        positions = np.zeros((slices, 3, 3))
+        positions[:, 1] = rim[1:]
+        positions[:, 2] = rim[:-1]
+        normals = np.zeros((slices * 3, 3))
+        normals[:, 2] = 1.0
+        self.add(positions.reshape(-1, 3), normals)
+
+    def vertices(self):
+        """The baked model: float32 (n, VERTEX_FLOATS), three rows per triangle."""
+        if not self.parts:
+            return np.zeros((0, VERTEX_FLOATS), np.float32)
+        return np.ascontiguousarray(np.vstack(self.parts), np.float32)
+
+
+class MeshCache:
+    """Baked vertex arrays on disk, one .npy per model, memory-mapped on load.
+    directory None disables the cache (every model is baked)."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, name, key):
+        digest = hashlib.sha1(repr((MESH_FORMAT, key)).encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{name}-{digest}.npy")
+
+    def get(self, name, key, bake):
+        """Vertices of model name with parameters key (anything with a stable
+        repr): read from the cache, or bake() and written to it."""
+        if self.directory is None:
+            return bake()
+        path = self.path(name, key)
+        try:
+            vertices = np.load(path, mmap_mode='r')
+            if vertices.dtype == np.float32 and vertices.ndim == 2 and vertices.shape[1] == VERTEX_FLOATS:
+                return vertices
+        except (OSError, ValueError):
+            pass
+        vertices = bake()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write then rename, so a concurrent launch never maps a partial file
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                np.save(f, vertices)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # read-only location: bake again next launch
+        return vertices
+
+
+def enable_arrays():
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_NORMAL_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+
+def disable_arrays():
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_NORMAL_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+def set_pointers(base):
+    """Point the vertex, normal and color arrays at interleaved vertices starting
+    at base: an address in client memory, or an offset into the bound buffer."""
+    glVertexPointer(3, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(base))
+    glNormalPointer(GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(base + 12))
+    glColorPointer(3, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(base + 24))
+
+
+class Mesh:
+    """A baked model uploaded once into a vertex buffer, for the fixed-function
+    pipeline. Between enable_arrays() and disable_arrays(), bind() it once and
+    draw() it per instance."""
+
+    def __init__(self, vertices):
+        vertices = np.ascontiguousarray(vertices, np.float32)
+        self.count = len(vertices)
+        self.buffer = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.buffer)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def bind(self):
+        glBindBuffer(GL_ARRAY_BUFFER, self.buffer)
+        set_pointers(0)
+
+    def draw(self):
+        glDrawArrays(GL_TRIANGLES, 0, self.count)
+
+    def draw_matrices(self, matrices):
+        """Draw once per modelview matrix of an (n, 4, 4) array in GL's
+        column-major layout. Leaves the last matrix loaded."""
+        matrices = np.ascontiguousarray(matrices, np.float32)
+        base = matrices.ctypes.data
+        for i in range(len(matrices)):
+            _raw_load_matrix(ctypes.c_void_p(base + 64 * i))
+            _raw_draw_arrays(GL_TRIANGLES, 0, self.count)
+
+    def draw_ranges(self, first, counts):
+        """Draw the vertex ranges first[i]:first[i]+counts[i] in one glMultiDrawArrays."""
+        enable_arrays()
+        self.bind()
+        glMultiDrawArrays(GL_TRIANGLES, first, counts, len(first))
+        disable_arrays()
+
+    def delete(self):
+        glDeleteBuffers(1, [self.buffer])
@@ -0,0 +1,453 @@
+"""Shader rendering backend: the same scene through vertex array objects,
+vertex buffers and GLSL 330 core shaders, with no fixed-function state.
+
+Per frame it replaces thousands of Python-level GL calls with a few dozen:
+static world blocks are one glMultiDrawArrays per BlockSet, every group of
+identical models (one archetype at one detail level) is a single instanced
+draw from an (n, 4) array of x, y, z, yaw, bullets are one point draw, and
+all 2D (HUD, menus, text runs, profiler) is collected into one vertex batch
+uploaded once per pass. Lighting reproduces the fixed-function setup the
+game used: one positional light, ambient and diffuse, per-vertex colors.
+
+ModernRenderer() raises RuntimeError when the context is older than
+MIN_GL_VERSION or a shader fails to build; the caller then keeps the
+fixed-function path.
+"""
+import ctypes
+import math
+
+import numpy as np
+from OpenGL.GL import *
+
+from .culling import Frustum
+from .mesh import VERTEX_STRIDE
+
+
+MIN_GL_VERSION = (3, 3)
+INSTANCE_ATTRIB = 3
+UI_VERTEX_FLOATS = 8   # x, y, u, v, r, g, b, a; u < 0 means untextured
+# Fixed-function default GL_LIGHT_MODEL_AMBIENT, added to the light's own ambient
+GLOBAL_AMBIENT = 0.2
+
+WORLD_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec3 position;
+layout(location = 1) in vec3 normal;
+layout(location = 2) in vec3 color;
+layout(location = 3) in vec4 instance;   // x, y, z, yaw in degrees (zero for static geometry)
+uniform mat4 view_projection;
+uniform vec3 light_position;
+uniform vec3 light_diffuse;
+uniform vec3 ambient;
+out vec3 shade;
+void main() {
+    float yaw = radians(instance.w);
+    float c = cos(yaw);
+    float s = sin(yaw);
+    mat3 rotation = mat3(c, 0.0, -s, 0.0, 1.0, 0.0, s, 0.0, c);   // glRotatef(yaw, 0, 1, 0)
+    vec3 world = rotation * position + instance.xyz;
+    vec3 n = normalize(rotation * normal);
+    float diffuse = max(dot(n, normalize(light_position - world)), 0.0);
+    shade = color * (ambient + diffuse * light_diffuse);
+    gl_Position = view_projection * vec4(world, 1.0);
+}
+"""
+
+WORLD_FRAGMENT_SHADER = """
+#version 330 core
+in vec3 shade;
+out vec4 frag_color;
+void main() {
+    frag_color = vec4(shade, 1.0);
+}
+"""
+
+POINT_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec3 position;
+layout(location = 2) in vec3 color;
+uniform mat4 view;
+uniform mat4 projection;
+uniform float point_size;
+out vec3 point_color;
+void main() {
+    vec4 eye = view * vec4(position, 1.0);
+    // Same distance attenuation as GL_POINT_DISTANCE_ATTENUATION (0, 0, 1)
+    gl_PointSize = point_size / max(length(eye.xyz), 0.001);
+    point_color = color;
+    gl_Position = projection * eye;
+}
+"""
+
+POINT_FRAGMENT_SHADER = """
+#version 330 core
+in vec3 point_color;
+out vec4 frag_color;
+void main() {
+    float r = length(gl_PointCoord * 2.0 - 1.0);
+    if (r > 1.0)
+        discard;
+    frag_color = vec4(point_color, 1.0 - smoothstep(0.8, 1.0, r));
+}
+"""
+
+UI_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec2 position;
+layout(location = 1) in vec2 uv;
+layout(location = 2) in vec4 color;
+uniform mat4 projection;
+out vec2 frag_uv;
+out vec4 frag_rgba;
+void main() {
+    frag_uv = uv;
+    frag_rgba = color;
+    gl_Position = projection * vec4(position, 0.0, 1.0);
+}
+"""
+
+UI_FRAGMENT_SHADER = """
+#version 330 core
+in vec2 frag_uv;
+in vec4 frag_rgba;
+uniform sampler2D image;
+uniform int blit;   // 1: copy image's rgb (frozen frame), 0: atlas coverage in red
+out vec4 frag_color;
+void main() {
+    if (blit == 1)
+        frag_color = vec4(texture(image, frag_uv).rgb, 1.0);
+    else if (frag_uv.x < 0.0)
+        frag_color = frag_rgba;
+    else
+        frag_color = vec4(frag_rgba.rgb, frag_rgba.a * texture(image, frag_uv).r);
+}
+"""
+
+
+def gl_version():
+    """(major, minor) of the current context, from GL_VERSION (works before 3.0 too)."""
+    version = glGetString(GL_VERSION)
+    if not version:
+        return (0, 0)
+    major, minor = version.decode('ascii', 'replace').split()[0].split('.')[:2]
+    return int(major), int(minor)
+
+def compile_program(vertex_source, fragment_source):
+    shaders = []
+    for kind, source in ((GL_VERTEX_SHADER, vertex_source), (GL_FRAGMENT_SHADER, fragment_source)):
+        shader = glCreateShader(kind)
+        glShaderSource(shader, source)
+        glCompileShader(shader)
+        if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+            raise RuntimeError(f"shader compile failed: {glGetShaderInfoLog(shader).decode(errors='replace')}")
+        shaders.append(shader)
+    program = glCreateProgram()
+    for shader in shaders:
+        glAttachShader(program, shader)
+    glLinkProgram(program)
+    for shader in shaders:
+        glDeleteShader(shader)
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        raise RuntimeError(f"shader link failed: {glGetProgramInfoLog(program).decode(errors='replace')}")
+    return program
+
+def perspective(fov_y, aspect, near, far):
+    """gluPerspective as a NumPy matrix (column vectors)."""
+    f = 1.0 / math.tan(math.radians(fov_y) / 2)
+    return np.array([[f / aspect, 0, 0, 0],
+                     [0, f, 0, 0],
+                     [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+                     [0, 0, -1, 0]])
+
+def look_at(eye, target, up=(0.0, 1.0, 0.0)):
+    """gluLookAt as a NumPy matrix (column vectors)."""
+    eye = np.asarray(eye, float)
+    forward = np.asarray(target, float) - eye
+    forward /= np.linalg.norm(forward)
+    side = np.cross(forward, up)
+    side /= np.linalg.norm(side)
+    true_up = np.cross(side, forward)
+    m = np.eye(4)
+    m[0, :3] = side
+    m[1, :3] = true_up
+    m[2, :3] = -forward
+    m[:3, 3] = -m[:3, :3] @ eye
+    return m
+
+def ortho(width, height):
+    """gluOrtho2D(0, width, 0, height) as a NumPy matrix."""
+    m = np.eye(4)
+    m[0, 0] = 2.0 / width
+    m[1, 1] = 2.0 / height
+    m[2, 2] = -1.0
+    m[0, 3] = m[1, 3] = -1.0
+    return m
+
+
+class ModernMesh:
+    """Baked vertices in a vertex buffer behind their own vertex array object,
+    drawn with the world program. The instance attribute reads the renderer's
+    shared per-frame instance buffer."""
+
+    def __init__(self, vertices, instance_buffer, program):
+        vertices = np.ascontiguousarray(vertices, np.float32)
+        self.count = len(vertices)
+        self.program = program
+        self.vao = glGenVertexArrays(1)
+        self.buffer = glGenBuffers(1)
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.buffer)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        for location, offset in ((0, 0), (1, 12), (2, 24)):
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, 3, GL_FLOAT, GL_FALSE, VERTEX_STRIDE, ctypes.c_void_p(offset))
+        glBindBuffer(GL_ARRAY_BUFFER, instance_buffer)
+        glVertexAttribPointer(INSTANCE_ATTRIB, 4, GL_FLOAT, GL_FALSE, 16, ctypes.c_void_p(0))
+        glVertexAttribDivisor(INSTANCE_ATTRIB, 1)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw_ranges(self, first, counts):
+        """Static geometry: the vertex ranges first[i]:first[i]+counts[i] in one call."""
+        glUseProgram(self.program)
+        glBindVertexArray(self.vao)
+        glMultiDrawArrays(GL_TRIANGLES, first, counts, len(first))
+        glBindVertexArray(0)
+
+    def delete(self):
+        glDeleteVertexArrays(1, [self.vao])
+        glDeleteBuffers(1, [self.buffer])
+
+
+class UIBatch:
+    """2D triangles and lines collected in submission order and drawn in as few
+    calls as possible: consecutive parts with the same primitive and blending
+    share one glDrawArrays."""
+
+    def __init__(self):
+        self.parts = []   # (primitive, blend, (n, UI_VERTEX_FLOATS) array)
+        self.blend = False
+
+    def add(self, primitive, blend, vertices):
+        self.parts.append((primitive, blend, vertices))
+
+    def rect(self, x, y, w, h, rgba):
+        v = np.empty((6, UI_VERTEX_FLOATS), np.float32)
+        v[:, 0:2] = ((x, y), (x + w, y), (x + w, y + h), (x, y), (x + w, y + h), (x, y + h))
+        v[:, 2:4] = -1.0
+        v[:, 4:8] = rgba
+        self.add(GL_TRIANGLES, self.blend, v)
+
+    def lines(self, points, rgb):
+        """Separate segments from consecutive pairs of an (n, 2) points array."""
+        points = np.asarray(points, np.float32).reshape(-1, 2)
+        v = np.empty((len(points), UI_VERTEX_FLOATS), np.float32)
+        v[:, 0:2] = points
+        v[:, 2:4] = -1.0
+        v[:, 4:7] = rgb
+        v[:, 7] = 1.0
+        self.add(GL_LINES, self.blend, v)
+
+    def text(self, x, y, run):
+        """A cached text run (quad vertices, uvs, colors) with its baseline at (x, y)."""
+        verts, uvs, cols = run
+        if not len(verts):
+            return
+        # GL_QUADS corners 0 1 2 3 -> triangles 0 1 2, 0 2 3
+        quads = np.arange(0, len(verts), 4)[:, None] + np.array([0, 1, 2, 0, 2, 3])
+        order = quads.ravel()
+        v = np.empty((len(order), UI_VERTEX_FLOATS), np.float32)
+        v[:, 0:2] = verts[order] + (int(x), int(y))
+        v[:, 2:4] = uvs[order]
+        v[:, 4:7] = cols[order]
+        v[:, 7] = 1.0
+        self.add(GL_TRIANGLES, True, v)
+
+
+class ModernRenderer:
+    """Shader programs, shared buffers and per-frame state of the shader backend."""
+
+    def __init__(self):
+        version = gl_version()
+        if version < MIN_GL_VERSION:
+            raise RuntimeError(f"OpenGL {version[0]}.{version[1]} is older than "
+                               f"{MIN_GL_VERSION[0]}.{MIN_GL_VERSION[1]}")
+        self.world_program = compile_program(WORLD_VERTEX_SHADER, WORLD_FRAGMENT_SHADER)
+        self.point_program = compile_program(POINT_VERTEX_SHADER, POINT_FRAGMENT_SHADER)
+        self.ui_program = compile_program(UI_VERTEX_SHADER, UI_FRAGMENT_SHADER)
+        self.uniforms = {}
+        for program in (self.world_program, self.point_program, self.ui_program):
+            count = glGetProgramiv(program, GL_ACTIVE_UNIFORMS)
+            for i in range(count):
+                name = glGetActiveUniform(program, i)[0].decode()
+                self.uniforms[program, name] = glGetUniformLocation(program, name)
+        self.instance_buffer = glGenBuffers(1)
+        # Bullets: positions and colors streamed each frame
+        self.point_vao = glGenVertexArrays(1)
+        self.point_buffers = glGenBuffers(2)
+        glBindVertexArray(self.point_vao)
+        for location, buffer in zip((0, 2), self.point_buffers):
+            glBindBuffer(GL_ARRAY_BUFFER, buffer)
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, 3, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
+        # 2D batch
+        self.ui_vao = glGenVertexArrays(1)
+        self.ui_buffer = glGenBuffers(1)
+        glBindVertexArray(self.ui_vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.ui_buffer)
+        stride = UI_VERTEX_FLOATS * 4
+        for location, size, offset in ((0, 2, 0), (1, 2, 8), (2, 4, 16)):
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, size, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(offset))
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.font_texture = None
+        self.font_atlas = None
+        self.projection = np.eye(4)
+        self.view = np.eye(4)
+        self.ui = UIBatch()
+        self.ui_projection = np.eye(4)
+        self.renderer_name = glGetString(GL_RENDERER).decode('ascii', 'replace')
+
+    def uniform(self, program, name):
+        return self.uniforms.get((program, name), -1)
+
+    def set_matrix(self, program, name, matrix):
+        glUniformMatrix4fv(self.uniform(program, name), 1, GL_TRUE, np.asarray(matrix, np.float32))
+
+    def mesh(self, vertices):
+        return ModernMesh(vertices, self.instance_buffer, self.world_program)
+
+    # --- World ---
+    def set_viewport(self, width, height, fov_y, near, far):
+        self.projection = perspective(fov_y, width / (height or 1), near, far)
+
+    def begin_world(self, eye, target, light_position, light_diffuse, light_ambient):
+        """Camera and light for this frame; returns the view Frustum."""
+        self.view = look_at(eye, target)
+        view_projection = self.projection @ self.view
+        program = self.world_program
+        glUseProgram(program)
+        self.set_matrix(program, 'view_projection', view_projection)
+        glUniform3f(self.uniform(program, 'light_position'), *light_position[:3])
+        glUniform3f(self.uniform(program, 'light_diffuse'), *light_diffuse[:3])
+        glUniform3f(self.uniform(program, 'ambient'), *[GLOBAL_AMBIENT + a for a in light_ambient[:3]])
+        # Static geometry has no instance array: it reads this constant instead
+        glVertexAttrib4f(INSTANCE_ATTRIB, 0.0, 0.0, 0.0, 0.0)
+        return Frustum(view_projection)
+
+    def draw_instances(self, mesh, transforms):
+        """Draw mesh once per row of an (n, 4) x, y, z, yaw-degrees array."""
+        transforms = np.ascontiguousarray(transforms, np.float32)
+        if not len(transforms):
+            return
+        glUseProgram(self.world_program)
+        glBindVertexArray(mesh.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_buffer)
+        glBufferData(GL_ARRAY_BUFFER, transforms.nbytes, transforms, GL_STREAM_DRAW)
+        glEnableVertexAttribArray(INSTANCE_ATTRIB)
+        glDrawArraysInstanced(GL_TRIANGLES, 0, mesh.count, len(transforms))
+        glDisableVertexAttribArray(INSTANCE_ATTRIB)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw_points(self, positions, colors, point_size):
+        """Round, distance-attenuated, blended points (bullets)."""
+        positions = np.ascontiguousarray(positions, np.float32)
+        colors = np.ascontiguousarray(colors, np.float32)
+        program = self.point_program
+        glUseProgram(program)
+        self.set_matrix(program, 'view', self.view)
+        self.set_matrix(program, 'projection', self.projection)
+        glUniform1f(self.uniform(program, 'point_size'), point_size)
+        glBindVertexArray(self.point_vao)
+        for buffer, data in zip(self.point_buffers, (positions, colors)):
+            glBindBuffer(GL_ARRAY_BUFFER, buffer)
+            glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STREAM_DRAW)
+        glEnable(GL_PROGRAM_POINT_SIZE)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glDrawArrays(GL_POINTS, 0, len(positions))
+        glDisable(GL_BLEND)
+        glDisable(GL_PROGRAM_POINT_SIZE)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    # --- 2D ---
+    def set_font_atlas(self, atlas):
+        """Upload a text atlas (see doomgl.text) as a single-channel texture."""
+        if atlas is self.font_atlas:
+            return
+        self.font_atlas = atlas
+        if self.font_texture is None:
+            self.font_texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.font_texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_R8, atlas['width'], atlas['height'], 0, GL_RED, GL_UNSIGNED_BYTE, atlas['pixels'])
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def begin_2d(self, width, height, blend=False):
+        """Start a 2D pass in window coordinates (0..width, 0..height); blend
+        applies to the rects and lines added until end_2d (text always blends)."""
+        self.ui_projection = ortho(width, height)
+        self.ui.blend = blend
+
+    def end_2d(self):
+        """Draw everything added since begin_2d: one upload, one call per run of
+        parts sharing primitive and blending."""
+        parts = self.ui.parts
+        if not parts:
+            return
+        vertices = np.concatenate([v for _, _, v in parts])
+        program = self.ui_program
+        glUseProgram(program)
+        self.set_matrix(program, 'projection', self.ui_projection)
+        glUniform1i(self.uniform(program, 'blit'), 0)
+        glUniform1i(self.uniform(program, 'image'), 0)
+        glBindTexture(GL_TEXTURE_2D, self.font_texture or 0)
+        glBindVertexArray(self.ui_vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.ui_buffer)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STREAM_DRAW)
+        glDisable(GL_DEPTH_TEST)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        first = 0
+        run_start = 0
+        for i, (primitive, blend, v) in enumerate(parts):
+            first += len(v)
+            following = parts[i + 1] if i + 1 < len(parts) else None
+            if following is not None and following[:2] == (primitive, blend):
+                continue
+            if blend:
+                glEnable(GL_BLEND)
+            else:
+                glDisable(GL_BLEND)
+            glDrawArrays(primitive, run_start, first - run_start)
+            run_start = first
+        glDisable(GL_BLEND)
+        glEnable(GL_DEPTH_TEST)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        del parts[:]
+
+    def blit(self, texture):
+        """Fill the viewport with texture (the frozen world frame)."""
+        v = np.zeros((6, UI_VERTEX_FLOATS), np.float32)
+        v[:, 0:2] = v[:, 2:4] = ((0, 0), (1, 0), (1, 1), (0, 0), (1, 1), (0, 1))
+        program = self.ui_program
+        glUseProgram(program)
+        self.set_matrix(program, 'projection', ortho(1, 1))
+        glUniform1i(self.uniform(program, 'blit'), 1)
+        glUniform1i(self.uniform(program, 'image'), 0)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glBindVertexArray(self.ui_vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.ui_buffer)
+        glBufferData(GL_ARRAY_BUFFER, v.nbytes, v, GL_STREAM_DRAW)
+        glDisable(GL_DEPTH_TEST)
+        glDrawArrays(GL_TRIANGLES, 0, 6)
+        glEnable(GL_DEPTH_TEST)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindTexture(GL_TEXTURE_2D, 0)
@@ -0,0 +1,91 @@
+"""Frame pacing: hold the render loop to a target rate without pinning a core.
+
+Each frame waits for its deadline by sleeping until shortly before it and
+spin-waiting the remaining tail, which keeps frame times even despite coarse OS
+sleep granularity. Measured frame times are smoothed before they are fed to the
+simulation so a single hitch does not turn into a visible jump.
+"""
+import sys
+import time
+
+from doomsim.constants import MAX_FRAME_TIME
+
+
+DEFAULT_TARGET_FPS = 60
+SPIN_TAIL = 0.002       # seconds before the deadline where sleeping stops and spinning starts
+SMOOTHING = 0.2         # weight of the newest frame time in the moving average
+
+
+class FramePacer:
+    """Paces frames to target_fps (0 = uncapped) and tracks a smoothed frame time."""
+
+    def __init__(self, target_fps=DEFAULT_TARGET_FPS, spin_tail=SPIN_TAIL, smoothing=SMOOTHING):
+        self.spin_tail = spin_tail
+        self.smoothing = smoothing
+        self.set_target_fps(target_fps)
+        self.reset()
+
+    def set_target_fps(self, target_fps):
+        self.target_fps = target_fps
+        self.period = 1.0 / target_fps if target_fps else 0.0
+
+    def reset(self):
+        """Restart timing (after the loop was idle, e.g. in a menu)."""
+        now = time.perf_counter()
+        self.last_frame = now
+        self.deadline = now + self.period
+        self.frame_time = self.period or 1.0 / DEFAULT_TARGET_FPS
+        self.smoothed = self.frame_time
+
+    def wait(self):
+        """Block until this frame's deadline, then schedule the next one."""
+        if self.period:
+            remaining = self.deadline - time.perf_counter()
+            if remaining > self.spin_tail:
+                time.sleep(remaining - self.spin_tail)
+            while time.perf_counter() < self.deadline:
+                pass
+            # Keep a steady cadence, but never try to catch up on missed frames
+            self.deadline = max(self.deadline + self.period, time.perf_counter())
+
+    def tick(self):
+        """Wait for the frame slot and return the smoothed frame time in seconds."""
+        self.wait()
+        now = time.perf_counter()
+        self.frame_time = now - self.last_frame
+        self.last_frame = now
+        sample = min(self.frame_time, MAX_FRAME_TIME)
+        self.smoothed += (sample - self.smoothed) * self.smoothing
+        return self.smoothed
+
+
+def set_swap_interval(interval):
+    """Ask the driver to sync buffer swaps to every interval-th vblank (0 turns
+    vsync off). Needs a current GL context. Returns False if the platform has
+    no swap-control extension we can reach."""
+    try:
+        if sys.platform.startswith('win'):
+            from OpenGL.WGL.EXT.swap_control import wglSwapIntervalEXT
+            return bool(wglSwapIntervalEXT(interval))
+        if sys.platform == 'darwin':
+            return False
+    except Exception:
+        return False
+    # GLX: try EXT, then MESA, then SGI (SGI cannot turn vsync off)
+    try:
+        from OpenGL.GLX import glXGetCurrentDisplay, glXGetCurrentDrawable
+        from OpenGL.GLX.EXT.swap_control import glXSwapIntervalEXT
+        glXSwapIntervalEXT(glXGetCurrentDisplay(), glXGetCurrentDrawable(), interval)
+        return True
+    except Exception:
+        pass
+    try:
+        from OpenGL.GLX.MESA.swap_control import glXSwapIntervalMESA
+        return glXSwapIntervalMESA(interval) == 0
+    except Exception:
+        pass
+    try:
+        from OpenGL.GLX.SGI.swap_control import glXSwapIntervalSGI
+        return interval > 0 and glXSwapIntervalSGI(interval) == 0
+    except Exception:
+        return False
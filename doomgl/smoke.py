@@ -0,0 +1,159 @@
+"""Headless render smoke test: python -m doomgl.smoke [--backend shader|fixed] [--core]
+
+Renders one frame of each screen (menu, level, horde, explore, pause, level
+transition) into an offscreen EGL surface, so it runs without a display or a
+GPU on Mesa's software rasterizer:
+
+    EGL_PLATFORM=surfaceless python -m doomgl.smoke --core
+
+--core makes the context an OpenGL 3.3 core profile, as the game requests for
+the shader backend; only the shader backend can run there. A screen fails on
+a GL error, on the wrong backend coming up, or on a frame that is all clear
+color. --save DIR writes each frame as DIR/<screen>-<backend>.npy.
+"""
+import argparse
+import ctypes
+import importlib.util
+import os
+import sys
+
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')  # before the first OpenGL import
+
+import numpy as np
+from OpenGL import EGL
+from OpenGL.GL import *
+
+from doomsim.constants import CAMERA_MODE_THIRD_PERSON, STATE_LEVEL_TRANSITION, STATE_PAUSED, STATE_PLAYING
+
+
+WIDTH, HEIGHT = 640, 480
+SCREENS = ('menu', 'level', 'horde', 'explore', 'pause', 'transition')
+CLEAR_COLOR = (0.05, 0.05, 0.15)
+# A frame passes with at least this fraction of pixels off the clear color
+MIN_DRAWN_FRACTION = 0.01
+
+
+def make_context(width, height, core=False):
+    """Make a pbuffer-backed desktop GL context current: a 3.3 core profile if
+    core, else the driver's default compatibility context."""
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("eglInitialize failed (try EGL_PLATFORM=surfaceless)")
+    attrs = [EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8,
+             EGL.EGL_BLUE_SIZE, 8, EGL.EGL_DEPTH_SIZE, 24, EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+             EGL.EGL_NONE]
+    config, count = EGL.EGLConfig(), EGL.EGLint()
+    if not EGL.eglChooseConfig(display, (EGL.EGLint * len(attrs))(*attrs), ctypes.pointer(config), 1,
+                               ctypes.pointer(count)) or not count.value:
+        raise RuntimeError("no EGL config with desktop OpenGL and a depth buffer")
+    surface_attrs = [EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE]
+    surface = EGL.eglCreatePbufferSurface(display, config, (EGL.EGLint * len(surface_attrs))(*surface_attrs))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    if core:
+        context_attrs = [EGL.EGL_CONTEXT_MAJOR_VERSION, 3, EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+                         EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+                         EGL.EGL_NONE]
+    else:
+        context_attrs = [EGL.EGL_NONE]
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT,
+                                   (EGL.EGLint * len(context_attrs))(*context_attrs))
+    if not context or not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError(f"cannot create a {'core' if core else 'compatibility'} OpenGL context")
+
+
+def load_renderer(backend):
+    """Import 8bitdoom.py as a module with the given backend, the GLUT window
+    calls stubbed out (there is no GLUT window here) and the mesh cache off."""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '8bitdoom.py')
+    spec = importlib.util.spec_from_file_location('eightbitdoom', path)
+    renderer = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(renderer)
+    renderer.RENDER_BACKEND = backend
+    renderer.mesh_cache.directory = None
+    renderer.glutSwapBuffers = lambda: None
+    renderer.glutPostRedisplay = lambda: None
+    return renderer
+
+
+def set_up(renderer, screen):
+    """Put the renderer's world into screen, stepped a little so there is
+    something in flight."""
+    sim = renderer.sim
+    sim.new_game(1)
+    if screen == 'menu':
+        return
+    if screen == 'horde':
+        sim.start_horde()
+    elif screen == 'explore':
+        sim.start_explore()
+        sim.stream_chunks(None)
+    else:
+        sim.start_run(2)
+    sim.set_game_state(STATE_PLAYING)
+    for _ in range(30):
+        sim.step(1 / 60)
+    if sim.camera_mode != CAMERA_MODE_THIRD_PERSON:
+        sim.toggle_camera()
+    if screen == 'level':
+        for _ in range(5):
+            sim.fire_player_bullet()
+            sim.step(0.02)
+    elif screen == 'pause':
+        renderer.display()  # the paused screen shows a capture of this frame
+        sim.set_game_state(STATE_PAUSED)
+    elif screen == 'transition':
+        sim.set_game_state(STATE_LEVEL_TRANSITION)
+
+
+def render(renderer, screen):
+    """One frame of screen as an (HEIGHT, WIDTH, 3) uint8 array, top row first."""
+    set_up(renderer, screen)
+    renderer.display()
+    glFinish()
+    pixels = glReadPixels(0, 0, WIDTH, HEIGHT, GL_RGB, GL_UNSIGNED_BYTE)
+    return np.frombuffer(pixels, np.uint8).reshape(HEIGHT, WIDTH, 3)[::-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m doomgl.smoke')
+    parser.add_argument('--backend', choices=('shader', 'fixed'), default='shader')
+    parser.add_argument('--core', action='store_true', help='use an OpenGL 3.3 core profile context')
+    parser.add_argument('--only', nargs='+', choices=SCREENS, metavar='SCREEN')
+    parser.add_argument('--save', metavar='DIR', help='write each frame as DIR/<screen>-<backend>.npy')
+    args = parser.parse_args()
+    if args.core and args.backend == 'fixed':
+        parser.error("the fixed-function backend cannot run on a core profile")
+
+    make_context(WIDTH, HEIGHT, core=args.core)
+    renderer = load_renderer(args.backend)
+    glEnable(GL_DEPTH_TEST)
+    if renderer.init_backend(allow_fixed=not args.core) != (args.backend == 'shader'):
+        raise SystemExit(f"expected the {args.backend} backend")
+    glClearColor(*CLEAR_COLOR, 1.0)
+    renderer.reshape(WIDTH, HEIGHT)
+    print(f"{args.backend} backend on {glGetString(GL_VERSION).decode()} ({glGetString(GL_RENDERER).decode()})")
+
+    clear = np.round(np.array(CLEAR_COLOR) * 255)
+    failed = []
+    for screen in args.only or SCREENS:
+        try:
+            frame = render(renderer, screen)
+            error = glGetError()
+        except Exception as e:
+            print(f"  {screen:<12} FAILED: {type(e).__name__}: {e}")
+            failed.append(screen)
+            continue
+        drawn = float((np.abs(frame - clear) > 2).any(axis=2).mean())
+        ok = error == GL_NO_ERROR and drawn >= MIN_DRAWN_FRACTION
+        print(f"  {screen:<12} {'ok' if ok else 'FAILED'}  {drawn:6.1%} drawn, GL error {error}")
+        if not ok:
+            failed.append(screen)
+        if args.save:
+            os.makedirs(args.save, exist_ok=True)
+            np.save(os.path.join(args.save, f"{screen}-{args.backend}.npy"), frame)
+    if failed:
+        print(f"{len(failed)} screen(s) failed: {' '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__": main()
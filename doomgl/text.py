@@ -0,0 +1,247 @@
+"""Texture-atlas text rendering.
+
+Each GLUT bitmap font becomes a single-channel glyph atlas built from GLUT's
+own glyph bitmaps and widths, so layout uses real metrics. Rasterizing needs
+the fixed-function raster calls, which core profiles lack, so the UI font
+ships prebaked (python -m doomgl.text rebakes it) and only other fonts are
+rasterized at runtime, on fixed-function contexts. A string, together with
+all of its shadow layers, becomes one cached run of textured quads drawn with
+a single glDrawArrays call. Static labels (menus, titles) hit the cache every
+frame; changing HUD strings rebuild a small run and evict the oldest ones.
+"""
+import os
+from collections import OrderedDict
+
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.GLUT import *
+
+
+FIRST_CHAR, LAST_CHAR = 32, 126
+ATLAS_WIDTH = 512
+GLYPH_PAD = 2          # empty pixels around each glyph cell
+MAX_CACHED_RUNS = 256
+# Atlases shipped next to this module as <name>.atlas.npz
+PREBAKED_ATLASES = {'helvetica18': GLUT_BITMAP_HELVETICA_18}
+
+atlases = {}  # font_key(font) -> atlas dict, see build_atlas
+runs = OrderedDict()  # (font_key(font), text, layers) -> (vertices, texcoords, colors)
+
+
+def font_key(font):
+    """Hashable key for a GLUT font; PyOpenGL hands fonts out as ctypes
+    pointers, which do not hash."""
+    return getattr(font, 'value', font)
+
+def atlas_path(name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{name}.atlas.npz")
+
+
+def _next_pow2(n):
+    p = 1
+    while p < n:
+        p *= 2
+    return p
+
+def build_atlas(font, viewport_w, viewport_h):
+    """Rasterize printable ASCII of a GLUT bitmap font into an atlas: a dict of
+    glyphs (code -> x, y, cell width, advance), cell_h, descent, and the
+    coverage pixels (uint8, height x width, bottom row first).
+
+    Glyphs are drawn with glutBitmapCharacter into the back buffer and read
+    back, so this needs a fixed-function context and must run before the frame
+    is cleared and drawn. Returns None when the window is too small to hold
+    the atlas."""
+    line_h = glutBitmapHeight(font) or 24
+    cell_h = line_h + 2 * GLYPH_PAD
+    descent = line_h // 4
+    glyphs = {}
+    x = y = 0
+    for code in range(FIRST_CHAR, LAST_CHAR + 1):
+        advance = glutBitmapWidth(font, code)
+        cell_w = advance + 2 * GLYPH_PAD
+        if x + cell_w > ATLAS_WIDTH:
+            x, y = 0, y + cell_h
+        glyphs[code] = (x, y, cell_w, advance)
+        x += cell_w
+    height = _next_pow2(y + cell_h)
+    if ATLAS_WIDTH > viewport_w or height > viewport_h:
+        return None
+
+    glPushAttrib(GL_ALL_ATTRIB_BITS)
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    glOrtho(0, viewport_w, 0, viewport_h, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    glDisable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
+    glDisable(GL_TEXTURE_2D)
+    glDisable(GL_BLEND)
+    glClearColor(0, 0, 0, 0)
+    glClear(GL_COLOR_BUFFER_BIT)
+    glColor3f(1, 1, 1)
+    for code, (gx, gy, cell_w, advance) in glyphs.items():
+        glRasterPos2f(gx + GLYPH_PAD, gy + GLYPH_PAD + descent)
+        glutBitmapCharacter(font, code)
+    glPixelStorei(GL_PACK_ALIGNMENT, 1)
+    pixels = glReadPixels(0, 0, ATLAS_WIDTH, height, GL_RED, GL_UNSIGNED_BYTE)
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glPopAttrib()
+    pixels = np.frombuffer(pixels, np.uint8).reshape(height, ATLAS_WIDTH).copy()
+    return {'glyphs': glyphs, 'cell_h': cell_h, 'descent': descent,
+            'width': ATLAS_WIDTH, 'height': height, 'pixels': pixels}
+
+def save_atlas(atlas, path):
+    rows = [(code,) + glyph for code, glyph in sorted(atlas['glyphs'].items())]
+    np.savez_compressed(path, pixels=atlas['pixels'], glyphs=np.array(rows, np.int32),
+                        cell_h=atlas['cell_h'], descent=atlas['descent'])
+
+def load_atlas(path):
+    """An atlas written by save_atlas; no GL calls."""
+    with np.load(path) as data:
+        pixels = np.ascontiguousarray(data['pixels'], np.uint8)
+        glyphs = {code: tuple(glyph) for code, *glyph in data['glyphs'].tolist()}
+        return {'glyphs': glyphs, 'cell_h': int(data['cell_h']), 'descent': int(data['descent']),
+                'width': pixels.shape[1], 'height': pixels.shape[0], 'pixels': pixels}
+
+def ensure_atlas(font, viewport_w, viewport_h, rasterize=True):
+    """The atlas for font: the prebaked one if it ships, else built on first
+    use when rasterize is set (fixed-function contexts only; call at the start
+    of a frame). None if there is neither."""
+    key = font_key(font)
+    if key not in atlases:
+        atlas = None
+        for name, prebaked in PREBAKED_ATLASES.items():
+            if font_key(prebaked) == key and os.path.exists(atlas_path(name)):
+                atlas = load_atlas(atlas_path(name))
+        if atlas is None and rasterize:
+            atlas = build_atlas(font, viewport_w, viewport_h)
+        atlases[key] = atlas
+    return atlases[key]
+
+def _alpha_texture(atlas):
+    """Alpha texture of the atlas for the fixed-function path (GL_MODULATE
+    with the vertex color). The shader backend uploads its own GL_R8 copy."""
+    texture = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, texture)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_ALPHA, atlas['width'], atlas['height'], 0, GL_ALPHA, GL_UNSIGNED_BYTE, atlas['pixels'])
+    glBindTexture(GL_TEXTURE_2D, 0)
+    return texture
+
+def text_width(text, font):
+    """Pixel width of text from the font's real glyph advances."""
+    atlas = atlases.get(font_key(font))
+    if atlas:
+        glyphs = atlas['glyphs']
+        return sum(glyphs[ord(c)][3] for c in text if ord(c) in glyphs)
+    return sum(glutBitmapWidth(font, ord(c)) for c in text)
+
+def _build_run(atlas, text, layers):
+    glyphs = atlas['glyphs']
+    cell_h = atlas['cell_h']
+    descent = atlas['descent']
+    tw, th = float(atlas['width']), float(atlas['height'])
+    verts, uvs, cols = [], [], []
+    for dx, dy, color in layers:
+        pen = dx
+        for c in text:
+            g = glyphs.get(ord(c))
+            if g is None:
+                continue
+            gx, gy, cell_w, advance = g
+            x0 = pen - GLYPH_PAD
+            y0 = dy - GLYPH_PAD - descent
+            u0, v0 = gx / tw, gy / th
+            u1, v1 = (gx + cell_w) / tw, (gy + cell_h) / th
+            verts += [(x0, y0), (x0 + cell_w, y0), (x0 + cell_w, y0 + cell_h), (x0, y0 + cell_h)]
+            uvs += [(u0, v0), (u1, v0), (u1, v1), (u0, v1)]
+            cols += [color] * 4
+            pen += advance
+    return (np.array(verts, np.float32).reshape(-1, 2),
+            np.array(uvs, np.float32).reshape(-1, 2),
+            np.array(cols, np.float32).reshape(-1, 3))
+
+def text_run(text, layers, font):
+    """Cached (vertices, texcoords, colors) quads for text drawn once per layer,
+    layers being (dx, dy, rgb) in order (shadows first); None if the font has
+    no atlas."""
+    atlas = atlases.get(font_key(font))
+    if not atlas:
+        return None
+    key = (font_key(font), text, layers)
+    run = runs.get(key)
+    if run is None:
+        run = runs[key] = _build_run(atlas, text, layers)
+        if len(runs) > MAX_CACHED_RUNS:
+            runs.popitem(last=False)
+    else:
+        runs.move_to_end(key)
+    return run
+
+def draw_text_run(x, y, text, layers, font):
+    """Draw text at baseline (x, y) once per layer, layers being (dx, dy, rgb)
+    drawn in order (shadows first). One glDrawArrays for the whole string.
+    Returns False if the font has no atlas (caller falls back to GLUT)."""
+    run = text_run(text, layers, font)
+    if run is None:
+        return False
+    atlas = atlases[font_key(font)]
+    verts, uvs, cols = run
+    if not len(verts):
+        return True
+    if 'texture' not in atlas:
+        atlas['texture'] = _alpha_texture(atlas)
+    glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT | GL_TEXTURE_BIT)
+    glEnable(GL_TEXTURE_2D)
+    glBindTexture(GL_TEXTURE_2D, atlas['texture'])
+    glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
+    glEnable(GL_BLEND)
+    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    glPushMatrix()
+    glTranslatef(int(x), int(y), 0)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, verts)
+    glTexCoordPointer(2, GL_FLOAT, 0, uvs)
+    glColorPointer(3, GL_FLOAT, 0, cols)
+    glDrawArrays(GL_QUADS, 0, len(verts))
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glPopMatrix()
+    glPopAttrib()
+    return True
+
+
+def main():
+    """Rebake PREBAKED_ATLASES: rasterizes each font in a GLUT window (needs a
+    display and a fixed-function context) and writes it next to this module."""
+    glutInit()
+    glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB)
+    glutInitWindowSize(ATLAS_WIDTH, ATLAS_WIDTH)
+    glutCreateWindow(b"atlas bake")
+
+    def bake():
+        for name, font in PREBAKED_ATLASES.items():
+            atlas = build_atlas(font, ATLAS_WIDTH, ATLAS_WIDTH)
+            if atlas is None:
+                raise SystemExit(f"{name}: atlas does not fit in {ATLAS_WIDTH}x{ATLAS_WIDTH}")
+            save_atlas(atlas, atlas_path(name))
+            print(f"{atlas_path(name)}: {len(atlas['glyphs'])} glyphs, {atlas['width']}x{atlas['height']}")
+        raise SystemExit(0)
+
+    # Read back from a mapped window only (pixel ownership), so bake on first display
+    glutDisplayFunc(bake)
+    glutMainLoop()
+
+if __name__ == "__main__": main()
@@ -0,0 +1,16 @@
+"""GL-free simulation core for 8bit Doom.
+
+The game logic runs without GLUT or an OpenGL context so it can be stepped on
+CI and headless servers; 8bitdoom.py renders on top of it.
+
+    from doomsim import GameWorld
+    world = GameWorld(seed=0)
+    world.start_run(1)
+    world.step(1/60.0, {'keys': {b'w': True}, 'events': ['fire']})
+
+Each GameWorld owns all of its state, so independent worlds can be stepped
+side by side in one process.
+"""
+from .game import GameWorld
+
+__all__ = ['GameWorld']
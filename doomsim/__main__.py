@@ -0,0 +1,32 @@
+"""Run the simulation headless: python -m doomsim [--level N] [--frames N] [--dt S] [--seed N]
+
+Plays with cheat mode on (godmode + auto-fire) so the run makes progress
+without input, then prints how many frames per second were simulated.
+"""
+import argparse
+import time
+
+from .game import GameWorld
+from .constants import SIM_DT, STATE_PLAYING
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m doomsim')
+    parser.add_argument('--level', type=int, default=1)
+    parser.add_argument('--frames', type=int, default=10000)
+    parser.add_argument('--dt', type=float, default=SIM_DT)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    world = GameWorld(args.seed)
+    world.start_run(args.level)
+    world.toggle_cheat()
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        world.step(args.dt)
+    elapsed = time.perf_counter() - start
+    state = 'playing' if world.game_state == STATE_PLAYING else world.game_state
+    print(f"{args.frames} frames in {elapsed:.3f}s ({args.frames/elapsed:.0f} frames/s), "
+          f"level {world.current_level}, score {world.player.score}, state {state}")
+
+if __name__ == "__main__": main()
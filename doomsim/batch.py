@@ -0,0 +1,152 @@
+"""Batch runner: play many complete games (levels 1-10) in parallel.
+
+    python -m doomsim.batch [--runs N] [--workers N] [--seed S] [--max-minutes M] [--out FILE]
+
+Every game runs in its own GameWorld inside a worker process started with the
+'spawn' method, so runs never share state with each other or the parent.
+The scripted player is the cheat-mode auto-aim (autopilot, without godmode)
+plus strafing and perk use. Per-run results stream back as they finish (JSON
+lines) and are aggregated at the end.
+"""
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+from .constants import (PLAYER_MAX_HEALTH, SIM_DT, STATE_GAME_OVER_TRANSITION,
+                        STATE_PLAYING, STATE_YOU_WIN)
+from .game import GameWorld
+
+
+DEFAULT_RUNS = 100
+DEFAULT_MAX_MINUTES = 30.0  # simulated time limit per game
+STRAFE_PERIOD = 2.0         # seconds between strafe direction changes
+
+
+def scripted_inputs(world, tick):
+    """Inputs of the scripted player for this tick: strafe left/right and use
+    perks (health only when below half health)."""
+    strafe = b'a' if int(tick * SIM_DT / STRAFE_PERIOD) % 2 else b'd'
+    events = []
+    player = world.player
+    if player.gun_perk_available:
+        events.append('perk_gun')
+    if player.score_perk_available:
+        events.append('perk_score')
+    if player.health_perk_available and player.health < PLAYER_MAX_HEALTH / 2:
+        events.append('perk_health')
+    return {'keys': {strafe: True}, 'special_keys': {}, 'events': events}
+
+
+def play_game(seed, max_minutes=DEFAULT_MAX_MINUTES):
+    """Play one game from level 1 until it is won or max_minutes of simulated
+    time pass. Returns a result dict."""
+    world = GameWorld(seed)
+    world.autopilot = True
+    world.start_run(1)
+    max_ticks = int(max_minutes * 60.0 / SIM_DT)
+    level_ticks = collections.Counter()
+    level_deaths = collections.Counter()
+    deaths = 0
+    best_score = 0
+    was_playing = True
+    start = time.perf_counter()
+    tick = 0
+    while tick < max_ticks and world.game_state != STATE_YOU_WIN:
+        level = world.current_level
+        world.step(SIM_DT, scripted_inputs(world, tick))
+        tick += 1
+        level_ticks[level] += 1
+        best_score = max(best_score, world.player.score)
+        if world.game_state == STATE_GAME_OVER_TRANSITION and was_playing:
+            deaths += 1
+            level_deaths[level] += 1
+        was_playing = world.game_state == STATE_PLAYING
+    elapsed = time.perf_counter() - start
+    return {
+        'seed': seed,
+        'completed': world.game_state == STATE_YOU_WIN,
+        'level_reached': world.current_level,
+        'score': world.player.score,
+        'best_score': best_score,
+        'deaths': deaths,
+        'sim_seconds': round(tick * SIM_DT, 3),
+        'level_seconds': {lv: round(ticks * SIM_DT, 3) for lv, ticks in sorted(level_ticks.items())},
+        'level_deaths': dict(sorted(level_deaths.items())),
+        'ticks': tick,
+        'ticks_per_s': round(tick / elapsed, 1) if elapsed else 0.0,
+        'worker': os.getpid(),
+    }
+
+
+def _play_game_args(args):
+    return play_game(*args)
+
+
+def run_batch(seeds, workers=None, max_minutes=DEFAULT_MAX_MINUTES):
+    """Yield play_game() results for seeds, in completion order, from a pool of
+    workers processes (default: one per core)."""
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(workers or os.cpu_count()) as pool:
+        for result in pool.imap_unordered(_play_game_args, [(seed, max_minutes) for seed in seeds]):
+            yield result
+
+
+def aggregate(results, wall_seconds=None):
+    """Summary statistics over a list of play_game() results."""
+    if not results:
+        return {'runs': 0}
+    scores = [r['score'] for r in results]
+    level_seconds = {}
+    level_deaths = {}
+    for r in results:
+        for lv, secs in r['level_seconds'].items():
+            level_seconds.setdefault(int(lv), []).append(secs)
+        for lv, count in r['level_deaths'].items():
+            level_deaths[int(lv)] = level_deaths.get(int(lv), 0) + count
+    summary = {
+        'runs': len(results),
+        'completed': sum(r['completed'] for r in results),
+        'score_mean': round(statistics.mean(scores), 1),
+        'score_median': statistics.median(scores),
+        'score_min': min(scores),
+        'score_max': max(scores),
+        'deaths_mean': round(statistics.mean(r['deaths'] for r in results), 2),
+        'level_seconds_mean': {lv: round(statistics.mean(v), 2) for lv, v in sorted(level_seconds.items())},
+        'level_deaths_per_run': {lv: round(level_deaths.get(lv, 0) / len(results), 3) for lv in sorted(level_seconds)},
+        'worker_ticks_per_s_mean': round(statistics.mean(r['ticks_per_s'] for r in results), 1),
+    }
+    if wall_seconds:
+        summary['wall_seconds'] = round(wall_seconds, 2)
+        summary['total_ticks_per_s'] = round(sum(r['ticks'] for r in results) / wall_seconds, 1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m doomsim.batch')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first run; run i uses seed + i')
+    parser.add_argument('--max-minutes', type=float, default=DEFAULT_MAX_MINUTES, help='simulated time limit per game')
+    parser.add_argument('--out', metavar='FILE', help='write per-run results as JSON lines (default: stdout)')
+    args = parser.parse_args()
+
+    out = open(args.out, 'w') if args.out else sys.stdout
+    results = []
+    start = time.perf_counter()
+    try:
+        for result in run_batch(range(args.seed, args.seed + args.runs), args.workers, args.max_minutes):
+            results.append(result)
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+    finally:
+        if args.out:
+            out.close()
+    summary = aggregate(results, time.perf_counter() - start)
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+
+if __name__ == "__main__": main()
@@ -0,0 +1,261 @@
+"""Headless benchmark suite: python -m doomsim.bench [--ticks N] [--repeat N]
+[--only NAME ...] [--save FILE] [--compare [FILE]]
+
+Each scenario sets up a fresh seeded GameWorld and is stepped for a fixed number of
+SIM_DT ticks with scripted inputs. A scenario is run three ways:
+  - timing passes with the profiler off (best of --repeat) -> ticks/s
+  - one pass with the profiler on -> mean cost per tick of each sim phase
+  - one short pass under tracemalloc -> peak and net Python allocations
+Runs are deterministic, so a baseline saved with --save can be compared
+against later runs with --compare FILE; a bare --compare uses
+bench_baseline.json next to this module, the reference run recorded on the
+machine named in its meta. Timings are only compared when the baseline came
+from the same kind of machine (CPU model and count).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from .constants import DUNGEON_SIZE_X, DUNGEON_SIZE_Z, SIM_DT, STATE_PLAYING
+from .entities import Obstacle
+from .game import GameWorld
+from .profiler import FrameProfiler
+
+
+BENCH_SEED = 1234
+DEFAULT_TICKS = 2400     # 20 simulated seconds
+ALLOC_TICKS = 300
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+HORDE_SIZE = 150
+STORM_ENEMIES = 40
+DENSE_OBSTACLES = 300
+
+NO_INPUT = {'keys': {}, 'special_keys': {}, 'events': ()}
+
+# name -> (setup(world), inputs(tick) -> step inputs)
+SCENARIOS = {}
+
+
+def scenario(name, inputs=lambda tick: NO_INPUT):
+    def register(setup):
+        SCENARIOS[name] = (setup, inputs)
+        return setup
+    return register
+
+
+def _endless(world, level, max_concurrent):
+    """Make level spawn forever, up to max_concurrent enemies at a time."""
+    conf = world.level_config(level)
+    conf['total_enemies'] = 10**9
+    conf['max_concurrent'] = max_concurrent
+
+
+def _prefill(world, count):
+    """Spawn up to count enemies now instead of one per tick."""
+    for _ in range(count * 3):
+        if len(world.enemies) >= count:
+            break
+        world.spawn_enemy()
+
+
+def _start(world, level, cheat=True):
+    world.start_run(level)
+    world.cheat_mode = cheat
+
+
+def _boss_inputs(tick):
+    return {'keys': {b'e': True}, 'special_keys': {}, 'events': ('fire',) if tick % 6 == 0 else ()}
+
+@scenario('boss', _boss_inputs)
+def setup_boss(world):
+    """Level 10 against the boss: no cheat, the player turns and fires on
+    cooldown while the boss closes in and shoots back."""
+    _start(world, 10, cheat=False)
+    world.player.health = 10**9
+    _prefill(world, 1)
+
+
+@scenario('horde')
+def setup_horde(world):
+    """HORDE_SIZE concurrent type-1 wolves, cheat auto-fire thinning them out."""
+    _start(world, 3)
+    _endless(world, 3, HORDE_SIZE)
+    _prefill(world, HORDE_SIZE)
+
+
+def _storm_inputs(tick):
+    return {'keys': {b'e': True}, 'special_keys': {}, 'events': ('fire',)}
+
+@scenario('horde_mode')
+def setup_horde_mode(world):
+    """Endless horde mode at its full HORDE_MAX_ENEMIES array-backed enemies."""
+    world.start_horde()
+    world.cheat_mode = True
+
+
+@scenario('bullet_storm', _storm_inputs)
+def setup_bullet_storm(world):
+    """Rapid fire (gun perk) every tick while spinning, against STORM_ENEMIES
+    fast-shooting type-3 wolves."""
+    _start(world, 9)
+    _endless(world, 9, STORM_ENEMIES)
+    _prefill(world, STORM_ENEMIES)
+    world.player.gun_perk_time_left = 10**9
+
+
+@scenario('dense_obstacles')
+def setup_dense_obstacles(world):
+    """DENSE_OBSTACLES pillars (vs ~11 normally) with 60 enemies pathing through them."""
+    _start(world, 6)
+    rng = random.Random(BENCH_SEED)
+    obstacles = []
+    while len(obstacles) < DENSE_OBSTACLES:
+        x = rng.uniform(4.0, DUNGEON_SIZE_X - 4.0)
+        z = rng.uniform(4.0, DUNGEON_SIZE_Z - 4.0)
+        if (x - DUNGEON_SIZE_X/2)**2 + (z - DUNGEON_SIZE_Z/2)**2 < 100.0:
+            continue
+        obstacles.append(Obstacle([x, z], rng.uniform(0.6, 1.4), 4.0, [0.45, 0.32, 0.18], 'cyl'))
+    world.set_obstacles(obstacles)
+    _endless(world, 6, 60)
+    _prefill(world, 60)
+
+
+def _play(name, ticks, profiler=None):
+    """Set up scenario name and step it (timed by profiler, if given); returns
+    (elapsed, ticks played, max enemies, max bullets). Stops early if the game
+    leaves STATE_PLAYING."""
+    setup, inputs = SCENARIOS[name]
+    world = GameWorld(BENCH_SEED, profiler=profiler)
+    profiler = world.profiler
+    setup(world)
+    max_enemies = max_bullets = 0
+    played = 0
+    start = time.perf_counter()
+    for tick in range(ticks):
+        world.step(SIM_DT, inputs(tick))
+        profiler.mark_frame()
+        if world.game_state != STATE_PLAYING:
+            break
+        played += 1
+        max_enemies = max(max_enemies, len(world.enemies) + len(world.horde))
+        max_bullets = max(max_bullets, len(world.bullets))
+    return time.perf_counter() - start, played, max_enemies, max_bullets
+
+
+def run_scenario(name, ticks=DEFAULT_TICKS, repeat=3):
+    """Benchmark one scenario; returns its metrics dict."""
+    best = None
+    for _ in range(repeat):
+        elapsed, played, max_enemies, max_bullets = _play(name, ticks)
+        best = elapsed if best is None else min(best, elapsed)
+
+    profiler = FrameProfiler(history=ticks)
+    profiler.enable()
+    _play(name, ticks, profiler)
+    phases_us = {phase: round(st['mean_ms'] * 1000.0, 2) for phase, st in profiler.stats().items()}
+    phases_us.pop('frame', None)
+
+    tracemalloc.start()
+    base_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    _play(name, min(ticks, ALLOC_TICKS))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'ticks': played,
+        'ticks_per_s': round(played / best, 1) if best else 0.0,
+        'us_per_tick': round(best / max(played, 1) * 1e6, 2),
+        'phases_us': phases_us,
+        'alloc_peak_kib': round((peak - base_current) / 1024.0, 1),
+        'alloc_net_kib': round((current - base_current) / 1024.0, 1),
+        'max_enemies': max_enemies,
+        'max_bullets': max_bullets,
+        'ended_early': played < ticks,
+    }
+
+
+def _cpu_name():
+    """CPU model string, for telling apart baselines from different machines."""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def run_suite(names=None, ticks=DEFAULT_TICKS, repeat=3):
+    results = {}
+    for name in names or SCENARIOS:
+        results[name] = run_scenario(name, ticks, repeat)
+    return {
+        'meta': {'python': platform.python_version(), 'numpy': np.__version__,
+                 'platform': platform.platform(), 'cpu': _cpu_name(), 'cpus': os.cpu_count(),
+                 'seed': BENCH_SEED, 'ticks': ticks},
+        'scenarios': results,
+    }
+
+
+def same_machine(meta, other):
+    return meta.get('cpu') == other.get('cpu') and meta.get('cpus') == other.get('cpus')
+
+
+def print_report(report, baseline=None):
+    base = (baseline or {}).get('scenarios', {})
+    if base and not same_machine(report['meta'], baseline.get('meta', {})):
+        meta = baseline.get('meta', {})
+        print(f"(baseline is from another machine: {meta.get('cpu', 'unknown cpu')}, {meta.get('cpus', '?')} cpus;"
+              f" timings not compared)")
+        base = {}
+    for name, res in report['scenarios'].items():
+        line = (f"{name:<16} {res['ticks_per_s']:>10.0f} ticks/s  {res['us_per_tick']:>8.1f} us/tick  "
+                f"enemies<={res['max_enemies']:<4} bullets<={res['max_bullets']:<5} "
+                f"alloc peak {res['alloc_peak_kib']:.0f} KiB, net {res['alloc_net_kib']:+.0f} KiB")
+        if name in base and base[name]['ticks_per_s']:
+            change = (res['ticks_per_s'] / base[name]['ticks_per_s'] - 1.0) * 100.0
+            line += f"  [{change:+.1f}% vs baseline]"
+        if res['ended_early']:
+            line += "  (left play early)"
+        print(line)
+        for phase, us in sorted(res['phases_us'].items(), key=lambda kv: -kv[1]):
+            was = base.get(name, {}).get('phases_us', {}).get(phase)
+            delta = f"  (was {was:.1f})" if was is not None else ""
+            print(f"    {phase:<24} {us:>9.1f} us{delta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m doomsim.bench')
+    parser.add_argument('--ticks', type=int, default=DEFAULT_TICKS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', choices=sorted(SCENARIOS), metavar='NAME')
+    parser.add_argument('--save', metavar='FILE', help='write results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE', nargs='?', const=DEFAULT_BASELINE,
+                        help='baseline JSON to compare against (no FILE: the reference baseline)')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        meta = baseline.get('meta', {})
+        print(f"Comparing against {args.compare} ({meta.get('cpu', 'unknown cpu')}, "
+              f"{meta.get('cpus', '?')} cpus, Python {meta.get('python', '?')}, "
+              f"NumPy {meta.get('numpy', '?')})", file=sys.stderr)
+    report = run_suite(args.only, args.ticks, args.repeat)
+    print_report(report, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.save}", file=sys.stderr)
+
+if __name__ == "__main__": main()
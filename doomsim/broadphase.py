@@ -0,0 +1,228 @@
+"""Uniform-grid broadphase over the dungeon floor (XZ plane).
+
+Circles (enemy hit spheres projected onto the floor) are bucketed into every
+cell they overlap; points (bullets) fall into exactly one cell, so candidate
+(point, circle) pairs come out unique and only neighbours are distance-tested.
+"""
+import math
+
+import numpy as np
+
+from .constants import DUNGEON_SIZE_X, DUNGEON_SIZE_Z
+
+
+BROADPHASE_CELL_SIZE = 5.0
+# Below this many bullet x enemy pairs, testing them all is cheaper than the grid
+BROADPHASE_MIN_PAIRS = 256
+
+
+class UniformGrid:
+    """Cell arithmetic for a grid covering [0, size_x] x [0, size_z]. Positions
+    outside the dungeon clamp to the border cells."""
+
+    def __init__(self, cell_size=BROADPHASE_CELL_SIZE, size_x=DUNGEON_SIZE_X, size_z=DUNGEON_SIZE_Z):
+        self.cell_size = cell_size
+        self.cols = int(math.ceil(size_x / cell_size))
+        self.rows = int(math.ceil(size_z / cell_size))
+
+    def cell_range(self, x, z, r):
+        """Inclusive (cx0, cx1, cz0, cz1) of the cells a circle overlaps."""
+        cs = self.cell_size
+        cx0 = min(max(int((x - r) // cs), 0), self.cols - 1)
+        cx1 = min(max(int((x + r) // cs), 0), self.cols - 1)
+        cz0 = min(max(int((z - r) // cs), 0), self.rows - 1)
+        cz1 = min(max(int((z + r) // cs), 0), self.rows - 1)
+        return cx0, cx1, cz0, cz1
+
+    def cell_ids(self, xs, zs):
+        """Flat cell id (cz * cols + cx) for arrays of positions."""
+        cx = np.minimum(np.maximum((xs // self.cell_size).astype(np.intp), 0), self.cols - 1)
+        cz = np.minimum(np.maximum((zs // self.cell_size).astype(np.intp), 0), self.rows - 1)
+        return cz * self.cols + cx
+
+    def neighbor_pairs(self, point_xs, point_zs, item_xs, item_zs):
+        """Candidate (point_idx, item_idx) pairs for every item in the 3x3 cells
+        around each point. Complete for any point/item reach up to cell_size,
+        and needs no per-item Python work, so it suits thousands of items."""
+        empty = np.zeros(0, np.intp)
+        if not len(point_xs) or not len(item_xs):
+            return empty, empty
+        item_cells = self.cell_ids(item_xs, item_zs)
+        order = np.argsort(item_cells, kind='stable')
+        sorted_cells = item_cells[order]
+        cx = np.minimum(np.maximum((point_xs // self.cell_size).astype(np.intp), 0), self.cols - 1)
+        cz = np.minimum(np.maximum((point_zs // self.cell_size).astype(np.intp), 0), self.rows - 1)
+        points, items = [], []
+        for oz in (-1, 0, 1):
+            for ox in (-1, 0, 1):
+                ncx = cx + ox
+                ncz = cz + oz
+                valid = (ncx >= 0) & (ncx < self.cols) & (ncz >= 0) & (ncz < self.rows)
+                p, k = self.match_cells(sorted_cells, ncz * self.cols + ncx, valid)
+                if len(p):
+                    points.append(p)
+                    items.append(order[k])
+        if not points:
+            return empty, empty
+        return np.concatenate(points), np.concatenate(items)
+
+    @staticmethod
+    def match_cells(sorted_cells, cells, valid=None):
+        """Join cell ids against a sorted cell id array: (query_idx, sorted_idx)
+        for every entry of sorted_cells equal to cells[query_idx], skipping
+        queries where valid is False."""
+        lo = np.searchsorted(sorted_cells, cells, side='left')
+        counts = np.searchsorted(sorted_cells, cells, side='right') - lo
+        if valid is not None:
+            counts = np.where(valid, counts, 0)
+        total = int(counts.sum())
+        if not total:
+            empty = np.zeros(0, np.intp)
+            return empty, empty
+        # Expand each query's [lo, lo + count) run of sorted entries
+        run_start = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        return np.repeat(np.arange(len(cells)), counts), run_start + np.arange(total)
+
+
+class SpatialHash(UniformGrid):
+    """Dynamic circle buckets, rebuilt every tick from the moving entities.
+    Buckets are flat (cell id, item) arrays sorted by cell id."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cell_keys = np.zeros(0, np.intp)
+        self.cell_items = np.zeros(0, np.intp)
+
+    def rebuild(self, circles):
+        """Bucket (x, z, radius) circles, given as rows of a sequence or (n, 3)
+        array; item ids are their row indices."""
+        if not len(circles):
+            self.cell_keys = self.cell_items = np.zeros(0, np.intp)
+            return
+        x, z, r = np.array(circles, float).reshape(-1, 3).T
+        cs = self.cell_size
+        cx0 = np.clip(((x - r) // cs).astype(np.intp), 0, self.cols - 1)
+        cx1 = np.clip(((x + r) // cs).astype(np.intp), 0, self.cols - 1)
+        cz0 = np.clip(((z - r) // cs).astype(np.intp), 0, self.rows - 1)
+        cz1 = np.clip(((z + r) // cs).astype(np.intp), 0, self.rows - 1)
+        # One entry per (item, covered cell), walking each item's cell rectangle
+        width = cx1 - cx0 + 1
+        counts = width * (cz1 - cz0 + 1)
+        item = np.repeat(np.arange(len(x)), counts)
+        k = np.arange(len(item)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = (cz0[item] + k // width[item]) * self.cols + cx0[item] + k % width[item]
+        order = np.argsort(cells, kind='stable')
+        self.cell_keys = cells[order]
+        self.cell_items = item[order]
+
+    def query_pairs(self, xs, zs):
+        """Candidate pairs for points (xs, zs): returns (point_idx, item_idx)
+        arrays of every point sharing a cell with a circle."""
+        if not len(self.cell_keys) or not len(xs):
+            empty = np.zeros(0, np.intp)
+            return empty, empty
+        points, k = self.match_cells(self.cell_keys, self.cell_ids(xs, zs))
+        return points, self.cell_items[k]
+
+
+# Largest query radius answered with a single cell lookup (boss collision
+# radius is ~2.7); bigger queries fall back to scanning the covered cells.
+STATIC_QUERY_RADIUS = 3.0
+
+
+class StaticCircleIndex(UniformGrid):
+    """Immutable per-level index of static circles (obstacles).
+
+    Each circle is bucketed into every cell it could touch when grown by
+    max_query_radius, so "does a circle of radius r <= max_query_radius at
+    (x, z) hit anything" only has to look at the one cell containing (x, z).
+    Buckets are packed CSR-style: cell c owns items[start[c]:start[c+1]].
+    """
+
+    def __init__(self, circles, max_query_radius=STATIC_QUERY_RADIUS, buckets=None, **grid_kwargs):
+        """buckets is an optional precomputed (start, items) pair, as stored in
+        level packs, for the same circles, grid and max_query_radius."""
+        super().__init__(**grid_kwargs)
+        self.max_query_radius = max_query_radius
+        n_cells = self.cols * self.rows
+        if buckets is None:
+            lists = [[] for _ in range(n_cells)]
+            for item, (x, z, r) in enumerate(circles):
+                cx0, cx1, cz0, cz1 = self.cell_range(x, z, r + max_query_radius)
+                for cz in range(cz0, cz1 + 1):
+                    for cx in range(cx0, cx1 + 1):
+                        lists[cz * self.cols + cx].append(item)
+            start = np.zeros(n_cells + 1, np.intp)
+            start[1:] = np.cumsum([len(b) for b in lists])
+            items = np.array([i for b in lists for i in b], np.intp)
+        else:
+            start, items = buckets
+            if len(start) != n_cells + 1:
+                raise ValueError(f"bucket table has {len(start) - 1} cells, grid has {n_cells}")
+        circles = [tuple(c[:3]) for c in circles]
+        self.xs = np.array([c[0] for c in circles], float)
+        self.zs = np.array([c[1] for c in circles], float)
+        self.rs = np.array([c[2] for c in circles], float)
+        self.start = np.asarray(start, np.intp)
+        self.items = np.asarray(items, np.intp)
+        self.max_per_cell = int(np.diff(self.start).max()) if n_cells else 0
+        # Per-cell (x, z, r) tuples for scalar queries from Python, which are
+        # much faster to iterate than NumPy scalars.
+        bounds = self.start.tolist()
+        items = self.items.tolist()
+        self._cell_circles = tuple(tuple(circles[i] for i in items[bounds[c]:bounds[c + 1]]) for c in range(n_cells))
+        self._circles = tuple(circles)
+        self._cs = float(self.cell_size)
+
+    def __len__(self):
+        return len(self._circles)
+
+    def hits(self, x, z, r):
+        """True if a circle of radius r at (x, z) overlaps any indexed circle."""
+        if r > self.max_query_radius:
+            return self._hits_wide(x, z, r)
+        cs = self._cs
+        cx = int(x // cs)
+        cz = int(z // cs)
+        if cx < 0: cx = 0
+        elif cx >= self.cols: cx = self.cols - 1
+        if cz < 0: cz = 0
+        elif cz >= self.rows: cz = self.rows - 1
+        for ox, oz, orad in self._cell_circles[cz * self.cols + cx]:
+            dx = x - ox
+            dz = z - oz
+            reach = r + orad
+            if dx*dx + dz*dz < reach*reach:
+                return True
+        return False
+
+    def _hits_wide(self, x, z, r):
+        cx0, cx1, cz0, cz1 = self.cell_range(x, z, r)
+        for cz in range(cz0, cz1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                for ox, oz, orad in self._cell_circles[cz * self.cols + cx]:
+                    dx = x - ox
+                    dz = z - oz
+                    if dx*dx + dz*dz < (r + orad)**2:
+                        return True
+        return False
+
+    def hits_many(self, xs, zs, rs):
+        """Vectorized hits(): boolean array for arrays of circles, all with
+        radius <= max_query_radius."""
+        out = np.zeros(len(xs), bool)
+        if not self.max_per_cell or not len(xs):
+            return out
+        cell = self.cell_ids(xs, zs)
+        first = self.start[cell]
+        count = self.start[cell + 1] - first
+        for k in range(self.max_per_cell):
+            has = count > k
+            if not has.any():
+                break
+            item = self.items[np.where(has, first + k, 0)]
+            dx = xs - self.xs[item]
+            dz = zs - self.zs[item]
+            reach = rs + self.rs[item]
+            out |= has & (dx*dx + dz*dz < reach*reach)
+        return out
@@ -0,0 +1,36 @@
+"""Level pack command line: python -m doomsim.buildpack build [OUT] | info [PACK]
+
+Kept apart from levelpack.py, which the package imports on startup (through
+game), so running this as __main__ does not import the module twice.
+"""
+import argparse
+import sys
+
+from .levelpack import CAMPAIGN_LEVELS, DEFAULT_PACK_PATH, LevelPack, LevelPackError, write_pack
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m doomsim.buildpack')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='compile the campaign tables into a pack')
+    build.add_argument('out', nargs='?', default=DEFAULT_PACK_PATH)
+    info = sub.add_parser('info', help='list the levels in a pack')
+    info.add_argument('pack', nargs='?', default=DEFAULT_PACK_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        size = write_pack(args.out)
+        print(f"wrote {args.out}: {len(CAMPAIGN_LEVELS)} levels, {size} bytes")
+        return
+    try:
+        pack = LevelPack.open(args.pack)
+    except (OSError, ValueError, LevelPackError) as e:
+        sys.exit(f"{args.pack}: {e}")
+    print(f"{args.pack}: {pack.level_count} levels, {len(pack.archetypes)} archetypes, {len(pack.biomes)} biomes")
+    for n in range(1, pack.level_count + 1):
+        level = pack.level(n)
+        print(f"  {n:>3}  {pack.biomes[level.biome]['name']:<8} enemies {level.total_enemies:>3} "
+              f"(max {level.max_concurrent}){' boss' if level.is_boss_level else ''}  "
+              f"obstacles {len(level.obstacles)}")
+
+if __name__ == "__main__": main()
@@ -0,0 +1,164 @@
+"""Streamed open map for explore mode: MAP_CHUNKS x MAP_CHUNKS square chunks.
+
+Nothing of the map exists up front. Each chunk (floor biome, obstacles and their
+collision index, enemy spawn points) is generated from its own random stream
+seeded by (map seed, chunk x, chunk z), so it comes back identical every time
+it is generated, and the map needs no storage beyond the chunks in use.
+
+ChunkMap keeps the chunks within CHUNK_LOAD_RADIUS of the player resident,
+generating at most CHUNK_GEN_PER_TICK per tick (nearest first) so walking never
+stalls a frame, and evicts chunks beyond CHUNK_EVICT_RADIUS. At most
+(2 * CHUNK_EVICT_RADIUS + 1)**2 chunks are ever resident, wherever the player is.
+
+ChunkMap answers the same hits()/hits_many() queries as StaticCircleIndex, so
+movement code uses it as the world's obstacle_index. Ground that is not
+resident (not generated yet) counts as solid.
+"""
+import random
+
+import numpy as np
+
+from .broadphase import StaticCircleIndex
+from .entities import Obstacle
+
+
+CHUNK_SIZE = 100.0
+MAP_CHUNKS = 100          # 10,000 x 10,000 units
+CHUNK_LOAD_RADIUS = 1     # keep the 3x3 chunks around the player resident
+CHUNK_EVICT_RADIUS = 2    # drop chunks farther than this (hysteresis)
+CHUNK_GEN_PER_TICK = 1
+# Obstacles stay this far inside their chunk, so a query (up to
+# STATIC_QUERY_RADIUS) only ever needs the chunk containing its center
+CHUNK_EDGE_MARGIN = 8.0
+CHUNK_OBSTACLES = (6, 12)
+CHUNK_ENEMIES = (0, 4)
+CHUNK_ENEMY_TYPES = (1, 2, 3)
+BIOME_REGION_CHUNKS = 8   # biomes come in regions of 8x8 chunks
+
+
+class Chunk:
+    """One generated chunk. obstacles are in map coordinates, index in chunk-local ones."""
+
+    __slots__ = ('cx', 'cz', 'x0', 'z0', 'serial', 'biome', 'obstacles', 'index', 'spawns')
+
+
+def chunk_biome(seed, cx, cz, biome_count):
+    region = random.Random(f"{seed}:biome:{cx // BIOME_REGION_CHUNKS}:{cz // BIOME_REGION_CHUNKS}")
+    return region.randrange(biome_count)
+
+
+def generate_chunk(seed, cx, cz, biomes, clear=None):
+    """Generate chunk (cx, cz). clear is an optional (x, z, radius) circle in map
+    coordinates kept free of obstacles and enemies (the player's spawn)."""
+    rng = random.Random(f"{seed}:chunk:{cx}:{cz}")
+    chunk = Chunk()
+    chunk.cx = cx
+    chunk.cz = cz
+    chunk.x0 = cx * CHUNK_SIZE
+    chunk.z0 = cz * CHUNK_SIZE
+    chunk.serial = 0
+    chunk.biome = chunk_biome(seed, cx, cz, len(biomes))
+    col = biomes[chunk.biome]['obstacle']
+    lo, hi = CHUNK_EDGE_MARGIN, CHUNK_SIZE - CHUNK_EDGE_MARGIN
+
+    def is_clear(x, z, r):
+        if clear is None:
+            return True
+        dx = chunk.x0 + x - clear[0]
+        dz = chunk.z0 + z - clear[1]
+        return dx*dx + dz*dz >= (clear[2] + r)**2
+
+    circles = []
+    chunk.obstacles = []
+    for i in range(rng.randint(*CHUNK_OBSTACLES)):
+        x = rng.uniform(lo, hi)
+        z = rng.uniform(lo, hi)
+        r = rng.uniform(1.2, 2.2)
+        h = rng.uniform(3.0, 6.0)
+        if not is_clear(x, z, r):
+            continue
+        circles.append((x, z, r))
+        chunk.obstacles.append(Obstacle([chunk.x0 + x, chunk.z0 + z], r, h, list(col), 'cyl' if i % 2 == 0 else 'box'))
+    chunk.index = StaticCircleIndex(circles, size_x=CHUNK_SIZE, size_z=CHUNK_SIZE)
+    chunk.spawns = []
+    for _ in range(rng.randint(*CHUNK_ENEMIES)):
+        type_id = rng.choice(CHUNK_ENEMY_TYPES)
+        x = rng.uniform(lo, hi)
+        z = rng.uniform(lo, hi)
+        # Not inside an obstacle, and well away from the player's spawn
+        if is_clear(x, z, 20.0) and not chunk.index.hits(x, z, 1.0):
+            chunk.spawns.append((type_id, chunk.x0 + x, chunk.z0 + z))
+    return chunk
+
+
+class ChunkMap:
+    """The resident chunks of one open map, streamed around a moving point."""
+
+    def __init__(self, seed, biomes, size_chunks=MAP_CHUNKS, clear=None):
+        self.seed = seed
+        self.biomes = biomes
+        self.size_chunks = size_chunks
+        self.size_x = self.size_z = size_chunks * CHUNK_SIZE
+        self.clear = clear
+        self.resident = {}    # (cx, cz) -> Chunk
+        self.serial = 0       # bumped per generated chunk, so renderers can tell reloads apart
+
+    def __len__(self):
+        return len(self.resident)
+
+    def chunk_key(self, x, z):
+        last = self.size_chunks - 1
+        cx = min(max(int(x // CHUNK_SIZE), 0), last)
+        cz = min(max(int(z // CHUNK_SIZE), 0), last)
+        return cx, cz
+
+    def load(self, cx, cz):
+        chunk = generate_chunk(self.seed, cx, cz, self.biomes, self.clear)
+        self.serial += 1
+        chunk.serial = self.serial
+        self.resident[cx, cz] = chunk
+        return chunk
+
+    def update(self, x, z, budget=CHUNK_GEN_PER_TICK):
+        """Stream around (x, z): evict far chunks, then generate up to budget
+        missing chunks in load range, nearest first (budget None: all of them).
+        Returns (loaded, evicted) lists of chunks."""
+        pcx, pcz = self.chunk_key(x, z)
+        evicted = [chunk for (cx, cz), chunk in self.resident.items()
+                   if max(abs(cx - pcx), abs(cz - pcz)) > CHUNK_EVICT_RADIUS]
+        for chunk in evicted:
+            del self.resident[chunk.cx, chunk.cz]
+        missing = []
+        last = self.size_chunks - 1
+        for cz in range(max(pcz - CHUNK_LOAD_RADIUS, 0), min(pcz + CHUNK_LOAD_RADIUS, last) + 1):
+            for cx in range(max(pcx - CHUNK_LOAD_RADIUS, 0), min(pcx + CHUNK_LOAD_RADIUS, last) + 1):
+                if (cx, cz) not in self.resident:
+                    missing.append((abs(cx - pcx) + abs(cz - pcz), cx, cz))
+        missing.sort()
+        if budget is not None:
+            del missing[budget:]
+        loaded = [self.load(cx, cz) for _, cx, cz in missing]
+        return loaded, evicted
+
+    def obstacles(self):
+        """Obstacles of every resident chunk."""
+        return [ob for chunk in self.resident.values() for ob in chunk.obstacles]
+
+    def hits(self, x, z, r):
+        """True if a circle of radius r at (x, z) overlaps an obstacle or ground
+        that is not resident."""
+        chunk = self.resident.get((int(x // CHUNK_SIZE), int(z // CHUNK_SIZE)))
+        if chunk is None:
+            return True
+        return chunk.index.hits(x - chunk.x0, z - chunk.z0, r)
+
+    def hits_many(self, xs, zs, rs):
+        """Vectorized hits() for arrays of circles."""
+        out = np.ones(len(xs), bool)
+        cxs = (xs // CHUNK_SIZE).astype(np.intp)
+        czs = (zs // CHUNK_SIZE).astype(np.intp)
+        for (cx, cz), chunk in self.resident.items():
+            rows = np.flatnonzero((cxs == cx) & (czs == cz))
+            if len(rows):
+                out[rows] = chunk.index.hits_many(xs[rows] - chunk.x0, zs[rows] - chunk.z0, rs[rows])
+        return out
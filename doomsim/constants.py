@@ -0,0 +1,88 @@
+"""Gameplay constants shared by the simulation and the renderer.
+
+Nothing in here may import OpenGL: the simulation has to run on machines
+without a display.
+"""
+
+# --- Game States ---
+STATE_PLAYING = 0
+STATE_LEVEL_TRANSITION = 1
+STATE_GAME_OVER_TRANSITION = 2
+STATE_YOU_WIN = 3
+# UI/Menu States
+STATE_MAIN_MENU = 100
+STATE_LEVEL_SELECT = 101
+STATE_HALL_OF_FAME = 102
+STATE_PAUSED = 103
+
+# Player settings
+PLAYER_SPEED = 5.0
+PLAYER_TURN_RATE = 60.0  # degrees per second (Q/E turning, camera pitch/orbit)
+PLAYER_TOTAL_HEIGHT = 1.8
+PLAYER_BODY_Y_OFFSET = PLAYER_TOTAL_HEIGHT / 2 
+PLAYER_EYE_HEIGHT_FROM_MODEL_BASE = 1.6 
+PLAYER_RADIUS = 0.5 
+PLAYER_MAX_HEALTH = 100
+PLAYER_BASE_SHOOT_COOLDOWN_TIME = 0.3
+
+# Player model proportions
+PLAYER_LEG_LENGTH = PLAYER_TOTAL_HEIGHT * 0.45
+PLAYER_TORSO_HEIGHT = PLAYER_TOTAL_HEIGHT * 0.4
+PLAYER_ARM_LENGTH = PLAYER_TOTAL_HEIGHT * 0.35
+PLAYER_GUN_LENGTH = PLAYER_TOTAL_HEIGHT * 0.3
+
+# Bullet settings
+BULLET_SPEED = 30.0
+BULLET_RADIUS = 0.1
+BULLET_LIFESPAN = 2.5
+
+# Enemy settings
+ENEMY_MIN_DISTANCE_FROM_PLAYER = 3.5
+ENEMY_BASE_COLLISION_RADIUS = 0.6
+
+# Perk System Variables
+PERK_SCORE_MULTIPLIER_DURATION = 5.0
+PERK_RAPID_FIRE_DURATION = 5.0
+
+# Dungeon settings
+DUNGEON_SIZE_X = 100.0
+DUNGEON_SIZE_Z = 100.0
+WALL_HEIGHT = 8.0
+TILE_SIZE = 5.0
+
+# Camera
+CAMERA_MODE_FIRST_PERSON = 0
+CAMERA_MODE_THIRD_PERSON = 1
+
+# Cheat mode (auto-fire + godmode)
+CHEAT_SHOOT_INTERVAL = 0.18  # seconds between auto shots
+
+# Smooth facing
+PLAYER_TURN_SPEED_DEG_PER_SEC = 240.0
+
+# Level transitions
+TRANSITION_DURATION = 1.5
+
+# Horde (endless) mode: array-backed enemies, refilled as they die
+HORDE_MAX_ENEMIES = 5000
+HORDE_RESPAWN_PER_SECOND = 100.0
+HORDE_ENEMY_TYPES = (1, 2, 3)
+HORDE_LEVEL = 1               # dungeon layout and theme used for horde mode
+HORDE_SPAWN_CLEARANCE = 15.0  # no spawns closer than this to the player
+
+# Explore mode: a streamed open map (see chunks.py)
+EXPLORE_LEVEL = 1             # level whose quotas/theme stand in for HUD and menus
+EXPLORE_CHASE_RANGE = 40.0    # enemies farther than this wait instead of converging
+
+# Fixed-timestep simulation (see game.advance)
+SIM_TICK_RATE = 120
+SIM_DT = 1.0 / SIM_TICK_RATE
+MAX_FRAME_TIME = 0.25  # longer frames are dropped rather than caught up
+MAX_TICKS_PER_FRAME = int(MAX_FRAME_TIME * SIM_TICK_RATE)
+
+# Special key codes. Same values as GLUT_KEY_* so the GLUT callbacks can pass
+# their key argument straight through.
+KEY_LEFT = 100
+KEY_UP = 101
+KEY_RIGHT = 102
+KEY_DOWN = 103
@@ -0,0 +1,91 @@
+"""Entity records for the simulation.
+
+Plain classes with __slots__: no per-instance __dict__, so they are smaller than
+the dicts they replace and attribute reads compile to fixed slot lookups.
+"""
+from .constants import (DUNGEON_SIZE_X, DUNGEON_SIZE_Z, ENEMY_BASE_COLLISION_RADIUS, PLAYER_BASE_SHOOT_COOLDOWN_TIME,
+                        PLAYER_BODY_Y_OFFSET, PLAYER_MAX_HEALTH, PLAYER_SPEED)
+
+
+class Player:
+    """Position/rotation, health and score, shot cooldown, and perk counters/timers."""
+
+    __slots__ = ('pos', 'prev_pos', 'rotation_y', 'rotation_x', 'health', 'score', 'speed',
+                 'shoot_cooldown', 'current_shoot_cooldown_time',
+                 'kills_for_health_perk', 'kills_for_score_perk', 'kills_for_gun_perk',
+                 'health_perk_available', 'score_perk_available', 'gun_perk_available',
+                 'score_perk_time_left', 'gun_perk_time_left')
+
+    def __init__(self):
+        self.pos = [DUNGEON_SIZE_X / 2, PLAYER_BODY_Y_OFFSET, DUNGEON_SIZE_Z / 2]
+        self.prev_pos = None  # position at the previous tick, for render interpolation
+        self.rotation_y = 0.0
+        self.rotation_x = 0.0
+        self.health = PLAYER_MAX_HEALTH
+        self.score = 0
+        self.speed = PLAYER_SPEED
+        self.shoot_cooldown = 0.0
+        self.current_shoot_cooldown_time = PLAYER_BASE_SHOOT_COOLDOWN_TIME
+        self.reset_perks()
+
+    def reset_perks(self):
+        self.kills_for_health_perk = 0
+        self.kills_for_score_perk = 0
+        self.kills_for_gun_perk = 0
+        self.health_perk_available = False
+        self.score_perk_available = False
+        self.gun_perk_available = False
+        self.score_perk_time_left = 0.0
+        self.gun_perk_time_left = 0.0
+
+
+class Archetype:
+    """Shared, read-only stats and look of one enemy type in one biome (a
+    flyweight). Built once per level pack, see LevelPack.archetype()."""
+
+    __slots__ = ('key', 'name', 'biome', 'max_health', 'damage', 'speed_mult', 'speed', 'reload_time',
+                 'points', 'color', 'model_height', 'collision_radius', 'is_boss')
+
+    def __init__(self, key, biome, config):
+        self.key = key
+        self.name = config['name']
+        self.biome = biome
+        self.max_health = config['health']
+        self.damage = config['damage']
+        self.speed_mult = config['speed_mult']
+        self.speed = PLAYER_SPEED * config['speed_mult']
+        self.reload_time = 1.5 / (config['speed_mult'] + 0.5)
+        self.points = config['points']
+        self.color = tuple(config['color'])
+        self.model_height = config['model_height']
+        self.collision_radius = ENEMY_BASE_COLLISION_RADIUS * (config['model_height'] / 1.8)
+        self.is_boss = config.get('is_boss', False)
+
+
+class Enemy:
+    """One campaign wolf: per-instance state plus its shared Archetype. home is
+    the (cx, cz, index) chunk spawn it came from in explore mode, else None."""
+
+    __slots__ = ('pos', 'prev_pos', 'archetype', 'health', 'shoot_cooldown', 'rotation_y', 'home')
+
+    def __init__(self, archetype, pos, shoot_cooldown, home=None):
+        self.pos = pos
+        self.prev_pos = None
+        self.archetype = archetype
+        self.health = archetype.max_health
+        self.shoot_cooldown = shoot_cooldown
+        self.rotation_y = 0.0
+        self.home = home
+
+
+class Obstacle:
+    """Static pillar or block: floor position [x, z], radius, height, color, shape ('cyl' or 'box')."""
+
+    __slots__ = ('pos', 'radius', 'height', 'color', 'shape')
+
+    def __init__(self, pos, radius, height, color, shape):
+        self.pos = pos
+        self.radius = radius
+        self.height = height
+        self.color = color
+        self.shape = shape
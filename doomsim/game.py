@@ -0,0 +1,1041 @@
+"""Game state and per-frame logic for 8bit Doom.
+
+Everything the game needs to advance a frame is owned by a GameWorld, with no
+OpenGL/GLUT imports, so the world can be stepped headless and any number of
+independent worlds can share one process. The renderer in 8bitdoom.py reads one
+world's state and feeds input back through its step().
+"""
+import math
+import random
+
+import numpy as np
+
+from .broadphase import BROADPHASE_MIN_PAIRS, SpatialHash, StaticCircleIndex, UniformGrid
+from .chunks import CHUNK_SIZE, MAP_CHUNKS, ChunkMap
+from .constants import *
+from .entities import Enemy, Obstacle, Player
+from .horde import EnemyPool
+from .levelpack import SHAPES, default_pack
+from .profiler import FrameProfiler
+from .projectiles import OWNER_ENEMY, OWNER_PLAYER, ProjectilePool
+from .vecmath import normalize_vector, distance_3d, sweep_sphere, sweep_spheres
+
+
+# Up to this many bullet x (enemies + player) pairs, update_bullets works on
+# plain floats: for a handful of bullets NumPy's fixed per-call cost dominates
+SCALAR_BULLET_PAIRS = 64
+
+
+def _resolve_impacts(pair_b, pair_e, toi, health):
+    """Settle swept (bullet, enemy, distance to impact) candidate pairs into
+    hits; toi is inf for pairs that miss (see vecmath.sweep_spheres). Every bullet
+    hits the enemy it reaches first (ties: lowest enemy index); an enemy takes
+    at most health[enemy] hits, earliest first, and bullets that reach it after
+    it died move on to the next enemy on their path. Returns (bullets, enemies)
+    arrays of the hits."""
+    hit = toi < np.inf
+    if not hit.any():
+        empty = np.zeros(0, np.intp)
+        return empty, empty
+    pair_b, pair_e, toi = pair_b[hit], pair_e[hit], toi[hit]
+    order = np.lexsort((pair_e, toi, pair_b))
+    pair_b, pair_e, toi = pair_b[order], pair_e[order], toi[order]
+    health = np.array(health, np.int64)
+    hits_b, hits_e = [], []
+    while len(pair_b):
+        first = np.ones(len(pair_b), bool)
+        first[1:] = pair_b[1:] != pair_b[:-1]
+        first_b, first_e, first_t = pair_b[first], pair_e[first], toi[first]
+        # Rank bullets within each enemy by impact time; keep the first health-many
+        order = np.lexsort((first_b, first_t, first_e))
+        first_b, first_e = first_b[order], first_e[order]
+        group_start = np.ones(len(first_e), bool)
+        group_start[1:] = first_e[1:] != first_e[:-1]
+        starts = np.flatnonzero(group_start)
+        rank = np.arange(len(first_e)) - np.repeat(starts, np.diff(np.append(starts, len(first_e))))
+        taken = rank < health[first_e]
+        first_b, first_e = first_b[taken], first_e[taken]
+        hits_b.append(first_b)
+        hits_e.append(first_e)
+        np.subtract.at(health, first_e, 1)
+        # Spent bullets and dead enemies drop out; a bullet turned away by a dead
+        # enemy is left with its later pairs
+        keep = ~np.isin(pair_b, first_b) & (health[pair_e] > 0)
+        pair_b, pair_e, toi = pair_b[keep], pair_e[keep], toi[keep]
+    return np.concatenate(hits_b), np.concatenate(hits_e)
+
+
+class GameWorld:
+    """One complete game: state, level, entities, random streams and input.
+
+        world = GameWorld(seed)
+        world.start_run(1)
+        world.step(1/60.0, {'keys': {b'w': True}, 'events': ['fire']})
+    """
+
+    __slots__ = (
+        'game_state', 'current_level',
+        # Camera (owned by the simulation because movement is relative to it)
+        'camera_mode', 'tp_camera_pitch', 'tp_camera_yaw_offset',
+        # Game objects
+        'player', 'enemies', 'bullets',
+        # Broadphase for bullet-vs-enemy hits, rebuilt each tick in update_bullets
+        'enemy_grid',
+        # Horde mode: enemies live in an EnemyPool instead of the enemies list
+        'horde', 'horde_mode', 'horde_target', 'horde_spawn_budget',
+        # Explore mode: a ChunkMap streamed around the player replaces the
+        # level's obstacles (None outside explore mode)
+        'explore_mode', 'chunk_map',
+        # Playable area; movement and bullets are bounded by it
+        'map_size_x', 'map_size_z',
+        # Level Management: level definitions come from a levelpack.LevelPack,
+        # level_configs holds the mutable per-level quotas for this game
+        'pack', 'level_configs', 'enemies_killed_this_level', 'enemies_spawned_this_level', 'boss_entity',
+        # Cheat mode (auto-fire + godmode); autopilot aims and fires the same
+        # way without godmode (scripted players)
+        'cheat_mode', 'autopilot', 'cheat_fire_timer',
+        # Score record guard
+        'win_score_recorded', 'current_session_score_recorded',
+        # Level obstacles (pillars/blocks), their collision index (all movement
+        # queries go through it) and a counter bumped by every init_level so
+        # renderers know when static geometry changed
+        'obstacles', 'obstacle_index', 'level_generation',
+        'enemy_anim_time',
+        # Transitions
+        'transition_timer', 'transition_color', 'next_game_state_after_transition',
+        # Held input for the current step (see step())
+        'keys_pressed', 'special_keys_pressed',
+        # High scores (in-memory per run) - keep only recent top 3
+        'hof_records', 'hof_seq',
+        # Per-subsystem random streams, seeded by seed_rng(). Obstacle layouts
+        # are baked into the level pack so they never depend on play.
+        'rng_seed', 'spawn_rng', 'ai_rng', 'horde_rng',
+        # Fixed-timestep driver state (see advance())
+        'sim_accumulator', 'queued_events',
+        # Active replay.ReplayRecorder, fed every step and menu command (None = off)
+        'recorder',
+        # This world's profiler.FrameProfiler
+        'profiler',
+    )
+
+    def __init__(self, seed=0, pack=None, profiler=None):
+        self.pack = pack or default_pack()
+        self.profiler = profiler if profiler is not None else FrameProfiler()
+        self.bullets = ProjectilePool()
+        self.enemy_grid = SpatialHash()
+        self.horde = EnemyPool()
+        self.spawn_rng = random.Random(0)  # enemy type and spawn position
+        self.ai_rng = random.Random(0)     # enemy shot timing
+        self.level_generation = 0
+        self.recorder = None
+        self.new_game(seed)
+
+    # --- Game Object Initialization and Management ---
+    def enemy_archetype(self, enemy_type_id):
+        """The shared Archetype (health, damage, speed, model height, biome color,
+        points) of an enemy type on the current level, or None if unknown."""
+        return self.pack.archetype(enemy_type_id, self.pack.level(self.current_level).biome)
+
+    def level_theme(self):
+        """Biome palette of the current level: 'tile' and 'wall' color pairs,
+        'obstacle' and 'wolf' colors (see levelpack.BIOMES)."""
+        return self.pack.biomes[self.pack.level(self.current_level).biome]
+
+    def init_level_configs(self):
+        """Forget per-level quota state; level_config() reloads it from the pack."""
+        self.level_configs = {}
+
+    def level_config(self, level_num):
+        """Mutable enemy quotas and spawn pool of level_num, created from the
+        pack the first time the level is entered this game."""
+        conf = self.level_configs.get(level_num)
+        if conf is None:
+            conf = self.level_configs[level_num] = self.pack.level(level_num).config()
+        return conf
+
+    def seed_rng(self, seed):
+        """Reseed every random stream; identical seeds and inputs give identical runs."""
+        self.rng_seed = seed
+        self.spawn_rng.seed(f"{seed}:spawn")
+        self.ai_rng.seed(f"{seed}:ai")
+        self.horde_rng = np.random.default_rng([seed % 2**32, 0x484f5244])  # horde spawns (vectorized)
+
+    def new_game(self, seed=0):
+        """Start a fresh session: level tables, player, seeded random streams and
+        every other piece of world state back to its startup value (main menu,
+        no cheat, empty Hall of Fame). The constructor calls this; call it again
+        to reuse the world for another game."""
+        self.init_level_configs()
+        self.player = Player()
+        self.seed_rng(seed)
+        self.game_state = STATE_MAIN_MENU
+        self.current_level = 1
+        self.camera_mode = CAMERA_MODE_THIRD_PERSON
+        self.tp_camera_pitch = -30.0
+        self.tp_camera_yaw_offset = 0.0
+        self.enemies = []
+        self.bullets.clear()
+        self.horde.clear()
+        self.horde_mode = False
+        self.horde_target = 0          # population kept alive by respawning
+        self.horde_spawn_budget = 0.0  # fractional respawns carried between ticks
+        self.explore_mode = False
+        self.chunk_map = None
+        self.map_size_x = DUNGEON_SIZE_X
+        self.map_size_z = DUNGEON_SIZE_Z
+        self.enemies_killed_this_level = 0
+        self.enemies_spawned_this_level = 0
+        self.boss_entity = None
+        self.cheat_mode = False
+        self.autopilot = False
+        self.cheat_fire_timer = 0.0
+        self.win_score_recorded = False
+        self.current_session_score_recorded = False
+        self.obstacles = []
+        self.obstacle_index = StaticCircleIndex([])
+        self.enemy_anim_time = 0.0
+        self.transition_timer = 0.0
+        self.transition_color = [0.0, 0.0, 0.0]
+        self.next_game_state_after_transition = STATE_PLAYING
+        self.keys_pressed = {}
+        self.special_keys_pressed = {}
+        self.hof_records = []  # list of {'score': int, 'seq': int}
+        self.hof_seq = 0
+        self.sim_accumulator = 0.0
+        self.queued_events = []
+
+    def spawn_enemy(self):
+        """Spawn one enemy if allowed by the current level quotas and spacing rules."""
+        level_conf = self.level_configs[self.current_level]
+        if self.enemies_spawned_this_level >= level_conf['total_enemies']:
+            return
+        spawn_rng = self.spawn_rng
+        enemy_type_to_spawn = None
+        is_spawning_boss = False
+        if 'is_boss_level' in level_conf:
+            if not self.boss_entity and 'boss' in level_conf['enemies_to_spawn_pool']:
+                enemy_type_to_spawn = 'boss'
+                level_conf['enemies_to_spawn_pool'].remove('boss')
+                is_spawning_boss = True
+            elif level_conf['enemies_to_spawn_pool']:
+                pool = [t for t in level_conf['enemies_to_spawn_pool'] if t != 'boss']
+                if pool:
+                    enemy_type_to_spawn = spawn_rng.choice(pool)
+                    level_conf['enemies_to_spawn_pool'].remove(enemy_type_to_spawn)
+        else:
+            if level_conf['enemies_to_spawn_pool']:
+                enemy_type_to_spawn = level_conf['enemy_types'][0]
+        if enemy_type_to_spawn is None:
+            return
+        archetype = self.enemy_archetype(enemy_type_to_spawn)
+        if archetype is None:
+            return
+        player_pos = self.player.pos
+        margin=7.0
+        x=spawn_rng.uniform(margin,DUNGEON_SIZE_X-margin)
+        enemy_base_y=archetype.model_height/2
+        z=spawn_rng.uniform(margin,DUNGEON_SIZE_Z-margin)
+        min_spawn_dist_player=15.0
+        min_spawn_dist_enemy=5.0
+        spawn_attempts=0
+        valid_spawn=False
+        while spawn_attempts < 20 and not valid_spawn:
+            valid_spawn=True
+            if distance_3d([x,enemy_base_y,z],player_pos) < min_spawn_dist_player:
+                valid_spawn=False
+            for ex_en in self.enemies:
+                if distance_3d([x,enemy_base_y,z],ex_en.pos) < min_spawn_dist_enemy:
+                    valid_spawn=False
+                    break
+            if not valid_spawn:
+                x=spawn_rng.uniform(margin,DUNGEON_SIZE_X-margin)
+                z=spawn_rng.uniform(margin,DUNGEON_SIZE_Z-margin)
+            spawn_attempts+=1
+        if not valid_spawn:
+            if is_spawning_boss:
+                level_conf['enemies_to_spawn_pool'].insert(0,'boss')
+            elif enemy_type_to_spawn and enemy_type_to_spawn != 'boss' and 'is_boss_level' in level_conf:
+                level_conf['enemies_to_spawn_pool'].append(enemy_type_to_spawn)
+            return
+        new_enemy = Enemy(archetype, [x,enemy_base_y,z], self.ai_rng.uniform(1.0,3.0))
+        self.enemies.append(new_enemy)
+        self.enemies_spawned_this_level+=1
+        if is_spawning_boss:
+            self.boss_entity = new_enemy
+
+    def init_level(self, level_num):
+        """Reset and prepare a level: clear entities, reset flags, place obstacles, and
+        move the player to spawn."""
+        self.current_level=level_num
+        self.level_generation+=1
+        self.enemies.clear()
+        self.bullets.clear()
+        self.horde.clear()
+        self.horde_spawn_budget = 0.0
+        self.boss_entity=None
+        self.game_state=STATE_PLAYING
+        self.enemies_killed_this_level=0
+        self.enemies_spawned_this_level=0
+        self.chunk_map = None
+        self.map_size_x = DUNGEON_SIZE_X
+        self.map_size_z = DUNGEON_SIZE_Z
+        self.enemy_grid = SpatialHash()
+        player = self.player
+        player.pos=[DUNGEON_SIZE_X/2,PLAYER_BODY_Y_OFFSET,DUNGEON_SIZE_Z/2]
+        player.prev_pos=None
+        player.rotation_y=0.0
+        player.rotation_x=0.0
+        player.reset_perks()
+        level_conf = self.level_config(level_num)
+        level_conf['enemies_to_spawn_pool'] = list(level_conf['enemy_types'])
+        self.win_score_recorded = False
+        self.current_session_score_recorded = False
+        self.enemy_anim_time = 0.0
+        # Obstacles and their collision index come precomputed from the pack
+        level = self.pack.level(level_num)
+        col = self.pack.biomes[level.biome]['obstacle']
+        records = level.obstacles
+        xs, zs, rs, hs = (records[f].tolist() for f in ('x', 'z', 'radius', 'height'))
+        shapes = [SHAPES[k] for k in records['shape'].tolist()]
+        self.obstacles = [Obstacle([x, z], r, h, list(col), shape) for x, z, r, h, shape in zip(xs, zs, rs, hs, shapes)]
+        self.obstacle_index = StaticCircleIndex(list(zip(xs, zs, rs)), buckets=(level.index_start, level.index_items))
+
+    def set_obstacles(self, obstacles):
+        """Replace the level's obstacles and rebuild their collision index."""
+        self.obstacles = obstacles
+        self.obstacle_index = StaticCircleIndex([(ob.pos[0], ob.pos[1], ob.radius) for ob in obstacles])
+
+    def start_run(self, level_num):
+        """Start playing level_num from a fresh score and full health (menu entry point)."""
+        if self.recorder:
+            self.recorder.command('start_run', level_num)
+        self.horde_mode = False
+        self.explore_mode = False
+        self.player.score = 0
+        self.player.health = PLAYER_MAX_HEALTH
+        self.init_level(level_num)
+
+    def start_horde(self, target=HORDE_MAX_ENEMIES):
+        """Start endless horde mode on HORDE_LEVEL with target enemies alive at once
+        (menu entry point). The level never completes; dying restarts the horde."""
+        if self.recorder:
+            self.recorder.command('start_horde', target)
+        self.horde_mode = True
+        self.explore_mode = False
+        self.horde_target = target
+        self.player.score = 0
+        self.player.health = PLAYER_MAX_HEALTH
+        self.init_level(HORDE_LEVEL)
+        self.spawn_horde(target)
+
+    def start_explore(self, size_chunks=MAP_CHUNKS):
+        """Start explore mode on a streamed size_chunks x size_chunks map generated
+        from the world seed (menu entry point). The map never completes; dying
+        restarts it."""
+        if self.recorder:
+            self.recorder.command('start_explore', size_chunks)
+        self.horde_mode = False
+        self.explore_mode = True
+        self.player.score = 0
+        self.player.health = PLAYER_MAX_HEALTH
+        self.init_explore(size_chunks)
+
+    def init_explore(self, size_chunks):
+        """init_level for explore mode: reset as for a level, then put the player
+        in the middle chunk of a fresh ChunkMap and load the chunks around it."""
+        self.init_level(EXPLORE_LEVEL)
+        middle = (size_chunks // 2 + 0.5) * CHUNK_SIZE
+        self.player.pos = [middle, PLAYER_BODY_Y_OFFSET, middle]
+        self.chunk_map = ChunkMap(self.rng_seed, self.pack.biomes, size_chunks, clear=(middle, middle, 10.0))
+        self.map_size_x = self.chunk_map.size_x
+        self.map_size_z = self.chunk_map.size_z
+        self.enemy_grid = SpatialHash(size_x=self.map_size_x, size_z=self.map_size_z)
+        self.obstacles = []
+        self.obstacle_index = self.chunk_map
+        self.stream_chunks(budget=None)
+
+    def stream_chunks(self, budget=1):
+        """Explore mode, every tick: let the ChunkMap load/evict around the player,
+        spawn the enemies of newly loaded chunks and drop those standing in
+        evicted ones. Chunks are regenerated from scratch when revisited,
+        enemies included, except spawns whose wolf is still alive elsewhere
+        (it chased the player out of its home chunk), so none is duplicated."""
+        chunk_map = self.chunk_map
+        pos = self.player.pos
+        loaded, evicted = chunk_map.update(pos[0], pos[2], budget)
+        if evicted:
+            gone = {(chunk.cx, chunk.cz) for chunk in evicted}
+            self.enemies[:] = [e for e in self.enemies if chunk_map.chunk_key(e.pos[0], e.pos[2]) not in gone]
+        if loaded:
+            alive = {e.home for e in self.enemies}
+            for chunk in loaded:
+                for i, (type_id, x, z) in enumerate(chunk.spawns):
+                    home = (chunk.cx, chunk.cz, i)
+                    if home in alive:
+                        continue
+                    archetype = self.pack.archetype(type_id, chunk.biome)
+                    self.enemies.append(Enemy(archetype, [x, archetype.model_height/2, z], self.ai_rng.uniform(1.0,3.0), home))
+
+    def spawn_horde(self, count):
+        """Spawn count horde enemies of random HORDE_ENEMY_TYPES anywhere in the
+        dungeon at least HORDE_SPAWN_CLEARANCE from the player."""
+        if count <= 0:
+            return
+        horde_rng = self.horde_rng
+        px, _, pz = self.player.pos
+        margin = 2.0
+        xs = horde_rng.uniform(margin, DUNGEON_SIZE_X - margin, count)
+        zs = horde_rng.uniform(margin, DUNGEON_SIZE_Z - margin, count)
+        # Push spawns that land too close out to the clearance ring
+        dx = xs - px
+        dz = zs - pz
+        d = np.sqrt(dx*dx + dz*dz)
+        close = d < HORDE_SPAWN_CLEARANCE
+        if close.any():
+            angle = horde_rng.uniform(0.0, 2*math.pi, int(close.sum()))
+            xs[close] = px + np.sin(angle) * HORDE_SPAWN_CLEARANCE
+            zs[close] = pz + np.cos(angle) * HORDE_SPAWN_CLEARANCE
+        types = horde_rng.choice(HORDE_ENEMY_TYPES, count)
+        cooldowns = horde_rng.uniform(1.0, 3.0, count)
+        archetypes = {t: self.enemy_archetype(t) for t in HORDE_ENEMY_TYPES}
+        self.horde.spawn_many(types, xs, zs, cooldowns, archetypes)
+
+    def create_bullet(self, start_pos, direction_vec, owner_type, damage_val, color_index=None):
+        """Add a bullet to the pool with start position, direction, owner ('PLAYER' or
+        'ENEMY') and damage. color_index picks from projectiles.BULLET_COLORS."""
+        owner = OWNER_PLAYER if owner_type=='PLAYER' else OWNER_ENEMY
+        self.bullets.spawn(start_pos,direction_vec,owner,damage_val,color_index)
+
+    def player_gun_tip(self):
+        """World position of the player's gun muzzle for the current facing."""
+        player = self.player
+        yaw_rad = math.radians(player.rotation_y)
+        gun_base_offset = 0.35 * PLAYER_TOTAL_HEIGHT
+        gun_length = PLAYER_GUN_LENGTH
+        shoulder_height = PLAYER_LEG_LENGTH + PLAYER_TORSO_HEIGHT * 0.8
+        gun_y = player.pos[1] - PLAYER_BODY_Y_OFFSET + shoulder_height
+        dir_x = math.sin(yaw_rad)
+        dir_z = math.cos(yaw_rad)
+        gun_base_x = player.pos[0] + dir_x * gun_base_offset
+        gun_base_z = player.pos[2] + dir_z * gun_base_offset
+        return [gun_base_x + dir_x * gun_length, gun_y, gun_base_z + dir_z * gun_length]
+
+    def fire_player_bullet(self):
+        """Shoot straight ahead from the gun tip if the cooldown allows."""
+        player = self.player
+        if player.shoot_cooldown > 0:
+            return
+        player.shoot_cooldown = player.current_shoot_cooldown_time
+        yaw_rad = math.radians(player.rotation_y)
+        direction = normalize_vector([math.sin(yaw_rad), 0, math.cos(yaw_rad)])
+        self.create_bullet(self.player_gun_tip(), direction, 'PLAYER', 1)
+
+    def toggle_camera(self):
+        """Switch first/third person, syncing yaw so the view does not jump."""
+        if self.camera_mode == CAMERA_MODE_FIRST_PERSON:
+            # Switching to third-person: sync tp_camera_yaw_offset with player rotation
+            self.tp_camera_yaw_offset = self.player.rotation_y
+        else:
+            # Switching to first-person: sync player rotation with tp_camera_yaw_offset
+            self.player.rotation_y = self.tp_camera_yaw_offset
+        self.camera_mode = 1-self.camera_mode # Toggle 0 and 1
+
+    def activate_perk(self, name):
+        """Consume an available perk: 'health', 'score' or 'gun'."""
+        player = self.player
+        if name == 'health' and player.health_perk_available:
+            player.health=PLAYER_MAX_HEALTH
+            player.health_perk_available=False
+            player.kills_for_health_perk=0
+        elif name == 'score' and player.score_perk_available:
+            player.score_perk_time_left=PERK_SCORE_MULTIPLIER_DURATION
+            player.score_perk_available=False
+            player.kills_for_score_perk=0
+        elif name == 'gun' and player.gun_perk_available:
+            player.gun_perk_time_left=PERK_RAPID_FIRE_DURATION
+            player.gun_perk_available=False
+            player.kills_for_gun_perk=0
+
+    def toggle_cheat(self):
+        if self.recorder:
+            self.recorder.command('toggle_cheat')
+        self.cheat_mode = not self.cheat_mode
+        self.cheat_fire_timer = 0.0
+
+    def toggle_pause(self):
+        if self.recorder:
+            self.recorder.command('toggle_pause')
+        if self.game_state==STATE_PLAYING:
+            self.game_state=STATE_PAUSED
+        elif self.game_state==STATE_PAUSED:
+            self.game_state=STATE_PLAYING
+
+    def set_game_state(self, state):
+        """Menu navigation: switch to state directly (menus, level select, resume)."""
+        if self.recorder:
+            self.recorder.command('set_game_state', state)
+        self.game_state = state
+
+    # --- Update Functions ---
+    def update_player(self, delta_time):
+        """Advance player timers, process movement/rotation input, collisions and
+        manage short-lived facing alignment assistance after firing."""
+        player = self.player
+        keys_pressed = self.keys_pressed
+        special_keys_pressed = self.special_keys_pressed
+        camera_mode = self.camera_mode
+        # Perk timers
+        if player.score_perk_time_left>0:
+            player.score_perk_time_left=max(0.0, player.score_perk_time_left-delta_time)
+            if player.score_perk_time_left==0:
+                pass  # Score Perk expired
+        if player.gun_perk_time_left>0:
+            player.gun_perk_time_left=max(0.0, player.gun_perk_time_left-delta_time)
+            if player.gun_perk_time_left>0:
+                player.current_shoot_cooldown_time=0.001
+            else:
+                player.current_shoot_cooldown_time=PLAYER_BASE_SHOOT_COOLDOWN_TIME
+                pass  # Gun Perk expired
+        else:
+            player.current_shoot_cooldown_time=PLAYER_BASE_SHOOT_COOLDOWN_TIME
+
+        speed = player.speed * delta_time
+        dx, dz = 0, 0
+        # WASD relative to view: third-person uses camera yaw; first-person uses player yaw
+        if camera_mode == CAMERA_MODE_THIRD_PERSON:
+            basis_yaw = self.tp_camera_yaw_offset
+            # Camera forward on XZ is from camera to player: (-sin(yaw), cos(yaw))
+            forward_x = -math.sin(math.radians(basis_yaw))
+            forward_z =  math.cos(math.radians(basis_yaw))
+            # Right is perpendicular clockwise: (cos(yaw), sin(yaw))
+            right_x =  math.cos(math.radians(basis_yaw))
+            right_z =  math.sin(math.radians(basis_yaw))
+        else:
+            basis_yaw = player.rotation_y
+            # Player forward on XZ should match look horizontal: (sin(yaw), cos(yaw))
+            forward_x =  math.sin(math.radians(basis_yaw))
+            forward_z =  math.cos(math.radians(basis_yaw))
+            # Right is perpendicular clockwise: (cos(yaw), -sin(yaw))
+            right_x =  math.cos(math.radians(basis_yaw))
+            right_z = -math.sin(math.radians(basis_yaw))
+
+        if keys_pressed.get(b'w'):
+            dx += forward_x * speed; dz += forward_z * speed
+        if keys_pressed.get(b's'):
+            dx -= forward_x * speed; dz -= forward_z * speed
+        if keys_pressed.get(b'a'):
+            dx += right_x * speed; dz += right_z * speed
+        if keys_pressed.get(b'd'):
+            dx -= right_x * speed; dz -= right_z * speed
+
+        WALL_MARGIN = PLAYER_RADIUS + 0.5
+        pos = player.pos
+        new_x = pos[0] + dx
+        new_z = pos[2] + dz
+
+        if (WALL_MARGIN <= new_x <= self.map_size_x - WALL_MARGIN and
+            WALL_MARGIN <= new_z <= self.map_size_z - WALL_MARGIN):
+            if not self.obstacle_index.hits(new_x, new_z, PLAYER_RADIUS):
+                pos[0] = new_x
+                pos[2] = new_z
+
+        # Manual rotation with Q/E (always honored)
+        turn = PLAYER_TURN_RATE * delta_time
+        if keys_pressed.get(b'q'):
+            player.rotation_y = (player.rotation_y + turn) % 360.0
+        if keys_pressed.get(b'e'):
+            player.rotation_y = (player.rotation_y - turn) % 360.0
+
+        # Removed post-fire camera alignment (no aim assist)
+        if camera_mode==CAMERA_MODE_FIRST_PERSON:
+            if special_keys_pressed.get(KEY_UP):
+                player.rotation_x=max(-89.0,player.rotation_x-turn*0.7)
+            if special_keys_pressed.get(KEY_DOWN):
+                player.rotation_x=min(89.0,player.rotation_x+turn*0.7)
+        elif camera_mode==CAMERA_MODE_THIRD_PERSON:
+            if special_keys_pressed.get(KEY_UP):
+                self.tp_camera_pitch=max(-89.0,self.tp_camera_pitch-turn*0.7)
+            if special_keys_pressed.get(KEY_DOWN):
+                self.tp_camera_pitch=min(0.0,self.tp_camera_pitch+turn*0.7)
+            if special_keys_pressed.get(KEY_LEFT):
+                self.tp_camera_yaw_offset-=turn
+            if special_keys_pressed.get(KEY_RIGHT):
+                self.tp_camera_yaw_offset+=turn
+        if player.shoot_cooldown>0:
+            player.shoot_cooldown-=delta_time
+
+    def update_enemies(self, delta_time):
+        """Spawn/move enemies, avoid obstacles, and shoot at the player with cooldowns."""
+        self.enemy_anim_time += delta_time
+        if self.explore_mode:
+            # Enemies come with their chunks (stream_chunks); only nearby ones chase
+            chase_range = EXPLORE_CHASE_RANGE
+        else:
+            chase_range = math.inf
+            level_conf=self.level_configs[self.current_level]
+            max_c=level_conf.get('max_concurrent',1)
+            if len(self.enemies)<max_c and self.enemies_spawned_this_level<level_conf['total_enemies']:
+                with self.profiler.scope('spawn_enemy'):
+                    self.spawn_enemy()
+        player_pos = self.player.pos
+        obstacle_index = self.obstacle_index
+        size_x = self.map_size_x
+        size_z = self.map_size_z
+        for enemy in list(self.enemies):
+            pos = enemy.pos
+            archetype = enemy.archetype
+            dist_player=distance_3d(player_pos,pos)
+            dir_to_p_vec=[player_pos[0]-pos[0],0,player_pos[2]-pos[2]]
+            enemy.rotation_y=math.degrees(math.atan2(dir_to_p_vec[0],dir_to_p_vec[2]))
+            if ENEMY_MIN_DISTANCE_FROM_PLAYER < dist_player < chase_range:
+                dir_norm=normalize_vector(dir_to_p_vec)
+                move_dist=archetype.speed*delta_time
+                nx = pos[0]+dir_norm[0]*move_dist
+                nz = pos[2]+dir_norm[2]*move_dist
+                # obstacle avoidance: stop if colliding simple radius
+                if not obstacle_index.hits(nx, nz, archetype.collision_radius):
+                    pos[0]=nx
+                    pos[2]=nz
+            er=archetype.collision_radius
+            pos[0]=max(er,min(pos[0],size_x-er))
+            pos[2]=max(er,min(pos[2],size_z-er))
+            if enemy.shoot_cooldown>0: enemy.shoot_cooldown-=delta_time
+            elif dist_player < 30.0:
+                enemy.shoot_cooldown=archetype.reload_time
+                player_center_y = player_pos[1] - PLAYER_BODY_Y_OFFSET + PLAYER_TOTAL_HEIGHT/2
+                target_pos=[player_pos[0],player_center_y,player_pos[2]]
+
+                enemy_face_center_y = pos[1]
+                gun_len_for_offset = 0.2 * archetype.model_height
+                s_yaw_e=math.sin(math.radians(enemy.rotation_y))
+                c_yaw_e=math.cos(math.radians(enemy.rotation_y))
+
+                start_x_e = pos[0] + s_yaw_e * gun_len_for_offset
+                start_z_e = pos[2] + c_yaw_e * gun_len_for_offset
+                enemy_bullet_start_pos=[start_x_e,enemy_face_center_y,start_z_e]
+                enemy_bullet_dir=normalize_vector([target_pos[0]-start_x_e,target_pos[1]-enemy_face_center_y,target_pos[2]-start_z_e])
+                self.create_bullet(enemy_bullet_start_pos,enemy_bullet_dir,'ENEMY',archetype.damage)
+
+    def update_horde(self, delta_time):
+        """Horde-mode counterpart of update_enemies: refill the population, then
+        move and fire the whole EnemyPool with array operations."""
+        horde = self.horde
+        self.enemy_anim_time += delta_time
+        missing = self.horde_target - len(horde)
+        if missing > 0:
+            self.horde_spawn_budget += HORDE_RESPAWN_PER_SECOND * delta_time
+            count = min(missing, int(self.horde_spawn_budget))
+            if count:
+                self.horde_spawn_budget -= count
+                with self.profiler.scope('spawn_enemy'):
+                    self.spawn_horde(count)
+        else:
+            self.horde_spawn_budget = 0.0
+        player_pos = self.player.pos
+        shooters = horde.update(delta_time, player_pos, self.obstacle_index)
+        if not len(shooters):
+            return
+        # Same muzzle and aim as update_enemies: from the face, offset along the
+        # facing, toward the player's body center
+        pos = horde.pos[shooters]
+        yaw = np.radians(horde.rotation_y[shooters])
+        gun = 0.2 * horde.model_height[shooters]
+        start = np.column_stack((pos[:, 0] + np.sin(yaw) * gun, pos[:, 1], pos[:, 2] + np.cos(yaw) * gun))
+        target = np.array([player_pos[0], player_pos[1] - PLAYER_BODY_Y_OFFSET + PLAYER_TOTAL_HEIGHT/2, player_pos[2]])
+        aim = target - start
+        length = np.sqrt((aim*aim).sum(axis=1))
+        aim /= np.where(length > 0, length, 1.0)[:, None]
+        self.bullets.spawn_many(start, aim, OWNER_ENEMY, horde.damage[shooters])
+
+    def hit_horde(self, start, dirs, step, shots, live, dead):
+        """Resolve player bullets (rows shots, swept step units along dirs from
+        start) against the horde with _resolve_impacts. Kills score like
+        handle_enemy_death."""
+        horde = self.horde
+        n = horde.count
+        hit_radius = horde.collision_radius[:n] * 1.5
+        # neighbor_pairs is complete for reaches up to one cell; very long steps
+        # fall back to a grid with cells that large
+        reach = float(hit_radius.max()) + step / 2
+        grid = self.enemy_grid if reach <= self.enemy_grid.cell_size else UniformGrid(reach)
+        mid = start[shots] + dirs[shots] * (step / 2)
+        pair_b, pair_e = grid.neighbor_pairs(mid[:, 0], mid[:, 2], horde.pos[:n, 0], horde.pos[:n, 2])
+        pair_b = shots[pair_b]
+        toi = sweep_spheres(start[pair_b], dirs[pair_b], step, horde.pos[pair_e], hit_radius[pair_e])
+        pair_b, pair_e = _resolve_impacts(pair_b, pair_e, toi, horde.health[:n])
+        if not len(pair_b):
+            return
+        dead[pair_b] = True
+        live[pair_b] = False
+        np.subtract.at(horde.health, pair_e, 1)
+        killed = horde.health[:n] <= 0
+        kills = int(killed.sum())
+        if kills:
+            player = self.player
+            score_mult = 2 if player.score_perk_time_left > 0 else 1
+            player.score += int(horde.points[:n][killed].sum()) * score_mult
+            self.enemies_killed_this_level += kills
+            for _ in range(kills):
+                self.update_perks()
+            horde.remove(killed)
+
+    def update_bullets(self, delta_time):
+        """Integrate bullets, cull by bounds/lifespan, and resolve hits against
+        enemies or the player. Works on the whole pool at once.
+
+        Hits are continuous: each bullet's path this step (start to end) is swept
+        against the hit spheres and the earliest impact wins, so a bullet cannot
+        skip over a target between two steps however large delta_time is."""
+        bullets = self.bullets
+        n = bullets.count
+        if not n:
+            return
+        if not self.horde_mode and n * (len(self.enemies) + 1) <= SCALAR_BULLET_PAIRS:
+            self.update_bullets_scalar(delta_time)
+            return
+        start = bullets.pos[:n].copy()
+        bullets.integrate(delta_time)
+        pos = bullets.pos[:n]
+        dirs = bullets.dir[:n]
+        step = BULLET_SPEED * delta_time
+        owner = bullets.owner[:n]
+        r = BULLET_RADIUS
+        expired = bullets.lifespan[:n] <= 0
+        # Bullets leaving the dungeon this step may still hit on their way out
+        dead = (expired |
+                (pos[:,0] <= -r) | (pos[:,0] >= self.map_size_x + r) |
+                (pos[:,1] <= -r) | (pos[:,1] >= WALL_HEIGHT + r) |
+                (pos[:,2] <= -r) | (pos[:,2] >= self.map_size_z + r))
+
+        # Player bullets: each hits the enemy it reaches first (ties: list order),
+        # and an enemy stops absorbing bullets once it is dead (see
+        # _resolve_impacts). Only bullets whose path midpoint shares a grid cell
+        # with an enemy are swept.
+        live = ~expired & (owner == OWNER_PLAYER)
+        targets = list(self.enemies)
+        shots = np.flatnonzero(live)
+        if self.horde_mode and len(self.horde) and len(shots):
+            self.hit_horde(start, dirs, step, shots, live, dead)
+            shots = np.flatnonzero(live)
+        if targets and len(shots):
+            hit_radii = np.array([e.archetype.collision_radius * 1.5 for e in targets])
+            enemy_pos = np.array([e.pos for e in targets])
+            if len(shots) * len(targets) > BROADPHASE_MIN_PAIRS:
+                # Grow each circle by half a step so a path that can reach it has
+                # its midpoint in one of the circle's cells
+                self.enemy_grid.rebuild(np.column_stack((enemy_pos[:, 0], enemy_pos[:, 2], hit_radii + step / 2)))
+                mid = start[shots] + dirs[shots] * (step / 2)
+                pair_b, pair_e = self.enemy_grid.query_pairs(mid[:,0], mid[:,2])
+            else:
+                # Too few pairs for the grid to pay off; test them all
+                pair_b = np.repeat(np.arange(len(shots)), len(targets))
+                pair_e = np.tile(np.arange(len(targets)), len(shots))
+            pair_b = shots[pair_b]
+            toi = sweep_spheres(start[pair_b], dirs[pair_b], step, enemy_pos[pair_e], hit_radii[pair_e])
+            pair_b, pair_e = _resolve_impacts(pair_b, pair_e, toi, [max(e.health, 0) for e in targets])
+            if len(pair_b):
+                dead[pair_b] = True
+                live[pair_b] = False
+                self.damage_enemies(targets, pair_e)
+
+        # Enemy bullets against the player's body center
+        player_pos = self.player.pos
+        player_center = np.array([player_pos[0], player_pos[1] - PLAYER_BODY_Y_OFFSET + PLAYER_TOTAL_HEIGHT/2, player_pos[2]])
+        toi = sweep_spheres(start, dirs, step, player_center, PLAYER_RADIUS * 1.5)
+        hits = np.flatnonzero((toi < np.inf) & ~expired & (owner == OWNER_ENEMY))
+        damages = bullets.damage[hits].tolist()
+        dead[hits] = True
+        bullets.remove(dead)
+        for damage in damages:
+            self.handle_player_hit(damage)
+
+    def update_bullets_scalar(self, delta_time):
+        """update_bullets for small pools (see SCALAR_BULLET_PAIRS), with the same
+        results: the live rows are read out as floats once and swept pair by
+        pair, so the cost follows the bullet count instead of the NumPy call count."""
+        bullets = self.bullets
+        n = bullets.count
+        start = bullets.pos[:n].tolist()
+        bullets.integrate(delta_time)
+        pos = bullets.pos[:n].tolist()
+        dirs = bullets.dir[:n].tolist()
+        lifespan = bullets.lifespan[:n].tolist()
+        owner = bullets.owner[:n].tolist()
+        step = BULLET_SPEED * delta_time
+        r = BULLET_RADIUS
+        max_x = self.map_size_x + r
+        max_y = WALL_HEIGHT + r
+        max_z = self.map_size_z + r
+        dead = [lifespan[i] <= 0 or x <= -r or x >= max_x or y <= -r or y >= max_y or z <= -r or z >= max_z
+                for i, (x, y, z) in enumerate(pos)]
+
+        targets = list(self.enemies)
+        if targets:
+            hit_radii = [e.archetype.collision_radius * 1.5 for e in targets]
+            pair_b, pair_e, toi = [], [], []
+            for i in range(n):
+                if owner[i] != OWNER_PLAYER or lifespan[i] <= 0:
+                    continue
+                for k, enemy in enumerate(targets):
+                    t = sweep_sphere(start[i], dirs[i], step, enemy.pos, hit_radii[k])
+                    if t < math.inf:
+                        pair_b.append(i)
+                        pair_e.append(k)
+                        toi.append(t)
+            if pair_b:
+                pair_b, pair_e = _resolve_impacts(np.array(pair_b), np.array(pair_e), np.array(toi),
+                                                  [max(e.health, 0) for e in targets])
+                for i in pair_b.tolist():
+                    dead[i] = True
+                self.damage_enemies(targets, pair_e)
+
+        player_pos = self.player.pos
+        player_center = (player_pos[0], player_pos[1] - PLAYER_BODY_Y_OFFSET + PLAYER_TOTAL_HEIGHT/2, player_pos[2])
+        hits = [i for i in range(n) if owner[i] == OWNER_ENEMY and lifespan[i] > 0 and
+                sweep_sphere(start[i], dirs[i], step, player_center, PLAYER_RADIUS * 1.5) < math.inf]
+        damages = bullets.damage[hits].tolist()
+        for i in hits:
+            dead[i] = True
+        if any(dead):
+            bullets.remove(np.array(dead))
+        for damage in damages:
+            self.handle_player_hit(damage)
+
+    def damage_enemies(self, targets, hit_e):
+        """Apply bullet hits (indices into targets, one per hit) in enemy order."""
+        for ei, count in zip(*np.unique(hit_e, return_counts=True)):
+            enemy = targets[ei]
+            enemy.health -= int(count)
+            if enemy.health <= 0:
+                self.handle_enemy_death(enemy)
+
+    def handle_enemy_death(self, enemy):
+        """Remove a dead enemy, award points (with score perk), update perk counters."""
+        player = self.player
+        score_mult = 2 if player.score_perk_time_left > 0 else 1
+        player.score += enemy.archetype.points * score_mult
+        if enemy in self.enemies:
+            self.enemies.remove(enemy)
+        if enemy is self.boss_entity:
+            self.boss_entity = None
+        self.enemies_killed_this_level += 1
+        self.update_perks()
+
+    def handle_player_hit(self, damage):
+        """Apply damage to the player unless in cheat mode. On death, record score and
+        start a game-over transition."""
+        if self.cheat_mode:
+            return  # godmode in cheat
+        player = self.player
+        player.health -= damage
+        if player.health <= 0 and self.game_state == STATE_PLAYING:
+            player.health = 0
+            # Record score on death before resetting
+            self.record_high_score(player.score)
+            self.start_transition(STATE_GAME_OVER_TRANSITION, [1.0, 0.0, 0.0])
+
+    def check_level_completion(self):
+        if self.horde_mode or self.explore_mode:
+            return
+        level_conf=self.level_configs[self.current_level]
+        if self.enemies_spawned_this_level>=level_conf['total_enemies'] and not self.enemies and self.game_state==STATE_PLAYING:
+            if self.current_level==self.pack.level_count:
+                self.game_state=STATE_YOU_WIN
+                self.record_high_score(self.player.score)
+            else:
+                self.start_transition(STATE_LEVEL_TRANSITION,[0.0,1.0,0.0])
+
+    def start_transition(self, target_state, color):
+        self.game_state=target_state
+        self.transition_timer=TRANSITION_DURATION
+        self.transition_color=color
+        if target_state==STATE_LEVEL_TRANSITION:
+            self.next_game_state_after_transition=STATE_PLAYING
+        elif target_state==STATE_GAME_OVER_TRANSITION:
+            self.next_game_state_after_transition=STATE_PLAYING
+
+    def auto_fire(self, delta_time):
+        """Cheat-mode/autopilot aiming: turn toward the nearest enemy and shoot at
+        it every CHEAT_SHOOT_INTERVAL seconds."""
+        self.cheat_fire_timer += delta_time
+        if self.cheat_fire_timer >= CHEAT_SHOOT_INTERVAL:
+            self.cheat_fire_timer = 0.0
+            player = self.player
+            # find nearest enemy on XZ
+            px, pz = player.pos[0], player.pos[2]
+            target_pos = None
+            target_height = 0.0
+            nearest_d2 = 1e18
+            if self.horde_mode:
+                row = self.horde.nearest(px, pz)
+                if row >= 0:
+                    target_pos = self.horde.pos[row].tolist()
+                    target_height = float(self.horde.model_height[row])
+            for e in self.enemies:
+                dx = e.pos[0] - px
+                dz = e.pos[2] - pz
+                d2 = dx*dx + dz*dz
+                if d2 < nearest_d2:
+                    target_pos = e.pos
+                    target_height = e.archetype.model_height
+                    nearest_d2 = d2
+            if target_pos is not None:
+                # Smoothly rotate player to face the target for realism
+                target_yaw = math.degrees(math.atan2(target_pos[0] - player.pos[0], target_pos[2] - player.pos[2]))
+                # Normalize angles to [-180,180] difference
+                cur_yaw = player.rotation_y
+                diff = ((target_yaw - cur_yaw + 180.0) % 360.0) - 180.0
+                rot_speed_deg_per_sec = 180.0  # turn speed while cheating
+                step = max(-rot_speed_deg_per_sec * delta_time, min(rot_speed_deg_per_sec * delta_time, diff))
+                player.rotation_y = (cur_yaw + step) % 360.0
+                # Ensure bullet direction aligns to current rotation (gun and rotation synced)
+                # compute direction from player's gun tip toward enemy center
+                tip = self.player_gun_tip()
+                to_enemy = [target_pos[0]-tip[0], (target_pos[1]-target_height/2 + target_height*0.5)-tip[1], target_pos[2]-tip[2]]
+                fire_dir = normalize_vector(to_enemy)
+                self.create_bullet(tip, fire_dir, 'PLAYER', 1)
+
+    def update_game_state(self, delta_time):
+        """Main per-frame state machine: updates during play, and counts down
+        transitions between levels or after death."""
+        game_state = self.game_state
+        if game_state==STATE_PLAYING:
+            with self.profiler.scope('update_player'):
+                self.update_player(delta_time)
+            if self.explore_mode:
+                with self.profiler.scope('stream_chunks'):
+                    self.stream_chunks()
+            with self.profiler.scope('update_enemies'):
+                if self.horde_mode:
+                    self.update_horde(delta_time)
+                else:
+                    self.update_enemies(delta_time)
+            # Cheat / autopilot auto-fire: periodically shoot at nearest enemy
+            if (self.cheat_mode or self.autopilot) and (self.enemies or len(self.horde)):
+                self.auto_fire(delta_time)
+            with self.profiler.scope('update_bullets'):
+                self.update_bullets(delta_time)
+            with self.profiler.scope('check_level_completion'):
+                self.check_level_completion()
+        elif game_state==STATE_LEVEL_TRANSITION:
+            self.transition_timer-=delta_time
+            if self.transition_timer<=0:
+                self.init_level(self.current_level+1)
+        elif game_state==STATE_GAME_OVER_TRANSITION:
+            self.transition_timer-=delta_time
+            if self.transition_timer<=0:
+                self.player.health=PLAYER_MAX_HEALTH
+                self.player.score=0
+                if self.explore_mode:
+                    self.init_explore(self.chunk_map.size_chunks)
+                else:
+                    self.init_level(self.current_level)
+
+    def update_perks(self):
+        """Update perk availability based on enemy kills"""
+        player = self.player
+
+        # Track kills for each perk type
+        player.kills_for_health_perk += 1
+        player.kills_for_score_perk += 1
+        player.kills_for_gun_perk += 1
+
+        # Health perk becomes available every 5 kills
+        if player.kills_for_health_perk >= 3:
+            player.health_perk_available = True
+
+        # Score multiplier perk becomes available every 3 kills
+        if player.kills_for_score_perk >= 4:
+            player.score_perk_available = True
+
+        # Rapid fire perk becomes available every 4 kills
+        if player.kills_for_gun_perk >= 5:
+            player.gun_perk_available = True
+
+    def record_high_score(self, score):
+        """Append a score to HoF (guarding duplicates), keep top 3 by score then recency."""
+        if score <= 0 or self.current_session_score_recorded:
+            return
+        self.current_session_score_recorded = True
+        self.hof_seq += 1
+        hof_records = self.hof_records
+        hof_records.append({'score': int(score), 'seq': self.hof_seq})
+        # Keep only the top 3 by score, break ties by recency (higher seq wins)
+        hof_records.sort(key=lambda r: (r['score'], r['seq']), reverse=True)
+        del hof_records[3:]
+
+    def top_three_scores(self):
+        """Return the already-sorted, already-trimmed top 3 score records."""
+        return self.hof_records
+
+    def record_unsaved_score(self):
+        """Record the current run's score if it has not been recorded yet (menu exits)."""
+        if self.recorder:
+            self.recorder.command('record_unsaved_score')
+        if self.player.score > 0 and not self.current_session_score_recorded:
+            self.record_high_score(self.player.score)
+
+    # --- Stepping ---
+    def step(self, delta_time, inputs=None):
+        """Advance the world by delta_time seconds.
+
+        inputs is a dict with any of:
+          'keys'          held keys, e.g. {b'w': True}
+          'special_keys'  held special keys, e.g. {KEY_UP: True}
+          'events'        one-shot gameplay actions since the last step, names
+                          from EVENT_HANDLERS ('fire', 'toggle_camera', 'perk_*')
+        Menus and pause do not advance; gameplay events are dropped outside play.
+        """
+        if inputs is not None:
+            self.keys_pressed = inputs.get('keys', {})
+            self.special_keys_pressed = inputs.get('special_keys', {})
+        if self.recorder:
+            self.recorder.tick(delta_time, self.keys_pressed, self.special_keys_pressed, inputs.get('events', ()) if inputs else ())
+        if inputs is not None and self.game_state == STATE_PLAYING:
+            for event in inputs.get('events', ()):
+                EVENT_HANDLERS[event](self)
+        if self.game_state in (STATE_PLAYING, STATE_LEVEL_TRANSITION, STATE_GAME_OVER_TRANSITION):
+            self.update_game_state(delta_time)
+
+    def snapshot_positions(self):
+        """Remember current positions as prev_pos so the renderer can interpolate
+        between the last two ticks."""
+        self.player.prev_pos = list(self.player.pos)
+        for enemy in self.enemies:
+            enemy.prev_pos = list(enemy.pos)
+        self.horde.snapshot()
+        self.bullets.snapshot()
+
+    def advance(self, frame_time, inputs=None):
+        """Fixed-timestep driver: bank frame_time and run as many SIM_DT ticks as it
+        covers, so the simulation is the same at any frame rate.
+
+        Held keys are sampled for every tick; one-shot events go to the first tick
+        that runs (they wait if this frame runs none). Returns the interpolation
+        factor in [0, 1] between the previous and current tick positions (1 only
+        when MAX_TICKS_PER_FRAME cut the frame short and backlog was dropped).
+        """
+        if self.recorder:
+            self.recorder.frame()
+        inputs = inputs or {}
+        self.queued_events.extend(inputs.get('events', ()))
+        self.sim_accumulator += min(frame_time, MAX_FRAME_TIME)
+        ticks = min(int(self.sim_accumulator / SIM_DT), MAX_TICKS_PER_FRAME)
+        for i in range(ticks):
+            if i == ticks - 1:
+                self.snapshot_positions()
+            self.step(SIM_DT, {'keys': inputs.get('keys', {}), 'special_keys': inputs.get('special_keys', {}), 'events': self.queued_events})
+            self.queued_events = []
+            self.sim_accumulator -= SIM_DT
+        # Never carry more than one tick of backlog (avoids a catch-up spiral)
+        self.sim_accumulator = min(self.sim_accumulator, SIM_DT)
+        return self.sim_accumulator / SIM_DT
+
+
+EVENT_HANDLERS = {
+    'fire': GameWorld.fire_player_bullet,
+    'toggle_camera': GameWorld.toggle_camera,
+    'perk_health': lambda world: world.activate_perk('health'),
+    'perk_score': lambda world: world.activate_perk('score'),
+    'perk_gun': lambda world: world.activate_perk('gun'),
+}
@@ -0,0 +1,155 @@
+"""Array-backed enemy store for horde (endless) mode.
+
+The campaign keeps a handful of enemies as dicts; horde mode keeps thousands, so
+their state lives in preallocated NumPy columns like the bullets in
+projectiles.py. Live enemies are packed into rows [0, count) and one update()
+moves, faces, clamps and reloads all of them with whole-array operations.
+"""
+import numpy as np
+
+from .constants import DUNGEON_SIZE_X, DUNGEON_SIZE_Z, ENEMY_MIN_DISTANCE_FROM_PLAYER
+
+
+HORDE_SHOOT_RANGE = 30.0  # same as the campaign wolves
+
+
+class EnemyPool:
+    """Struct-of-arrays enemy pool. Rows [0, count) are live. uid is a per-pool
+    serial number that, unlike the row, stays with an enemy through remove()."""
+
+    COLUMNS = ('pos', 'prev_pos', 'type_id', 'health', 'damage', 'speed', 'reload_time',
+               'shoot_cooldown', 'points', 'model_height', 'collision_radius', 'rotation_y', 'uid')
+
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self.next_uid = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = {name: getattr(self, name) for name in self.COLUMNS} if self.count else None
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 3))
+        self.prev_pos = np.zeros((capacity, 3))
+        self.type_id = np.zeros(capacity, np.int8)
+        self.health = np.zeros(capacity, np.int32)
+        self.damage = np.zeros(capacity, np.int32)
+        self.speed = np.zeros(capacity)
+        self.reload_time = np.zeros(capacity)
+        self.shoot_cooldown = np.zeros(capacity)
+        self.points = np.zeros(capacity, np.int32)
+        self.model_height = np.zeros(capacity)
+        self.collision_radius = np.zeros(capacity)
+        self.rotation_y = np.zeros(capacity)
+        self.uid = np.zeros(capacity, np.int64)
+        if old:
+            for name, column in old.items():
+                getattr(self, name)[:self.count] = column[:self.count]
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def spawn_many(self, type_ids, xs, zs, shoot_cooldowns, archetypes):
+        """Append enemies of the given type ids at (xs, zs). archetypes maps a
+        type id to its entities.Archetype."""
+        k = len(type_ids)
+        if not k:
+            return
+        capacity = self.capacity
+        while self.count + k > capacity:
+            capacity *= 2
+        if capacity != self.capacity:
+            self._allocate(capacity)
+        rows = slice(self.count, self.count + k)
+        types = np.asarray(type_ids, np.int8)
+        table = {name: np.zeros(max(archetypes) + 1) for name in
+                 ('max_health', 'damage', 'speed', 'reload_time', 'model_height', 'collision_radius', 'points')}
+        for type_id, archetype in archetypes.items():
+            for name, column in table.items():
+                column[type_id] = getattr(archetype, name)
+        height = table['model_height'][types]
+        self.pos[rows, 0] = xs
+        self.pos[rows, 1] = height / 2
+        self.pos[rows, 2] = zs
+        self.prev_pos[rows] = self.pos[rows]
+        self.type_id[rows] = types
+        self.health[rows] = table['max_health'][types]
+        self.damage[rows] = table['damage'][types]
+        self.speed[rows] = table['speed'][types]
+        self.reload_time[rows] = table['reload_time'][types]
+        self.shoot_cooldown[rows] = shoot_cooldowns
+        self.points[rows] = table['points'][types]
+        self.model_height[rows] = height
+        self.collision_radius[rows] = table['collision_radius'][types]
+        self.rotation_y[rows] = 0.0
+        self.uid[rows] = np.arange(self.next_uid, self.next_uid + k)
+        self.next_uid += k
+        self.count += k
+
+    def snapshot(self):
+        self.prev_pos[:self.count] = self.pos[:self.count]
+
+    def interpolated(self, alpha):
+        n = self.count
+        prev = self.prev_pos[:n]
+        return prev + (self.pos[:n] - prev) * alpha
+
+    def remove(self, dead_mask):
+        """Drop the rows flagged in dead_mask (length count), swap-filling holes
+        from the tail (see ProjectilePool.remove)."""
+        n = self.count
+        dead = np.flatnonzero(dead_mask)
+        if not len(dead):
+            return
+        new_n = n - len(dead)
+        holes = dead[dead < new_n]
+        movers = new_n + np.flatnonzero(~dead_mask[new_n:n])
+        if len(holes):
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                column[holes] = column[movers]
+        self.count = new_n
+
+    def update(self, delta_time, player_pos, obstacle_index):
+        """Chase the player, face it, stay out of obstacles and inside the
+        dungeon, and count shot cooldowns down, for every enemy at once.
+        Returns the rows that fire this tick (their cooldown is reset)."""
+        n = self.count
+        if not n:
+            return np.zeros(0, np.intp)
+        pos = self.pos[:n]
+        px, py, pz = player_pos
+        dx = px - pos[:, 0]
+        dz = pz - pos[:, 2]
+        flat2 = dx*dx + dz*dz
+        dist_player = np.sqrt(flat2 + (py - pos[:, 1])**2)
+        self.rotation_y[:n] = np.degrees(np.arctan2(dx, dz))
+        moving = (dist_player > ENEMY_MIN_DISTANCE_FROM_PLAYER) & (flat2 > 0)
+        rows = np.flatnonzero(moving)
+        if len(rows):
+            step = self.speed[rows] * delta_time / np.sqrt(flat2[rows])
+            nx = pos[rows, 0] + dx[rows] * step
+            nz = pos[rows, 2] + dz[rows] * step
+            free = ~obstacle_index.hits_many(nx, nz, self.collision_radius[rows])
+            rows = rows[free]
+            pos[rows, 0] = nx[free]
+            pos[rows, 2] = nz[free]
+        r = self.collision_radius[:n]
+        np.minimum(np.maximum(pos[:, 0], r), DUNGEON_SIZE_X - r, out=pos[:, 0])
+        np.minimum(np.maximum(pos[:, 2], r), DUNGEON_SIZE_Z - r, out=pos[:, 2])
+        cooldown = self.shoot_cooldown[:n]
+        waiting = cooldown > 0
+        cooldown[waiting] -= delta_time
+        shooters = np.flatnonzero(~waiting & (dist_player < HORDE_SHOOT_RANGE))
+        cooldown[shooters] = self.reload_time[shooters]
+        return shooters
+
+    def nearest(self, x, z):
+        """Row of the enemy nearest to (x, z) on the floor, or -1 if empty."""
+        n = self.count
+        if not n:
+            return -1
+        d2 = (self.pos[:n, 0] - x)**2 + (self.pos[:n, 2] - z)**2
+        return int(np.argmin(d2))
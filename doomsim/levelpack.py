@@ -0,0 +1,297 @@
+"""Precompiled binary level packs (build/inspect: python -m doomsim.buildpack)
+
+A pack is one file holding everything the game needs to enter a level, laid out
+so it can be memory-mapped and read in place with np.frombuffer:
+
+    header       magic, version, level count, metadata length (PACK_HEADER)
+    metadata     JSON: enemy archetypes and biome palettes (size independent of
+                 the number of levels)
+    level table  one LEVEL_RECORD per level: quotas, biome, and where its arrays are
+    arrays       per level, 8-byte aligned: spawn pool (archetype indices),
+                 obstacles (OBSTACLE_RECORD) and the obstacle collision index
+                 buckets (CSR start/items, see broadphase.StaticCircleIndex)
+
+Opening a pack reads the header and metadata only. A level is decoded the first
+time it is asked for and then cached, so a pack with hundreds of levels opens as
+fast as one with ten and entering a level is a lookup, not a regeneration.
+
+The campaign pack shipped next to this module is compiled from the source
+tables below (CAMPAIGN_LEVELS, ENEMY_ARCHETYPES, BIOMES); rebuild it with
+`python -m doomsim.buildpack build` after changing them.
+"""
+import json
+import mmap
+import os
+import random
+import struct
+
+import numpy as np
+
+from .broadphase import StaticCircleIndex
+from .constants import DUNGEON_SIZE_X, DUNGEON_SIZE_Z
+from .entities import Archetype
+from .vecmath import distance_3d
+
+
+PACK_MAGIC = b'8BLP'
+PACK_VERSION = 1
+# magic, version, level count, metadata length
+PACK_HEADER = struct.Struct('<4sB3xII')
+PACK_ALIGN = 8
+
+LEVEL_FLAG_BOSS = 1
+
+LEVEL_RECORD = np.dtype([
+    ('total_enemies', '<i4'), ('max_concurrent', '<i4'), ('flags', '<u4'), ('biome', '<u4'),
+    ('pool_offset', '<i8'), ('pool_count', '<i4'), ('obstacle_count', '<i4'),
+    ('obstacle_offset', '<i8'), ('index_offset', '<i8'), ('index_items', '<i4'), ('index_cells', '<i4'),
+])
+OBSTACLE_RECORD = np.dtype([('x', '<f8'), ('z', '<f8'), ('radius', '<f8'), ('height', '<f8'),
+                            ('shape', 'u1'), ('pad', 'u1', 7)])
+SHAPES = ('cyl', 'box')
+
+DEFAULT_PACK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'campaign.pack')
+
+
+class LevelPackError(Exception):
+    pass
+
+
+# --- Source tables (compiled into the pack) ---
+CAMPAIGN_LEVELS = [
+    {'total_enemies':5,'max_concurrent':1,'enemy_types':[1]},
+    {'total_enemies':6,'max_concurrent':2,'enemy_types':[1]},
+    {'total_enemies':9,'max_concurrent':3,'enemy_types':[1]},
+    {'total_enemies':5,'max_concurrent':1,'enemy_types':[2]},
+    {'total_enemies':7,'max_concurrent':1,'enemy_types':[1]*3+[2]*3+['miniboss'],'is_boss_level':True},
+    {'total_enemies':9,'max_concurrent':3,'enemy_types':[2]},
+    {'total_enemies':5,'max_concurrent':1,'enemy_types':[3]},
+    {'total_enemies':6,'max_concurrent':2,'enemy_types':[3]},
+    {'total_enemies':9,'max_concurrent':3,'enemy_types':[3]},
+    {'total_enemies':16,'max_concurrent':1,'enemy_types':[1]*5+[2]*5+[3]*5+['boss'],'is_boss_level':True},
+]
+
+# 'palette_slot' picks the body color from the level's biome wolf palette;
+# archetypes with a fixed 'color' look the same everywhere.
+ENEMY_ARCHETYPES = [
+    {'key': 1, 'name': 'Type1Wolf', 'health': 3, 'damage': 5, 'speed_mult': 0.2,
+     'model_height': 2.0, 'points': 10, 'palette_slot': 0},
+    {'key': 2, 'name': 'Type2Wolf', 'health': 4, 'damage': 6, 'speed_mult': 0.3,
+     'model_height': 3.0, 'points': 15, 'palette_slot': 1},
+    {'key': 3, 'name': 'Type3Wolf', 'health': 5, 'damage': 8, 'speed_mult': 0.4,
+     'model_height': 4.0, 'points': 20, 'palette_slot': 2},
+    {'key': 'miniboss', 'name': 'MiniBossWolf', 'health': 10, 'damage': 10, 'speed_mult': 0.5,
+     'model_height': 6.0, 'points': 50, 'color': [0.95, 0.15, 0.15], 'is_boss': True},
+    {'key': 'boss', 'name': 'BossWolf', 'health': 15, 'damage': 12, 'speed_mult': 0.6,
+     'model_height': 8.0, 'points': 100, 'color': [1.00, 0.08, 0.05], 'is_boss': True},
+]
+
+BIOMES = [
+    {'name': 'earth',    # lush greens
+     'tile': [[0.40, 0.80, 0.40], [0.20, 0.55, 0.25]], 'wall': [[0.12, 0.28, 0.12], [0.16, 0.36, 0.18]],
+     'obstacle': [0.12, 0.35, 0.18],
+     'wolf': [[0.20, 0.85, 0.30], [0.10, 0.70, 0.25], [0.06, 0.55, 0.18]]},
+    {'name': 'mud',      # rich browns, clay, ochre
+     'tile': [[0.62, 0.45, 0.28], [0.45, 0.30, 0.18]], 'wall': [[0.35, 0.18, 0.12], [0.42, 0.22, 0.15]],
+     'obstacle': [0.45, 0.32, 0.18],
+     'wolf': [[0.75, 0.55, 0.30], [0.60, 0.40, 0.20], [0.45, 0.30, 0.15]]},
+    {'name': 'heaven',   # soft blues/whites
+     'tile': [[0.80, 0.88, 1.00], [0.65, 0.80, 0.95]], 'wall': [[0.60, 0.80, 0.95], [0.72, 0.88, 1.00]],
+     'obstacle': [0.12, 0.22, 0.42],
+     'wolf': [[0.85, 0.95, 1.00], [0.70, 0.85, 1.00], [0.60, 0.80, 0.98]]},
+    {'name': 'hell',     # crimson/embers
+     'tile': [[0.70, 0.20, 0.20], [0.45, 0.10, 0.10]], 'wall': [[0.55, 0.05, 0.06], [0.68, 0.12, 0.10]],
+     'obstacle': [0.45, 0.08, 0.45],
+     'wolf': [[0.90, 0.20, 0.15], [0.80, 0.12, 0.10], [0.70, 0.08, 0.06]]},
+]
+
+
+def campaign_biome(level_num):
+    """Biome index of a campaign level: 1-3 earth, 4-6 mud, 7-9 heaven, then hell."""
+    if level_num <= 3:
+        return 0
+    elif level_num <= 6:
+        return 1
+    elif level_num <= 9:
+        return 2
+    return 3
+
+
+def generate_obstacles(level_num):
+    """Pillars and blocks for a level as (x, z, radius, height, shape) tuples,
+    from a fixed per-level random stream."""
+    obstacles = []
+    layout_rng = random.Random(1000 + level_num)
+    base_count = 8 + level_num // 2
+    for i in range(base_count):
+        rx = layout_rng.uniform(8.0, DUNGEON_SIZE_X-8.0)
+        rz = layout_rng.uniform(8.0, DUNGEON_SIZE_Z-8.0)
+        # Keep clear around player spawn center
+        if distance_3d([rx,0,rz],[DUNGEON_SIZE_X/2,0,DUNGEON_SIZE_Z/2]) < 10.0:
+            continue
+        r = layout_rng.uniform(1.2, 2.2)
+        h = layout_rng.uniform(3.0, 6.0)
+        obstacles.append((rx, rz, r, h, 'cyl' if i % 2 == 0 else 'box'))
+    return obstacles
+
+
+# --- Building ---
+def _align(out):
+    out += bytes(-len(out) % PACK_ALIGN)
+
+
+def build_pack(levels=CAMPAIGN_LEVELS, archetypes=ENEMY_ARCHETYPES, biomes=BIOMES):
+    """Compile level definitions into pack bytes. Each level dict has the
+    CAMPAIGN_LEVELS keys plus optional 'biome' and 'obstacles' (default:
+    campaign_biome() and generate_obstacles() of its 1-based number)."""
+    keys = [a['key'] for a in archetypes]
+    meta = json.dumps({'archetypes': archetypes, 'biomes': biomes}, separators=(',', ':')).encode()
+    table = np.zeros(len(levels), LEVEL_RECORD)
+    body = bytearray()
+    body_start = PACK_HEADER.size + len(meta)
+    body_start += -body_start % PACK_ALIGN
+    body_start += table.nbytes
+    for i, level in enumerate(levels):
+        level_num = i + 1
+        rec = table[i]
+        rec['total_enemies'] = level['total_enemies']
+        rec['max_concurrent'] = level.get('max_concurrent', 1)
+        rec['flags'] = LEVEL_FLAG_BOSS if level.get('is_boss_level') else 0
+        rec['biome'] = level.get('biome', campaign_biome(level_num))
+        if rec['biome'] >= len(biomes):
+            raise LevelPackError(f"level {level_num}: no biome {rec['biome']}")
+
+        pool = np.array([keys.index(t) for t in level['enemy_types']], np.int8)
+        _align(body)
+        rec['pool_offset'] = body_start + len(body)
+        rec['pool_count'] = len(pool)
+        body += pool.tobytes()
+
+        obstacles = level.get('obstacles')
+        if obstacles is None:
+            obstacles = generate_obstacles(level_num)
+        records = np.zeros(len(obstacles), OBSTACLE_RECORD)
+        for j, (x, z, r, h, shape) in enumerate(obstacles):
+            records[j] = (x, z, r, h, SHAPES.index(shape), 0)
+        _align(body)
+        rec['obstacle_offset'] = body_start + len(body)
+        rec['obstacle_count'] = len(records)
+        body += records.tobytes()
+
+        index = StaticCircleIndex([ob[:3] for ob in obstacles])
+        _align(body)
+        rec['index_offset'] = body_start + len(body)
+        rec['index_cells'] = len(index.start) - 1
+        rec['index_items'] = len(index.items)
+        body += index.start.astype('<i8').tobytes() + index.items.astype('<i8').tobytes()
+
+    out = bytearray(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(levels), len(meta)))
+    out += meta
+    _align(out)
+    out += table.tobytes()
+    out += body
+    return bytes(out)
+
+
+def write_pack(path, **kwargs):
+    data = build_pack(**kwargs)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+# --- Loading ---
+class Level:
+    """One decoded level. Arrays are read-only views into the pack."""
+
+    __slots__ = ('number', 'total_enemies', 'max_concurrent', 'is_boss_level', 'biome',
+                 'enemy_types', 'obstacles', 'index_start', 'index_items')
+
+    def config(self):
+        """Fresh mutable quota dict in the shape the game keeps per level."""
+        conf = {'total_enemies': self.total_enemies, 'max_concurrent': self.max_concurrent,
+                'enemy_types': list(self.enemy_types)}
+        if self.is_boss_level:
+            conf['is_boss_level'] = True
+        conf['enemies_to_spawn_pool'] = list(self.enemy_types)
+        return conf
+
+
+class LevelPack:
+    """A pack over bytes or an mmap. Levels are numbered from 1."""
+
+    def __init__(self, buffer, name='<memory>'):
+        self.buffer = buffer
+        self.name = name
+        if len(buffer) < PACK_HEADER.size:
+            raise LevelPackError(f"{name}: too short for a level pack header")
+        magic, version, self.level_count, meta_len = PACK_HEADER.unpack_from(buffer)
+        if magic != PACK_MAGIC:
+            raise LevelPackError(f"{name}: not a level pack")
+        if version != PACK_VERSION:
+            raise LevelPackError(f"{name}: unsupported level pack version {version}")
+        meta = json.loads(bytes(buffer[PACK_HEADER.size:PACK_HEADER.size + meta_len]))
+        self.archetypes = meta['archetypes']
+        self.biomes = meta['biomes']
+        # Flyweight registry: one Archetype per (type, biome), shared by every
+        # enemy of that type on every level in the biome
+        self.archetypes_by_biome = {}
+        for arch in self.archetypes:
+            for b, biome in enumerate(self.biomes):
+                config = dict(arch, color=arch.get('color') or biome['wolf'][arch['palette_slot']])
+                self.archetypes_by_biome[arch['key'], b] = Archetype(arch['key'], b, config)
+        table_offset = PACK_HEADER.size + meta_len
+        table_offset += -table_offset % PACK_ALIGN
+        self.table = np.frombuffer(buffer, LEVEL_RECORD, self.level_count, table_offset)
+        self._levels = {}
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map the pack at path (read-only)."""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, path)
+
+    def level(self, level_num):
+        """The decoded Level level_num, decoded on first use."""
+        level = self._levels.get(level_num)
+        if level is not None:
+            return level
+        if not 1 <= level_num <= self.level_count:
+            raise LevelPackError(f"{self.name}: no level {level_num} (pack has {self.level_count})")
+        rec = self.table[level_num - 1]
+        buffer = self.buffer
+        level = Level()
+        level.number = level_num
+        level.total_enemies = int(rec['total_enemies'])
+        level.max_concurrent = int(rec['max_concurrent'])
+        level.is_boss_level = bool(rec['flags'] & LEVEL_FLAG_BOSS)
+        level.biome = int(rec['biome'])
+        pool = np.frombuffer(buffer, np.int8, int(rec['pool_count']), int(rec['pool_offset']))
+        level.enemy_types = tuple(self.archetypes[i]['key'] for i in pool.tolist())
+        level.obstacles = np.frombuffer(buffer, OBSTACLE_RECORD, int(rec['obstacle_count']), int(rec['obstacle_offset']))
+        cells = int(rec['index_cells'])
+        level.index_start = np.frombuffer(buffer, '<i8', cells + 1, int(rec['index_offset']))
+        level.index_items = np.frombuffer(buffer, '<i8', int(rec['index_items']),
+                                          int(rec['index_offset']) + (cells + 1) * 8)
+        self._levels[level_num] = level
+        return level
+
+    def archetype(self, key, biome):
+        """The shared Archetype of enemy type key in a biome, or None."""
+        return self.archetypes_by_biome.get((key, biome))
+
+
+_default_pack = None
+
+def default_pack():
+    """The campaign pack, opened once per process and shared by every world.
+    Falls back to compiling it in memory if the file is missing."""
+    global _default_pack
+    if _default_pack is None:
+        try:
+            _default_pack = LevelPack.open(DEFAULT_PACK_PATH)
+        except FileNotFoundError:
+            _default_pack = LevelPack(build_pack(), '<campaign>')
+    return _default_pack
+
@@ -0,0 +1,178 @@
+"""Per-phase frame profiler.
+
+Each GameWorld owns a FrameProfiler (world.profiler, or one passed in), so
+worlds stepped side by side never mix their timings. Code marks phases with
+`with profiler.scope('name'):`; time spent in each phase
+is summed over the frame (a frame can run several sim ticks) and written to a
+per-phase ring buffer when the frame is closed with mark_frame(). While
+disabled, scope() hands back one shared no-op context manager, so an
+instrumented call costs an attribute check and an empty with-block.
+
+Setting DOOMSIM_PROFILE=0 in the environment compiles profiling out entirely:
+enable() is refused and the scopes stay no-ops.
+"""
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+
+PROFILING_AVAILABLE = os.environ.get('DOOMSIM_PROFILE', '1') != '0'
+PROFILE_HISTORY = 300  # frames kept per phase (5 s at 60 FPS)
+FRAME_PHASE = 'frame'  # ring holding the wall time between mark_frame() calls
+
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class _Scope:
+    """Reusable timer for one phase name (phases of the same name do not nest)."""
+    __slots__ = ('totals', 'name', 'start')
+
+    def __init__(self, totals, name):
+        self.totals = totals
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        totals = self.totals
+        totals[self.name] = totals.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class FrameProfiler:
+    """Scoped phase timers feeding fixed-size ring buffers of per-frame seconds."""
+
+    def __init__(self, history=PROFILE_HISTORY):
+        self.history = history
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.rings = {}      # phase -> np.array(history) of seconds per frame
+        self.first = {}      # phase -> frame its ring started at (first seen)
+        self.frames = 0      # frames recorded since reset (ring index = frames % history)
+        self._totals = {}    # phase -> seconds accumulated in the open frame
+        self._scopes = {}
+        self._last_mark = None
+
+    def enable(self, on=True):
+        """Turn recording on or off; returns the new state. Re-enabling starts
+        a fresh history."""
+        on = bool(on) and PROFILING_AVAILABLE
+        if on and not self.enabled:
+            self.reset()
+        self.enabled = on
+        return on
+
+    def toggle(self):
+        return self.enable(not self.enabled)
+
+    def scope(self, name):
+        """Context manager adding the time spent inside it to phase name."""
+        if not self.enabled:
+            return _NULL_SCOPE
+        scope = self._scopes.get(name)
+        if scope is None:
+            scope = self._scopes[name] = _Scope(self._totals, name)
+        return scope
+
+    def add(self, name, seconds):
+        """Charge seconds measured elsewhere to phase name in the open frame."""
+        if self.enabled:
+            self._totals[name] = self._totals.get(name, 0.0) + seconds
+
+    def mark_frame(self):
+        """Close the open frame: store each phase's total (0 for phases that did
+        not run since they were first seen) plus the wall time since the
+        previous mark."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        totals = self._totals
+        if self._last_mark is not None:
+            totals[FRAME_PHASE] = now - self._last_mark
+        self._last_mark = now
+        slot = self.frames % self.history
+        for name in totals:
+            if name not in self.rings:
+                self.rings[name] = np.zeros(self.history)
+                self.first[name] = self.frames
+        for name, ring in self.rings.items():
+            ring[slot] = totals.get(name, 0.0)
+        totals.clear()
+        self.frames += 1
+
+    def samples(self, name):
+        """Recorded seconds for phase name, oldest first, starting at the first
+        frame the phase ran (a phase first seen mid-history has no zero padding)."""
+        ring = self.rings.get(name)
+        if ring is None:
+            return np.zeros(0)
+        count = min(self.frames - self.first[name], self.history)
+        if not count:
+            return np.zeros(0)
+        slot = self.frames % self.history
+        return np.concatenate((ring[slot:], ring[:slot]))[-count:]
+
+    def stats(self):
+        """{phase: {'mean_ms', 'p95_ms', 'p99_ms', 'max_ms'}} over the history."""
+        out = {}
+        for name in self.rings:
+            ms = self.samples(name) * 1000.0
+            if not len(ms):
+                continue
+            p95, p99 = np.percentile(ms, (95, 99))
+            out[name] = {'mean_ms': float(ms.mean()), 'p95_ms': float(p95),
+                         'p99_ms': float(p99), 'max_ms': float(ms.max())}
+        return out
+
+    def phase_names(self):
+        """Phase names with the frame total last."""
+        names = sorted(n for n in self.rings if n != FRAME_PHASE)
+        if FRAME_PHASE in self.rings:
+            names.append(FRAME_PHASE)
+        return names
+
+    def export_csv(self, path):
+        """One row per recorded frame, one millisecond column per phase (empty
+        before the phase was first seen)."""
+        names = self.phase_names()
+        columns = [self.samples(n) * 1000.0 for n in names]
+        rows = max((len(c) for c in columns), default=0)
+        first = self.frames - rows
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame'] + [n + '_ms' for n in names])
+            for row in range(rows):
+                writer.writerow([first + row] + ['%.4f' % c[row - rows + len(c)] if row >= rows - len(c) else ''
+                                                 for c in columns])
+
+    def export_json(self, path):
+        """Summary statistics plus the raw per-frame samples (ms)."""
+        names = self.phase_names()
+        data = {
+            'frames': self.frames,
+            'history': self.history,
+            'stats': self.stats(),
+            'samples_ms': {n: [round(v, 4) for v in (self.samples(n) * 1000.0).tolist()] for n in names},
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
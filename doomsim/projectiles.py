@@ -0,0 +1,118 @@
+"""Array-backed projectile store.
+
+Bullets live in preallocated NumPy columns (struct of arrays) instead of one
+dict per shot. Live bullets are always packed into the first `count` rows, so
+integration and culling are a few whole-array operations, and removal
+swap-fills holes from the tail instead of shifting a list.
+"""
+import numpy as np
+
+from .constants import BULLET_LIFESPAN, BULLET_SPEED
+
+
+OWNER_PLAYER = 0
+OWNER_ENEMY = 1
+
+# Palette indexed by 'color_index'
+BULLET_COLORS = [
+    [1.0, 1.0, 0.0],  # player
+    [1.0, 0.5, 0.0],  # enemy
+]
+DEFAULT_COLOR_INDEX = {OWNER_PLAYER: 0, OWNER_ENEMY: 1}
+
+
+class ProjectilePool:
+    """Struct-of-arrays bullet pool. Rows [0, count) are live."""
+
+    COLUMNS = ('pos', 'prev_pos', 'dir', 'lifespan', 'owner', 'damage', 'color_index')
+
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = {name: getattr(self, name) for name in self.COLUMNS} if self.count else None
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 3))
+        self.prev_pos = np.zeros((capacity, 3))
+        self.dir = np.zeros((capacity, 3))
+        self.lifespan = np.zeros(capacity)
+        self.owner = np.zeros(capacity, np.int8)
+        self.damage = np.zeros(capacity, np.int32)
+        self.color_index = np.zeros(capacity, np.uint8)
+        if old:
+            for name, column in old.items():
+                getattr(self, name)[:self.count] = column[:self.count]
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def spawn(self, pos, direction, owner, damage, color_index=None):
+        """Append one bullet, doubling capacity when full. Returns its row."""
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        i = self.count
+        self.pos[i] = pos
+        self.prev_pos[i] = pos
+        self.dir[i] = direction
+        self.lifespan[i] = BULLET_LIFESPAN
+        self.owner[i] = owner
+        self.damage[i] = damage
+        self.color_index[i] = DEFAULT_COLOR_INDEX[owner] if color_index is None else color_index
+        self.count += 1
+        return i
+
+    def spawn_many(self, pos, direction, owner, damage):
+        """Append len(pos) bullets of one owner; damage is a scalar or per-bullet array."""
+        k = len(pos)
+        if not k:
+            return
+        capacity = self.capacity
+        while self.count + k > capacity:
+            capacity *= 2
+        if capacity != self.capacity:
+            self._allocate(capacity)
+        rows = slice(self.count, self.count + k)
+        self.pos[rows] = pos
+        self.prev_pos[rows] = pos
+        self.dir[rows] = direction
+        self.lifespan[rows] = BULLET_LIFESPAN
+        self.owner[rows] = owner
+        self.damage[rows] = damage
+        self.color_index[rows] = DEFAULT_COLOR_INDEX[owner]
+        self.count += k
+
+    def integrate(self, delta_time):
+        """Move every live bullet along its direction and age it."""
+        n = self.count
+        self.pos[:n] += self.dir[:n] * (BULLET_SPEED * delta_time)
+        self.lifespan[:n] -= delta_time
+
+    def snapshot(self):
+        """Copy current positions into prev_pos (for render interpolation)."""
+        self.prev_pos[:self.count] = self.pos[:self.count]
+
+    def interpolated(self, alpha):
+        """Live positions blended between prev_pos and pos."""
+        n = self.count
+        prev = self.prev_pos[:n]
+        return prev + (self.pos[:n] - prev) * alpha
+
+    def remove(self, dead_mask):
+        """Drop the rows flagged in dead_mask (length count). Holes below the new
+        count are filled with the surviving rows from the tail."""
+        n = self.count
+        dead = np.flatnonzero(dead_mask)
+        if not len(dead):
+            return
+        new_n = n - len(dead)
+        holes = dead[dead < new_n]
+        movers = new_n + np.flatnonzero(~dead_mask[new_n:n])
+        if len(holes):
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                column[holes] = column[movers]
+        self.count = new_n
@@ -0,0 +1,260 @@
+"""Input recording and deterministic replay: python -m doomsim.replay FILE
+[--speed X] [--profile OUT]
+
+The simulation is a pure function of its seed, its starting state and the
+sequence of step() inputs and menu commands, so that is all a replay stores:
+
+    header   magic, version, seed, starting game_state / level / cheat /
+             camera settings (struct REPLAY_HEADER)
+    body     zlib-compressed stream of records, each starting with an op byte
+      OP_TICK     flags byte, then only what changed since the previous tick:
+                  held keys, held special keys, event ids, a float64 dt if it
+                  is not SIM_DT
+      OP_FRAME    renderer frame boundary (advance() call)
+      OP_COMMAND  command id byte + int32 argument (start_run, pause, ...)
+
+Playback feeds the same steps back in order, either as fast as possible or
+paced to a multiple of real time, and can close a profiler frame at every
+recorded frame boundary to re-run a slow session under the profiler.
+"""
+import argparse
+import struct
+import sys
+import time
+import zlib
+
+from .constants import SIM_DT, STATE_PLAYING
+from .game import GameWorld
+from .profiler import FrameProfiler
+
+
+REPLAY_MAGIC = b'8BDR'
+REPLAY_VERSION = 1
+# magic, version, seed, game_state, current_level, cheat_mode, camera_mode,
+# tp_camera_pitch, tp_camera_yaw_offset
+REPLAY_HEADER = struct.Struct('<4sBqhBBBdd')
+
+OP_TICK = 1
+OP_FRAME = 2
+OP_COMMAND = 3
+
+TICK_KEYS = 1
+TICK_SPECIAL_KEYS = 2
+TICK_EVENTS = 4
+TICK_DT = 8
+
+# Ids are written to files: append only, never reorder
+EVENT_NAMES = ('fire', 'toggle_camera', 'perk_health', 'perk_score', 'perk_gun')
+COMMAND_NAMES = ('start_run', 'toggle_cheat', 'toggle_pause', 'set_game_state', 'record_unsaved_score',
+                 'start_horde', 'start_explore')
+EVENT_IDS = {name: i for i, name in enumerate(EVENT_NAMES)}
+COMMAND_IDS = {name: i for i, name in enumerate(COMMAND_NAMES)}
+COMMANDS_WITH_ARG = ('start_run', 'set_game_state', 'start_horde', 'start_explore')
+
+
+class ReplayError(Exception):
+    pass
+
+
+class ReplayRecorder:
+    """Receives every step() and menu command from a world (world.recorder)
+    and encodes them as replay records."""
+
+    def __init__(self, seed, game_state, current_level, cheat_mode, camera_mode, tp_camera_pitch, tp_camera_yaw_offset):
+        self.header = REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed, game_state, current_level,
+                                         bool(cheat_mode), camera_mode, tp_camera_pitch, tp_camera_yaw_offset)
+        self.body = bytearray()
+        self.ticks = 0
+        self.frames = 0
+        self._keys = ()
+        self._special_keys = ()
+
+    def tick(self, delta_time, keys, special_keys, events):
+        flags = 0
+        payload = bytearray()
+        held = tuple(sorted(k[0] for k, down in keys.items() if down))
+        if held != self._keys:
+            self._keys = held
+            flags |= TICK_KEYS
+            payload.append(len(held))
+            payload += bytes(held)
+        held = tuple(sorted(k for k, down in special_keys.items() if down))
+        if held != self._special_keys:
+            self._special_keys = held
+            flags |= TICK_SPECIAL_KEYS
+            payload.append(len(held))
+            payload += bytes(held)
+        if events:
+            flags |= TICK_EVENTS
+            payload.append(len(events))
+            payload += bytes(EVENT_IDS[e] for e in events)
+        if delta_time != SIM_DT:
+            flags |= TICK_DT
+            payload += struct.pack('<d', delta_time)
+        self.body.append(OP_TICK)
+        self.body.append(flags)
+        self.body += payload
+        self.ticks += 1
+
+    def frame(self):
+        self.body.append(OP_FRAME)
+        self.frames += 1
+
+    def command(self, name, arg=0):
+        self.body.append(OP_COMMAND)
+        self.body.append(COMMAND_IDS[name])
+        self.body += struct.pack('<i', arg)
+
+    def to_bytes(self):
+        return self.header + zlib.compress(bytes(self.body), 9)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+
+def start_recording(world):
+    """Start recording world. Call right after it is created or new_game(), before
+    the first step; returns the recorder (save it with recorder.save(path))."""
+    world.recorder = ReplayRecorder(world.rng_seed, world.game_state, world.current_level, world.cheat_mode,
+                                    world.camera_mode, world.tp_camera_pitch, world.tp_camera_yaw_offset)
+    return world.recorder
+
+
+def stop_recording(world):
+    recorder, world.recorder = world.recorder, None
+    return recorder
+
+
+class Replay:
+    """A decoded replay: header fields plus ops, a list of
+    (OP_TICK, dt, inputs) / (OP_FRAME,) / (OP_COMMAND, name, arg) tuples."""
+
+    def __init__(self, data):
+        if len(data) < REPLAY_HEADER.size:
+            raise ReplayError("file too short for a replay header")
+        (magic, version, self.seed, self.game_state, self.current_level, self.cheat_mode, self.camera_mode,
+         self.tp_camera_pitch, self.tp_camera_yaw_offset) = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC:
+            raise ReplayError("not a replay file")
+        if version != REPLAY_VERSION:
+            raise ReplayError(f"unsupported replay version {version}")
+        self.ops = self._decode(zlib.decompress(data[REPLAY_HEADER.size:]))
+        self.ticks = sum(1 for op in self.ops if op[0] == OP_TICK)
+        self.frames = sum(1 for op in self.ops if op[0] == OP_FRAME)
+
+    @staticmethod
+    def _decode(body):
+        ops = []
+        keys, special_keys = {}, {}
+        i, n = 0, len(body)
+        while i < n:
+            op = body[i]
+            i += 1
+            if op == OP_TICK:
+                flags = body[i]
+                i += 1
+                events = ()
+                delta_time = SIM_DT
+                if flags & TICK_KEYS:
+                    count = body[i]
+                    keys = {bytes((c,)): True for c in body[i+1:i+1+count]}
+                    i += 1 + count
+                if flags & TICK_SPECIAL_KEYS:
+                    count = body[i]
+                    special_keys = {c: True for c in body[i+1:i+1+count]}
+                    i += 1 + count
+                if flags & TICK_EVENTS:
+                    count = body[i]
+                    events = tuple(EVENT_NAMES[e] for e in body[i+1:i+1+count])
+                    i += 1 + count
+                if flags & TICK_DT:
+                    delta_time, = struct.unpack_from('<d', body, i)
+                    i += 8
+                ops.append((OP_TICK, delta_time, {'keys': keys, 'special_keys': special_keys, 'events': events}))
+            elif op == OP_FRAME:
+                ops.append((OP_FRAME,))
+            elif op == OP_COMMAND:
+                arg, = struct.unpack_from('<i', body, i + 1)
+                ops.append((OP_COMMAND, COMMAND_NAMES[body[i]], arg))
+                i += 5
+            else:
+                raise ReplayError(f"bad record op {op} at byte {i - 1}")
+        return ops
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        return Replay(f.read())
+
+
+def play(world, replay, speed=0.0, on_frame=None):
+    """Reset world to the replay's start and feed every recorded step and
+    command back in. speed 0 runs uncapped; otherwise simulated time is paced
+    to speed x real time. on_frame() is called at each recorded frame
+    boundary (after every tick if the replay has none). Returns the number of
+    ticks run."""
+    world.new_game(replay.seed)
+    world.game_state = replay.game_state
+    world.current_level = replay.current_level
+    world.cheat_mode = bool(replay.cheat_mode)
+    world.camera_mode = replay.camera_mode
+    world.tp_camera_pitch = replay.tp_camera_pitch
+    world.tp_camera_yaw_offset = replay.tp_camera_yaw_offset
+    step = world.step
+    on_tick = on_frame if not replay.frames else None
+    sim_time = 0.0
+    start = time.perf_counter()
+    ticks = 0
+    for op in replay.ops:
+        kind = op[0]
+        if kind == OP_TICK:
+            step(op[1], op[2])
+            ticks += 1
+            if on_tick:
+                on_tick()
+            if speed:
+                sim_time += op[1]
+                ahead = start + sim_time / speed - time.perf_counter()
+                if ahead > 0:
+                    time.sleep(ahead)
+        elif kind == OP_FRAME:
+            if on_frame:
+                on_frame()
+        else:
+            if op[1] in COMMANDS_WITH_ARG:
+                getattr(world, op[1])(op[2])
+            else:
+                getattr(world, op[1])()
+    return ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m doomsim.replay')
+    parser.add_argument('replay')
+    parser.add_argument('--speed', type=float, default=0.0, help='multiple of real time (0 = uncapped)')
+    parser.add_argument('--profile', metavar='OUT', help='profile each recorded frame; writes OUT.csv and OUT.json')
+    args = parser.parse_args()
+
+    try:
+        replay = load(args.replay)
+    except (OSError, ReplayError, zlib.error) as e:
+        sys.exit(f"{args.replay}: {e}")
+    on_frame = None
+    profiler = None
+    if args.profile:
+        profiler = FrameProfiler(history=max(replay.frames, replay.ticks, 1))
+        profiler.enable()
+        on_frame = profiler.mark_frame
+    world = GameWorld(profiler=profiler)
+    start = time.perf_counter()
+    ticks = play(world, replay, args.speed, on_frame)
+    elapsed = time.perf_counter() - start
+    if args.profile:
+        profiler.export_csv(args.profile + '.csv')
+        profiler.export_json(args.profile + '.json')
+    state = 'playing' if world.game_state == STATE_PLAYING else world.game_state
+    print(f"{ticks} ticks ({replay.frames} frames) in {elapsed:.3f}s ({ticks/max(elapsed, 1e-9):.0f} ticks/s), "
+          f"level {world.current_level}, score {world.player.score}, state {state}")
+
+if __name__ == "__main__": main()
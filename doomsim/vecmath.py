@@ -0,0 +1,57 @@
+"""Small vector helpers used by the simulation."""
+import math
+
+import numpy as np
+
+
+def vector_length(v):
+    return math.sqrt(v[0]**2 + v[1]**2 + v[2]**2)
+
+def normalize_vector(v):
+    l = vector_length(v)
+    if l == 0:
+        return [0,0,0]
+    return [v[0]/l, v[1]/l, v[2]/l]
+
+def distance_3d(p1, p2):
+    return math.sqrt((p1[0]-p2[0])**2 + (p1[1]-p2[1])**2 + (p1[2]-p2[2])**2)
+
+def check_sphere_collision(pos1, radius1, pos2, radius2):
+    dist = distance_3d(pos1, pos2)
+    return dist < (radius1 + radius2)
+
+def sweep_sphere(start, direction, length, center, radius):
+    """sweep_spheres for one point and one sphere, on plain floats."""
+    f0 = start[0] - center[0]
+    f1 = start[1] - center[1]
+    f2 = start[2] - center[2]
+    ff = f0*f0 + f1*f1 + f2*f2
+    if not ff < (radius + length)**2:
+        return math.inf
+    c = ff - radius*radius
+    if c < 0:
+        return 0.0
+    b = f0*direction[0] + f1*direction[1] + f2*direction[2]
+    disc = b*b - c
+    if disc < 0:
+        return math.inf
+    t = -b - math.sqrt(disc)
+    return t if 0 <= t <= length else math.inf
+
+def sweep_spheres(starts, dirs, length, centers, radii):
+    """Distance along each unit direction at which a point moving from starts
+    for up to length first comes within radii of centers (row-wise NumPy
+    arrays; centers/radii may also be one shared sphere). 0 if it starts
+    inside, inf if it never gets there."""
+    f = starts - centers
+    ff = (f*f).sum(axis=-1)
+    # Most rows are nowhere near: skip the solve unless one is within reach
+    if not (ff < (radii + length)**2).any():
+        return np.full(ff.shape, np.inf)
+    b = (f*dirs).sum(axis=-1)
+    c = ff - radii*radii
+    disc = b*b - c
+    t = -b - np.sqrt(np.maximum(disc, 0.0))
+    t[(disc < 0) | (t < 0) | (t > length)] = np.inf
+    t[c < 0] = 0.0
+    return t
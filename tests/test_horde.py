@@ -0,0 +1,24 @@
+"""EnemyPool uids stay with their enemies through swap-fill removal."""
+import numpy as np
+
+from doomsim.constants import HORDE_ENEMY_TYPES
+from doomsim.game import GameWorld
+from doomsim.horde import EnemyPool
+
+
+def test_uid_follows_enemy_through_remove():
+    pool = EnemyPool(capacity=4)
+    world = GameWorld()
+    kind = HORDE_ENEMY_TYPES[0]
+    archetypes = {kind: world.enemy_archetype(kind)}
+    pool.spawn_many([kind] * 6, np.arange(6.0), np.zeros(6), np.zeros(6), archetypes)
+    xs = dict(zip(pool.uid[:6].tolist(), pool.pos[:6, 0].tolist()))
+    dead = np.zeros(6, bool)
+    dead[[0, 2]] = True
+    pool.remove(dead)
+    assert sorted(pool.uid[:pool.count].tolist()) == [1, 3, 4, 5]
+    for uid, x in zip(pool.uid[:pool.count].tolist(), pool.pos[:pool.count, 0].tolist()):
+        assert xs[uid] == x
+    pool.clear()
+    pool.spawn_many([kind], [1.0], [1.0], [0.0], archetypes)
+    assert pool.uid[0] == 6
@@ -0,0 +1,48 @@
+"""The interactive game's replay save path, run without a GLUT window."""
+import importlib.util
+import os
+
+from doomsim import replay
+from doomsim.constants import STATE_PLAYING
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_renderer():
+    spec = importlib.util.spec_from_file_location('eightbitdoom', os.path.join(ROOT, '8bitdoom.py'))
+    renderer = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(renderer)
+    return renderer
+
+
+def test_quit_game_saves_replay(tmp_path, monkeypatch):
+    renderer = load_renderer()
+    path = str(tmp_path / 'session.8bdr')
+    left = []
+    monkeypatch.setattr(renderer, 'RECORD_REPLAY_PATH', path)
+    monkeypatch.setattr(renderer, 'glutLeaveMainLoop', lambda: left.append(True))
+    sim = renderer.sim
+    replay.start_recording(sim)
+    sim.start_run(1)
+    sim.set_game_state(STATE_PLAYING)
+    for _ in range(30):
+        sim.step(1 / 60)
+
+    renderer.quit_game()
+
+    assert left == [True]
+    saved = replay.load(path)
+    assert saved.ticks > 0
+    assert sim.recorder is None
+    # A second quit path (main loop returning) does not overwrite it
+    os.remove(path)
+    renderer.save_replay()
+    assert not os.path.exists(path)
+
+
+def test_save_replay_without_recording(tmp_path, monkeypatch):
+    renderer = load_renderer()
+    path = str(tmp_path / 'session.8bdr')
+    monkeypatch.setattr(renderer, 'RECORD_REPLAY_PATH', path)
+    renderer.save_replay()
+    assert not os.path.exists(path)